@@ -0,0 +1,105 @@
+"""asyncio front end to check domains on many hypervisors concurrently
+
+    async for result in check_domains({
+            'qemu+ssh://host1/system': host1_params,
+            'qemu+ssh://host2/system': host2_params}):
+        ...
+
+The libvirt calls run in a thread pool and the XML to intermediate
+conversions and comparisons in a process pool. Each URI has its own
+concurrency limit, so a slow hypervisor only delays its own results.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from drift import DriftChecker
+from libvirt_connection import LibvirtConnectionManager
+
+def _check_xmls(params, domain_xmls, uri):
+    checker = DriftChecker(params=params)
+    return [checker.check_xml(source=xml, file=uri) for xml in domain_xmls]
+
+async def check_domains(uri_to_params, connection_manager=None,
+        cpu_executor=None, io_workers=8, per_uri_limit=4, chunk_size=16):
+    """Check the domains of many libvirt URIs
+
+    Args:
+        uri_to_params (dict): the module parameters keyed by domain name,
+            for each URI.
+        connection_manager (LibvirtConnectionManager): the connection
+            pool, the process wide one if None.
+        cpu_executor (Executor): runs the conversions and comparisons, a
+            ProcessPoolExecutor owned by the call if None.
+        io_workers (int): threads running the libvirt calls.
+        per_uri_limit (int): maximum number of libvirt calls and chunks
+            being checked at once for a single URI.
+        chunk_size (int): number of domains checked per executor job.
+
+    Yields:
+        dict: a DriftChecker.check_xml result per domain as soon as it
+            is available, with the URI as 'file', and a MISSING result
+            for each domain with parameters but no definition on its
+            URI. A URI that can not be read yields a single ERROR result
+            with no domain.
+    """
+    if connection_manager is None:
+        connection_manager = LibvirtConnectionManager.shared()
+    io_executor = ThreadPoolExecutor(max_workers=io_workers)
+    owned_cpu_executor = None
+    if cpu_executor is None:
+        owned_cpu_executor = cpu_executor = ProcessPoolExecutor()
+    queue = asyncio.Queue()
+    done = object()
+    tasks = [asyncio.ensure_future(_check_uri(uri=uri, params=params,
+        connection_manager=connection_manager, io_executor=io_executor,
+        cpu_executor=cpu_executor, limit=per_uri_limit,
+        chunk_size=chunk_size, queue=queue, done=done))
+        for uri, params in uri_to_params.items()]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            result = await queue.get()
+            if result is done:
+                remaining -= 1
+                continue
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        io_executor.shutdown(wait=False)
+        if owned_cpu_executor is not None:
+            owned_cpu_executor.shutdown(wait=False)
+
+async def _check_uri(uri, params, connection_manager, io_executor,
+        cpu_executor, limit, chunk_size, queue, done):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(limit)
+    seen_domains = set()
+
+    async def check_chunk(domain_xmls):
+        async with semaphore:
+            results = await loop.run_in_executor(cpu_executor, partial(
+                _check_xmls, params=params, domain_xmls=domain_xmls, uri=uri))
+        for result in results:
+            seen_domains.add(result['domain'])
+            await queue.put(result)
+
+    try:
+        async with semaphore:
+            domain_xmls = await loop.run_in_executor(io_executor, partial(
+                connection_manager.domain_xmls, uri=uri))
+        domain_xmls = [xml for _, xml in sorted(domain_xmls.items())]
+        await asyncio.gather(*(check_chunk(domain_xmls=domain_xmls[
+            index:index + chunk_size])
+            for index in range(0, len(domain_xmls), chunk_size)))
+        for domain_name in sorted(set(params) - seen_domains):
+            await queue.put({'domain': domain_name, 'file': None,
+                'status': DriftChecker.MISSING, 'changes': []})
+    except Exception as e:
+        await queue.put({'domain': None, 'file': uri,
+            'status': DriftChecker.ERROR, 'changes': [],
+            'error': '{0}: {1}'.format(type(e).__name__, e)})
+    finally:
+        await queue.put(done)
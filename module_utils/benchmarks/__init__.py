@@ -0,0 +1,10 @@
+"""Benchmarks for the conversion stages
+
+Run from the module_utils directory, e.g.:
+
+    python -m benchmarks.compiled_filter
+    python -m benchmarks.suite --sizes 10 100 --output baseline.json
+
+Domains are generated by benchmarks.domain_generator, so results are
+comparable between runs and machines.
+"""
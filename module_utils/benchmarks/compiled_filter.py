@@ -0,0 +1,42 @@
+"""Benchmark CompiledFilter against the number of repeated devices
+
+The time per device should stay flat as the number of disks grows,
+showing the filter scales linearly with repeated elements.
+"""
+import timeit
+
+from xml_filter import CompiledFilter
+
+from benchmarks.domain_generator import DomainGenerator
+
+FILTER_SPEC = {
+    'domain': {
+        '__attributes__': ['type'],
+        'name': {},
+        'devices': {
+            'disk': {
+                '__attributes__': ['type', 'device'],
+                'source': {'__attributes__': ['file']},
+                'target': {'__attributes__': ['dev', 'bus']}
+            }
+        }
+    }
+}
+
+SIZES = (10, 100, 1000, 5000)
+
+def main():
+    compiled_filter = CompiledFilter(filter_spec=FILTER_SPEC)
+    print('{0:>8} {1:>12} {2:>16}'.format('disks', 'total (ms)',
+        'per disk (us)'))
+    for size in SIZES:
+        domain = DomainGenerator(total_disks=size, total_interfaces=0,
+            total_channels=0).xml_tree
+        repeat = max(1, 5000 // size)
+        elapsed = min(timeit.repeat(lambda: compiled_filter.apply(
+            input_xml_tree=domain), number=repeat, repeat=3)) / repeat
+        print('{0:>8} {1:>12.3f} {2:>16.3f}'.format(size, elapsed * 1e3,
+            elapsed * 1e6 / size))
+
+if __name__ == '__main__':
+    main()
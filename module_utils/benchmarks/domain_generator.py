@@ -0,0 +1,150 @@
+"""Deterministic generator of realistic libvirt domain XML"""
+import random
+import uuid
+
+from lxml import etree
+
+class DomainGenerator:
+    """Generate a libvirt domain definition
+
+    The same arguments always produce the same XML. Disks, network
+    interfaces and channels are generated with the elements libvirt
+    dumps for them, and each disk gets a chain of nested backingStore
+    elements nesting_depth deep.
+
+    Attributes:
+        xml_tree (Element): the domain root element.
+        xml (bytes): the serialized domain.
+    """
+
+    def __init__(self, total_disks=1, total_interfaces=1, total_channels=1,
+            nesting_depth=0, seed=0):
+        """Class constructor
+
+        Args:
+            total_disks (int): number of disk devices.
+            total_interfaces (int): number of network interfaces.
+            total_channels (int): number of channel devices.
+            nesting_depth (int): backingStore chain length per disk.
+            seed (int): random seed for the generated values.
+        """
+        self.__random = random.Random(seed)
+        self.__xml_tree = self.__generate_domain(total_disks=total_disks,
+            total_interfaces=total_interfaces, total_channels=total_channels,
+            nesting_depth=nesting_depth, seed=seed)
+
+    @classmethod
+    def for_total_devices(cls, total_devices, nesting_depth=0, seed=0):
+        """Build a generator splitting a number of devices
+
+        Half of the devices are disks, 30% network interfaces and the
+        rest channels.
+        """
+        total_disks = total_devices // 2
+        total_interfaces = total_devices * 3 // 10
+        return cls(total_disks=total_disks, total_interfaces=total_interfaces,
+            total_channels=total_devices - total_disks - total_interfaces,
+            nesting_depth=nesting_depth, seed=seed)
+
+    def __generate_domain(self, total_disks, total_interfaces, total_channels,
+            nesting_depth, seed):
+        domain = etree.Element('domain', type='kvm', id=str(seed + 1))
+        etree.SubElement(domain, 'name').text = 'vm-bench-{0}'.format(seed)
+        etree.SubElement(domain, 'uuid').text = str(uuid.UUID(
+            int=self.__random.getrandbits(128), version=4))
+        etree.SubElement(domain, 'title').text = 'Benchmark domain'
+        memory = str(self.__random.choice((1, 2, 4, 8, 16)) * 1024 * 1024)
+        etree.SubElement(domain, 'memory', unit='KiB').text = memory
+        etree.SubElement(domain, 'currentMemory', unit='KiB').text = memory
+        etree.SubElement(domain, 'vcpu', placement='static',
+            current='1').text = str(self.__random.choice((2, 4, 8)))
+        os_element = etree.SubElement(domain, 'os')
+        etree.SubElement(os_element, 'type', arch='x86_64',
+            machine='pc-i440fx-2.11').text = 'hvm'
+        etree.SubElement(os_element, 'bootmenu', enable='yes')
+        features = etree.SubElement(domain, 'features')
+        etree.SubElement(features, 'acpi')
+        etree.SubElement(features, 'apic')
+        cpu = etree.SubElement(domain, 'cpu', mode='custom', match='exact',
+            check='partial')
+        etree.SubElement(cpu, 'model', fallback='allow').text = 'Nehalem'
+        etree.SubElement(domain, 'on_poweroff').text = 'destroy'
+        etree.SubElement(domain, 'on_reboot').text = 'restart'
+        etree.SubElement(domain, 'on_crash').text = 'restart'
+        devices = etree.SubElement(domain, 'devices')
+        etree.SubElement(devices, 'emulator').text = '/usr/bin/kvm'
+        for index in range(total_disks):
+            self.__add_disk(devices=devices, index=index,
+                nesting_depth=nesting_depth)
+        etree.SubElement(devices, 'controller', type='virtio-serial',
+            index='0')
+        for index in range(total_interfaces):
+            self.__add_interface(devices=devices, index=index)
+        for index in range(total_channels):
+            self.__add_channel(devices=devices, index=index)
+        etree.SubElement(devices, 'input', type='mouse', bus='ps2')
+        graphics = etree.SubElement(devices, 'graphics', type='spice',
+            autoport='yes')
+        etree.SubElement(graphics, 'listen', type='address')
+        video = etree.SubElement(devices, 'video')
+        etree.SubElement(video, 'model', type='qxl', ram='65536',
+            vram='65536', vgamem='16384', heads='1', primary='yes')
+        memballoon = etree.SubElement(devices, 'memballoon', model='virtio')
+        self.__add_pci_address(element=memballoon, slot=0x1f)
+        return domain
+
+    def __add_disk(self, devices, index, nesting_depth):
+        disk = etree.SubElement(devices, 'disk', type='file', device='disk')
+        etree.SubElement(disk, 'driver', name='qemu', type='qcow2')
+        etree.SubElement(disk, 'source',
+            file='/var/lib/libvirt/images/disk{0}.qcow2'.format(index))
+        parent = disk
+        for depth in range(nesting_depth):
+            parent = etree.SubElement(parent, 'backingStore', type='file')
+            etree.SubElement(parent, 'format', type='qcow2')
+            etree.SubElement(parent, 'source',
+                file='/var/lib/libvirt/images/base{0}-{1}.qcow2'.format(
+                index, depth))
+        etree.SubElement(disk, 'target', dev='vd' + self.__letters(index),
+            bus='virtio')
+        self.__add_pci_address(element=disk, slot=index)
+
+    def __add_interface(self, devices, index):
+        interface = etree.SubElement(devices, 'interface', type='bridge')
+        etree.SubElement(interface, 'mac', address='52:54:00:{0}'.format(
+            ':'.join('{0:02x}'.format(self.__random.getrandbits(8))
+            for _ in range(3))))
+        etree.SubElement(interface, 'source',
+            bridge='br{0}'.format(index % 4))
+        etree.SubElement(interface, 'model', type='virtio')
+        self.__add_pci_address(element=interface, slot=index)
+
+    def __add_channel(self, devices, index):
+        channel = etree.SubElement(devices, 'channel', type='unix')
+        etree.SubElement(channel, 'source', mode='bind')
+        etree.SubElement(channel, 'target', type='virtio',
+            name='org.qemu.guest_agent.{0}'.format(index))
+        etree.SubElement(channel, 'address', type='virtio-serial',
+            controller='0', bus='0', port=str(index + 1))
+
+    def __add_pci_address(self, element, slot):
+        etree.SubElement(element, 'address', type='pci', domain='0x0000',
+            bus='0x{0:02x}'.format(slot // 32), slot='0x{0:02x}'.format(
+            slot % 32), function='0x0')
+
+    def __letters(self, index):
+        """Disk name suffix: a..z, then aa..zz and so on"""
+        letters = ''
+        index += 1
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(ord('a') + remainder) + letters
+        return letters
+
+    @property
+    def xml_tree(self):
+        return self.__xml_tree
+
+    @property
+    def xml(self):
+        return etree.tostring(self.__xml_tree)
@@ -0,0 +1,96 @@
+"""Measure the cold import time of the module_utils modules
+
+Every module is imported in a fresh interpreter started with
+python -X importtime, as Ansible does on every task, and the cumulative
+import time is compared with its budget. The heavy optional modules
+that got imported along are listed too, none is expected.
+
+Wall clock budgets depend on the machine and its load, so they are
+only checked here, the exit status is 1 if any module is over budget.
+test_import_time only checks, with heavy_imports, that no heavy module
+is imported.
+"""
+import json
+import os
+import subprocess
+import sys
+
+MODULE_UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budget per module, in milliseconds. Generous
+# enough for slow machines, but far below the cost of importing lxml or
+# NumPy, which alone take 40 ms and 100 ms or more.
+IMPORT_BUDGETS_MS = {
+    'domain_xml_to_intermediate': 30,
+    'intermediate_diff': 30,
+    'intermediate_to_xml': 30,
+    'memory_normalizer': 30,
+    'module_to_intermediate': 30,
+    'normalizer_pipeline': 30,
+    'xml_filter': 30,
+    'xml_to_intermediate': 30
+}
+
+HEAVY_MODULES = ('lxml', 'math', 'numpy', 'uuid')
+
+def measure_import(module_name, repeat=3):
+    """Measure the cold import of a module
+
+    Args:
+        module_name (str): the module to import.
+        repeat (int): number of fresh interpreters to measure.
+
+    Returns:
+        tuple: the best cumulative import time in milliseconds and the
+            sorted list of HEAVY_MODULES imported along.
+    """
+    best_ms = None
+    heavy_modules = []
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+            'import {0}'.format(module_name)], cwd=MODULE_UTILS_DIR,
+            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        imported = {}
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative_us, imported_name = line.split('|')
+            if not cumulative_us.strip().isdigit():
+                continue
+            imported[imported_name.strip()] = int(cumulative_us) / 1000
+        if best_ms is None or imported[module_name] < best_ms:
+            best_ms = imported[module_name]
+        heavy_modules = sorted(heavy_module for heavy_module in HEAVY_MODULES
+            if heavy_module in imported)
+    return best_ms, heavy_modules
+
+def heavy_imports(module_name):
+    """List the heavy modules imported along with a module
+
+    The module is imported in a fresh interpreter, whose sys.modules is
+    then checked, so the result does not depend on timings.
+
+    Returns:
+        list: the sorted HEAVY_MODULES found in sys.modules.
+    """
+    process = subprocess.run([sys.executable, '-c',
+        'import json, sys, {0}; print(json.dumps([name'
+        ' for name in sys.argv[1:] if name in sys.modules]))'
+        .format(module_name)] + sorted(HEAVY_MODULES),
+        cwd=MODULE_UTILS_DIR, stdout=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    return json.loads(process.stdout)
+
+def main():
+    print('{0:<28} {1:>10} {2:>12}  {3}'.format('module', 'time (ms)',
+        'budget (ms)', 'heavy imports'))
+    over_budget = False
+    for module_name, budget_ms in sorted(IMPORT_BUDGETS_MS.items()):
+        import_ms, heavy_modules = measure_import(module_name=module_name)
+        over_budget = over_budget or import_ms > budget_ms
+        print('{0:<28} {1:>10.1f} {2:>12}  {3}'.format(module_name, import_ms,
+            budget_ms, ', '.join(heavy_modules) or '-'))
+    return 1 if over_budget else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""Compare the memory held by dict and IntermediateNode intermediates
+
+Converts the same generated domains with XmlToIntermediate in both
+forms and reports the memory retained by the results, as measured by
+tracemalloc.
+"""
+import tracemalloc
+
+from xml_to_intermediate import XmlToIntermediate
+
+from benchmarks.domain_generator import DomainGenerator
+
+SIZES = (10, 100, 1000)
+TOTAL_DOMAINS = 100
+
+def retained_memory(domain, as_node):
+    tracemalloc.start()
+    results = [XmlToIntermediate(xml_string=domain, as_node=as_node)
+        .representation for _ in range(TOTAL_DOMAINS)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return current
+
+def main():
+    print('{0:>8} {1:>14} {2:>14} {3:>8}'.format('disks', 'dict (KiB)',
+        'node (KiB)', 'ratio'))
+    for size in SIZES:
+        domain = DomainGenerator(total_disks=size, total_interfaces=0,
+            total_channels=0).xml_tree
+        dict_memory = retained_memory(domain=domain, as_node=False)
+        node_memory = retained_memory(domain=domain, as_node=True)
+        print('{0:>8} {1:>14.1f} {2:>14.1f} {3:>8.2f}'.format(size,
+            dict_memory / 1024, node_memory / 1024,
+            dict_memory / node_memory))
+
+if __name__ == '__main__':
+    main()
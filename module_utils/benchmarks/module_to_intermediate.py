@@ -0,0 +1,36 @@
+"""Benchmark ModuleToIntermediate on a whole inventory
+
+Converts the parameters of TOTAL_DOMAINS domains, once building a
+ModuleToIntermediate per domain and once with convert_many, and reports
+the throughput of both. The best of three runs is kept. The generated
+UUIDs are derived on the first run and come from
+ModuleToIntermediate.UUID_CACHE on the next ones, as on every check
+cycle after the first one. The cache hits and misses are reported too.
+"""
+import timeit
+
+from mock_ansible_module import MockAnsibleModule
+from module_to_intermediate import ModuleToIntermediate
+
+from benchmarks.suite import generate_params
+
+TOTAL_DOMAINS = 10000
+
+def main():
+    param_sets = generate_params(total_domains=TOTAL_DOMAINS)
+    modules = [MockAnsibleModule(parameters=params) for params in param_sets]
+    per_domain = min(timeit.repeat(lambda: [ModuleToIntermediate(
+        libvirt_domain_module=module).representation for module in modules],
+        number=1, repeat=3))
+    bulk = min(timeit.repeat(lambda: ModuleToIntermediate.convert_many(
+        param_sets=param_sets), number=1, repeat=3))
+    print('{0:<14} {1:>10} {2:>14}'.format('mode', 'total (ms)', 'domains/s'))
+    for mode, elapsed in (('per domain', per_domain), ('convert_many', bulk)):
+        print('{0:<14} {1:>10.1f} {2:>14.0f}'.format(mode, elapsed * 1e3,
+            TOTAL_DOMAINS / elapsed))
+    uuid_cache = ModuleToIntermediate.UUID_CACHE
+    print('uuid cache: {0} hits, {1} misses'.format(uuid_cache.hits,
+        uuid_cache.misses))
+
+if __name__ == '__main__':
+    main()
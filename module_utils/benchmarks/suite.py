@@ -0,0 +1,207 @@
+"""Benchmark every conversion stage at growing sizes
+
+For the XML stages (XmlFilter, XmlToIntermediate, IntermediateToXml and
+its streaming IntermediateToXml.write) the size is the number of devices
+of a generated domain. For the ModuleToIntermediate and MemoryNormalizer
+stages, which never see devices, it is the number of domains converted.
+Each stage reports the best wall time out of a few runs and the peak
+memory allocated during one run, as traced by tracemalloc.
+
+Save a baseline and compare later runs against it:
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --compare baseline.json
+
+When comparing, the exit status is 1 if any stage got slower than the
+baseline by more than the tolerance.
+"""
+import argparse
+import copy
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+from intermediate_to_xml import IntermediateToXml
+from memory_normalizer import MemoryNormalizer
+from mock_ansible_module import MockAnsibleModule
+from module_to_intermediate import ModuleToIntermediate
+from xml_filter import XmlFilter
+from xml_to_intermediate import XmlToIntermediate
+
+from benchmarks.domain_generator import DomainGenerator
+
+SIZES = (10, 100, 1000, 10000)
+
+FILTER_SPEC = {
+    'domain': {
+        '__attributes__': ['type'],
+        'name': {},
+        'uuid': {},
+        'memory': {'__attributes__': ['unit']},
+        'currentMemory': {'__attributes__': ['unit']},
+        'vcpu': {'__attributes__': ['current']},
+        'os': {'type': {}},
+        'devices': {
+            'disk': {
+                '__attributes__': ['type', 'device'],
+                'source': {'__attributes__': ['file']},
+                'target': {'__attributes__': ['dev', 'bus']}
+            },
+            'interface': {
+                '__attributes__': ['type'],
+                'mac': {'__attributes__': ['address']}
+            }
+        }
+    }
+}
+
+def generate_params(total_domains):
+    params = []
+    for index in range(total_domains):
+        domain_params = copy.deepcopy(MockAnsibleModule.DEFAULT_PARAMETERS)
+        domain_params['name'] = 'vm-bench-{0}'.format(index)
+        params.append(domain_params)
+    return params
+
+def setup_xml_filter(size):
+    xml = DomainGenerator.for_total_devices(total_devices=size).xml
+    return lambda: XmlFilter(filter_spec=FILTER_SPEC, input_xml=xml).output_xml
+
+def setup_xml_to_intermediate(size):
+    xml = DomainGenerator.for_total_devices(total_devices=size).xml
+    return lambda: XmlToIntermediate(xml_string=xml)
+
+def setup_intermediate_to_xml(size):
+    intermediate = XmlToIntermediate(xml_string=DomainGenerator
+        .for_total_devices(total_devices=size).xml).representation
+    return lambda: IntermediateToXml(intermediate_representation=intermediate)
+
+def setup_intermediate_to_xml_write(size):
+    intermediate = XmlToIntermediate(xml_string=DomainGenerator
+        .for_total_devices(total_devices=size).xml).representation
+    return lambda: IntermediateToXml.write(
+        intermediate_representation=intermediate)
+
+def setup_module_to_intermediate(size):
+    modules = [MockAnsibleModule(parameters=domain_params)
+        for domain_params in generate_params(total_domains=size)]
+    return lambda: [ModuleToIntermediate(libvirt_domain_module=module)
+        for module in modules]
+
+def setup_module_to_intermediate_convert_many(size):
+    param_sets = generate_params(total_domains=size)
+    return lambda: ModuleToIntermediate.convert_many(param_sets=param_sets)
+
+def setup_memory_normalizer(size):
+    intermediates = [ModuleToIntermediate(libvirt_domain_module=
+        MockAnsibleModule(parameters=domain_params)).representation
+        for domain_params in generate_params(total_domains=size)]
+    return lambda: [MemoryNormalizer(intermediate=intermediate,
+        copy_on_write=True) for intermediate in intermediates]
+
+STAGES = {
+    'XmlFilter': setup_xml_filter,
+    'XmlToIntermediate': setup_xml_to_intermediate,
+    'IntermediateToXml': setup_intermediate_to_xml,
+    'IntermediateToXml.write': setup_intermediate_to_xml_write,
+    'ModuleToIntermediate': setup_module_to_intermediate,
+    'ModuleToIntermediate.convert_many':
+        setup_module_to_intermediate_convert_many,
+    'MemoryNormalizer': setup_memory_normalizer
+}
+
+def measure(function, repeat=3):
+    """Measure a function
+
+    Returns:
+        dict: the best time per call in seconds and the peak memory
+            allocated during one call in bytes.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    function()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': seconds, 'peak_bytes': peak_bytes}
+
+def run(stages, sizes, report=sys.stdout):
+    """Run the benchmarks
+
+    Returns:
+        dict: the results, keyed by stage name and then by size.
+    """
+    results = {}
+    report.write('{0:<34} {1:>8} {2:>14} {3:>14}\n'.format('stage', 'size',
+        'time (ms)', 'peak (KiB)'))
+    for stage_name in stages:
+        results[stage_name] = {}
+        for size in sizes:
+            result = measure(function=STAGES[stage_name](size))
+            results[stage_name][str(size)] = result
+            report.write('{0:<34} {1:>8} {2:>14.3f} {3:>14.1f}\n'.format(
+                stage_name, size, result['seconds'] * 1e3,
+                result['peak_bytes'] / 1024))
+            report.flush()
+    return results
+
+def compare(results, baseline, tolerance, report=sys.stdout):
+    """Compare results with a baseline
+
+    Returns:
+        list: (stage name, size, time ratio) of the regressions.
+    """
+    regressions = []
+    report.write('{0:<34} {1:>8} {2:>12} {3:>12}\n'.format('stage', 'size',
+        'time ratio', 'peak ratio'))
+    for stage_name, sizes in results.items():
+        for size, result in sizes.items():
+            baseline_result = baseline.get(stage_name, {}).get(size)
+            if baseline_result is None:
+                continue
+            time_ratio = result['seconds'] / baseline_result['seconds']
+            peak_ratio = result['peak_bytes'] / max(
+                baseline_result['peak_bytes'], 1)
+            flag = ''
+            if time_ratio > 1 + tolerance:
+                regressions.append((stage_name, size, time_ratio))
+                flag = '  REGRESSION'
+            report.write('{0:<34} {1:>8} {2:>12.2f} {3:>12.2f}{4}\n'.format(
+                stage_name, size, time_ratio, peak_ratio, flag))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite',
+        description='Benchmark the conversion stages.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+        help='sizes to benchmark (default: {0})'.format(
+        ' '.join(str(size) for size in SIZES)))
+    parser.add_argument('--stages', nargs='+', default=list(STAGES),
+        choices=list(STAGES), help='stages to benchmark (default: all)')
+    parser.add_argument('--output', help='save the results to a JSON file')
+    parser.add_argument('--compare', help='compare with a saved JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+        help='allowed slow down when comparing (default: 0.25)')
+    args = parser.parse_args(argv)
+    results = run(stages=args.stages, sizes=args.sizes)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'results': results
+            }, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)['results']
+        if compare(results=results, baseline=baseline,
+                tolerance=args.tolerance):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Benchmark the XmlToIntermediate conversion engine
+
+Compares the iterative tree walker with the previous recursive chain of
+private helper calls, kept below for the comparison only, and reports
+converted nodes per second.
+"""
+import timeit
+
+from xml_to_intermediate import XmlToIntermediate
+
+from benchmarks.domain_generator import DomainGenerator
+
+SIZES = (10, 100, 1000, 5000)
+
+class RecursiveConverter:
+    """The recursive chain of helper calls used before the walker"""
+
+    def representation(self, node):
+        element = self.create_base_element(node=node)
+        element = self.parse_attributes(node=node, element=element)
+        if not self.has_children(node=node):
+            return self.parse_text(node=node, element=element)
+        children_list = []
+        for child_node in self.get_node_children(node=node):
+            self.add_element_to_children_list(
+                element=self.representation(node=child_node),
+                children_list=children_list)
+        self.add_children_list_to_parent_element(parent_element=element,
+            children_list=self.sort_children_list(
+            children_list=children_list))
+        return element
+
+    def create_base_element(self, node):
+        return {'element_name': node.tag}
+
+    def parse_attributes(self, node, element):
+        attributes_list = sorted(({'attribute_name': key,
+            'attribute_value': value} for key, value
+            in dict(node.attrib).items()),
+            key=lambda x: x['attribute_name'])
+        if attributes_list:
+            element['attributes'] = attributes_list
+        return element
+
+    def has_children(self, node):
+        if list(node):
+            return True
+        return False
+
+    def parse_text(self, node, element):
+        if node.text:
+            element['text'] = node.text
+        return element
+
+    def get_node_children(self, node):
+        return list(node)
+
+    def add_element_to_children_list(self, element, children_list):
+        if element is not None:
+            children_list.append(element)
+        return children_list
+
+    def sort_children_list(self, children_list):
+        return sorted(children_list, key=lambda x: x['element_name'])
+
+    def add_children_list_to_parent_element(self, parent_element,
+            children_list):
+        if children_list:
+            parent_element['children'] = children_list
+
+def best_time(function, number):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+def main():
+    converter = RecursiveConverter()
+    print('{0:>8} {1:>8} {2:>18} {3:>18} {4:>8}'.format('disks', 'nodes',
+        'recursive (node/s)', 'iterative (node/s)', 'speedup'))
+    for size in SIZES:
+        domain = DomainGenerator(total_disks=size, total_interfaces=0,
+            total_channels=0).xml_tree
+        total_nodes = sum(1 for _ in domain.iter())
+        assert (converter.representation(node=domain)
+            == XmlToIntermediate(xml_string=domain).representation)
+        number = max(1, 20000 // total_nodes)
+        recursive = best_time(lambda: converter.representation(
+            node=domain), number=number)
+        iterative = best_time(lambda: XmlToIntermediate(xml_string=domain),
+            number=number)
+        print('{0:>8} {1:>8} {2:>18.0f} {3:>18.0f} {4:>8.2f}'.format(size,
+            total_nodes, total_nodes / recursive, total_nodes / iterative,
+            recursive / iterative))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+import fnmatch
+import hashlib
+import os
+import select
+import struct
+import time
+
+from domain_xml_to_intermediate import domain_xml_to_intermediate, \
+    parse_domain_xml
+from lazy_import import LazyModule
+from normalizer_pipeline import NormalizerPipeline
+from xml_filter import CompiledFilter
+
+# Only needed by InotifyWatcher.
+ctypes = LazyModule('ctypes', globals(), 'ctypes')
+ctypes_util = LazyModule('ctypes.util', globals(), 'ctypes_util')
+
+class InotifyWatcher:
+    """Watch a directory for written, moved and deleted files
+
+    Uses the Linux inotify API through the C library, so no extra
+    package is needed. libvirt writes the definitions to a temporary
+    file renamed over the old one, which shows up as a move.
+    """
+
+    # Same values as in <sys/inotify.h>.
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    EVENT_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+    # struct inotify_event without its variable length name.
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, directory):
+        """Class constructor
+
+        Args:
+            directory (str): the directory to watch.
+
+        Raises:
+            OSError: if inotify is not available, e.g. not on Linux.
+        """
+        libc = ctypes.CDLL(ctypes_util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+        self.__file_descriptor = libc.inotify_init1(self.IN_NONBLOCK
+            | self.IN_CLOEXEC)
+        if self.__file_descriptor < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.__file_descriptor,
+                os.fsencode(directory), self.EVENT_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.__file_descriptor)
+            raise OSError(errno, 'inotify_add_watch failed', directory)
+
+    def read(self, timeout=None):
+        """Wait for events and read them
+
+        Args:
+            timeout (float): seconds to wait, forever if None.
+
+        Returns:
+            set: the names of the changed files, None if the kernel
+                queue overflowed and events were lost. Empty on timeout.
+        """
+        readable, _, _ = select.select([self.__file_descriptor], [], [],
+            timeout)
+        names = set()
+        if not readable:
+            return names
+        while True:
+            try:
+                data = os.read(self.__file_descriptor, 65536)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, mask, _, name_length = self.EVENT_HEADER.unpack_from(data,
+                    offset)
+                offset += self.EVENT_HEADER.size
+                if mask & self.IN_Q_OVERFLOW:
+                    names = None
+                elif names is not None:
+                    names.add(os.fsdecode(data[offset:offset
+                        + name_length].rstrip(b'\0')))
+                offset += name_length
+
+    def close(self):
+        if self.__file_descriptor is not None:
+            os.close(self.__file_descriptor)
+            self.__file_descriptor = None
+
+class DefinitionIndex:
+    """Index of the normalized intermediates of a definition directory
+
+    Indexes the domain definitions of a directory, such as the XML files
+    libvirt keeps in /etc/libvirt/qemu and the save_file dumps, by domain
+    name and UUID, so looking a domain up costs a dict access.
+
+    The first scan converts every file. Later scans compare the
+    modification time and size of each file with the recorded ones and
+    only read the files that differ. Those are converted again only
+    when the digest of their content changed too.
+
+    When two files define the same domain, the most recently modified
+    one is used.
+
+    Attributes:
+        errors (dict): the error message of each file that could not be
+            converted, keyed by path.
+    """
+
+    ADDED = 'added'
+    CHANGED = 'changed'
+    REMOVED = 'removed'
+
+    def __init__(self, directory, filter_spec, patterns=('*.xml',),
+            normalizer_pipeline=None):
+        """Class constructor
+
+        Args:
+            directory (str): the definition directory, e.g.
+                '/etc/libvirt/qemu'.
+            filter_spec (dict|CompiledFilter): the filter spec applied to
+                every definition.
+            patterns (iterable): the shell patterns of the file names to
+                index.
+            normalizer_pipeline (NormalizerPipeline): normalizes the
+                intermediates, the default one if None.
+        """
+        if not isinstance(filter_spec, CompiledFilter):
+            filter_spec = CompiledFilter(filter_spec=filter_spec)
+        if normalizer_pipeline is None:
+            normalizer_pipeline = NormalizerPipeline.default()
+        self.directory = directory
+        self.__compiled_filter = filter_spec
+        self.__patterns = tuple(patterns)
+        self.__normalizer_pipeline = normalizer_pipeline
+        # path: (mtime_ns, size, digest, name, uuid, intermediate)
+        self.__files = {}
+        self.__paths_by_name = {}
+        self.__paths_by_uuid = {}
+        self.__by_name = {}
+        self.__by_uuid = {}
+        self.__watcher = None
+        self.errors = {}
+
+    def scan(self):
+        """Bring the index up to date with the whole directory
+
+        Returns:
+            dict: the 'added', 'changed' and 'removed' path lists.
+        """
+        paths = set(os.path.join(self.directory, entry.name)
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and self.__matches(file_name=entry.name))
+        return self.update(paths=paths | set(self.__files)
+            | set(self.errors))
+
+    def update(self, paths):
+        """Bring the index up to date for some files only
+
+        Args:
+            paths (iterable): the paths of the files that may have
+                changed, been added or been removed.
+
+        Returns:
+            dict: the 'added', 'changed' and 'removed' path lists.
+        """
+        changes = {self.ADDED: [], self.CHANGED: [], self.REMOVED: []}
+        for path in sorted(paths):
+            action = self.__update_file(path=path)
+            if action is not None:
+                changes[action].append(path)
+        return changes
+
+    def watch(self, timeout=None, poll=5):
+        """Wait for changes and apply them to the index
+
+        Only the files named by inotify events are checked again. When
+        inotify is not available, the whole directory is scanned every
+        poll seconds instead.
+
+        Args:
+            timeout (float): seconds to wait for changes, forever if
+                None.
+            poll (float): seconds between scans without inotify.
+
+        Returns:
+            dict: the 'added', 'changed' and 'removed' path lists, empty
+                on timeout.
+        """
+        if self.__watcher is None:
+            try:
+                self.__watcher = InotifyWatcher(directory=self.directory)
+            except (OSError, AttributeError):
+                self.__watcher = False
+        if self.__watcher is False:
+            time.sleep(poll if timeout is None else min(poll, timeout))
+            return self.scan()
+        file_names = self.__watcher.read(timeout=timeout)
+        if file_names is None:
+            return self.scan()
+        return self.update(paths=[os.path.join(self.directory, file_name)
+            for file_name in file_names
+            if self.__matches(file_name=file_name)])
+
+    def by_name(self, domain_name):
+        """Get the intermediate of a domain by name, None if unknown"""
+        path = self.__by_name.get(domain_name)
+        return None if path is None else self.__files[path][5]
+
+    def by_uuid(self, domain_uuid):
+        """Get the intermediate of a domain by UUID, None if unknown"""
+        path = self.__by_uuid.get(domain_uuid.lower())
+        return None if path is None else self.__files[path][5]
+
+    def path(self, domain_name):
+        """Get the definition file of a domain, None if unknown"""
+        return self.__by_name.get(domain_name)
+
+    def names(self):
+        return list(self.__by_name)
+
+    def close(self):
+        """Stop watching the directory"""
+        if self.__watcher:
+            self.__watcher.close()
+        self.__watcher = None
+
+    def __matches(self, file_name):
+        return any(fnmatch.fnmatch(file_name, pattern)
+            for pattern in self.__patterns)
+
+    def __update_file(self, path):
+        """Bring the index up to date for one file
+
+        Returns:
+            str: ADDED, CHANGED or REMOVED, None if nothing changed.
+        """
+        entry = self.__files.get(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.errors.pop(path, None)
+            if entry is None:
+                return None
+            self.__remove(path=path)
+            return self.REMOVED
+        if entry is not None and entry[:2] == (stat.st_mtime_ns,
+                stat.st_size):
+            return None
+        try:
+            with open(path, 'rb') as file:
+                xml = file.read()
+        except OSError as e:
+            self.errors[path] = '{0}: {1}'.format(type(e).__name__, e)
+            return None
+        digest = hashlib.blake2b(xml, digest_size=20).digest()
+        if entry is not None and entry[2] == digest:
+            self.__files[path] = (stat.st_mtime_ns, stat.st_size) + entry[2:]
+            # The new mtime may change which file defines the domain.
+            self.__elect_all(domain_name=entry[3], domain_uuid=entry[4])
+            return None
+        try:
+            root = parse_domain_xml(source=xml)
+            domain_name = root.findtext('name')
+            if not domain_name:
+                raise ValueError('domain without name')
+            domain_uuid = root.findtext('uuid')
+            if domain_uuid:
+                domain_uuid = domain_uuid.lower()
+            intermediate = self.__normalizer_pipeline.normalize(
+                intermediate=domain_xml_to_intermediate(source=root,
+                filter_spec=self.__compiled_filter))
+        except Exception as e:
+            self.errors[path] = '{0}: {1}'.format(type(e).__name__, e)
+            if entry is None:
+                return None
+            self.__remove(path=path)
+            return self.REMOVED
+        self.errors.pop(path, None)
+        if entry is not None:
+            self.__remove(path=path)
+        self.__files[path] = (stat.st_mtime_ns, stat.st_size, digest,
+            domain_name, domain_uuid, intermediate)
+        self.__link(path=path, domain_name=domain_name,
+            domain_uuid=domain_uuid)
+        return self.ADDED if entry is None else self.CHANGED
+
+    def __link(self, path, domain_name, domain_uuid):
+        self.__paths_by_name.setdefault(domain_name, set()).add(path)
+        if domain_uuid:
+            self.__paths_by_uuid.setdefault(domain_uuid, set()).add(path)
+        self.__elect_all(domain_name=domain_name, domain_uuid=domain_uuid)
+
+    def __remove(self, path):
+        _, _, _, domain_name, domain_uuid, _ = self.__files.pop(path)
+        self.__paths_by_name[domain_name].discard(path)
+        if domain_uuid:
+            self.__paths_by_uuid[domain_uuid].discard(path)
+        self.__elect_all(domain_name=domain_name, domain_uuid=domain_uuid)
+
+    def __elect_all(self, domain_name, domain_uuid):
+        self.__elect(key=domain_name, paths=self.__paths_by_name,
+            chosen=self.__by_name)
+        if domain_uuid:
+            self.__elect(key=domain_uuid, paths=self.__paths_by_uuid,
+                chosen=self.__by_uuid)
+
+    def __elect(self, key, paths, chosen):
+        """Point a name or UUID at its most recently modified file"""
+        key_paths = paths[key]
+        if not key_paths:
+            del paths[key]
+            chosen.pop(key, None)
+            return
+        chosen[key] = max(key_paths,
+            key=lambda path: (self.__files[path][0], path))
+
+    def __len__(self):
+        return len(self.__by_name)
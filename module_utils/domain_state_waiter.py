@@ -0,0 +1,194 @@
+import threading
+import time
+
+from lazy_import import LazyModule
+
+libvirt = LazyModule('libvirt', globals(), 'libvirt')
+
+# Same value as libvirt.VIR_DOMAIN_EVENT_ID_LIFECYCLE.
+VIR_DOMAIN_EVENT_ID_LIFECYCLE = 0
+
+def start_libvirt_event_loop():
+    """Run the default libvirt event loop in a daemon thread
+
+    Lifecycle events are only delivered when an event loop implementation
+    is registered before the connections are opened. Without it,
+    DomainStateWaiter falls back to polling.
+
+    Returns:
+        Thread: the event loop thread.
+    """
+    libvirt.virEventRegisterDefaultImpl()
+
+    def run_event_loop():
+        while True:
+            libvirt.virEventRunDefaultImpl()
+
+    event_loop_thread = threading.Thread(target=run_event_loop,
+        name='libvirt-event-loop', daemon=True)
+    event_loop_thread.start()
+    return event_loop_thread
+
+class DomainStateWaiter:
+    """Wait for domains to reach a state
+
+    A single lifecycle event callback is registered on the connection,
+    for every domain, and a domain state is only checked again when an
+    event is received for it. The checks still run every max_poll
+    seconds, in case an event is missed.
+
+    When the connection does not deliver events, e.g. because no event
+    loop is running, the states are polled instead. Polling starts every
+    poll seconds and backs off exponentially up to max_poll seconds.
+
+    Any number of domains can be waited on at once, from one or many
+    threads, sharing the same callback.
+
+    Attributes:
+        events_enabled (bool): True if lifecycle events are used.
+    """
+
+    # The values of libvirt.VIR_DOMAIN_* by state name.
+    STATES = {
+        'nostate': 0,
+        'running': 1,
+        'blocked': 2,
+        'paused': 3,
+        'shutdown': 4,
+        'shutoff': 5,
+        'crashed': 6,
+        'pmsuspended': 7
+    }
+
+    def __init__(self, connection, poll=1, max_poll=16, timeout=240,
+            use_events=True, clock=time.monotonic):
+        """Class constructor
+
+        Args:
+            connection (virConnect): the libvirt connection.
+            poll (float): first polling interval, in seconds.
+            max_poll (float): longest polling interval, in seconds, and
+                interval of the safety checks when using events.
+            timeout (float): default wait timeout, in seconds.
+            use_events (bool): False to always poll.
+            clock (callable): monotonic time source, in seconds.
+        """
+        self.__connection = connection
+        self.__poll = poll
+        self.__max_poll = max(poll, max_poll)
+        self.__timeout = timeout
+        self.__clock = clock
+        self.__condition = threading.Condition()
+        # Lifecycle events received per domain name. Each wait compares
+        # them with the counts it last saw, so concurrent waits on the
+        # same domain all see every event.
+        self.__event_counts = {}
+        self.__domains = {}
+        self.__callback_id = None
+        if use_events:
+            try:
+                self.__callback_id = connection.domainEventRegisterAny(None,
+                    VIR_DOMAIN_EVENT_ID_LIFECYCLE, self.__on_lifecycle_event,
+                    None)
+            except Exception:
+                # libvirt raises libvirtError when no event loop is
+                # registered, poll in that case.
+                self.__callback_id = None
+
+    def __on_lifecycle_event(self, connection, domain, event, detail, opaque):
+        with self.__condition:
+            domain_name = domain.name()
+            self.__event_counts[domain_name] = \
+                self.__event_counts.get(domain_name, 0) + 1
+            self.__condition.notify_all()
+
+    def wait(self, domain_name, state, timeout=None):
+        """Wait for a domain to reach a state
+
+        Args:
+            domain_name (str): the domain name.
+            state (str): the state name, one of STATES, e.g. 'shutoff'.
+            timeout (float): seconds to wait, the default timeout if None.
+
+        Returns:
+            bool: True if the state was reached, False on timeout.
+        """
+        return self.wait_many(wanted_states={domain_name: state},
+            timeout=timeout)[domain_name]
+
+    def wait_many(self, wanted_states, timeout=None):
+        """Wait for many domains to reach their states
+
+        Args:
+            wanted_states (dict): the state name of each domain name.
+            timeout (float): seconds to wait for all the domains, the
+                default timeout if None.
+
+        Returns:
+            dict: True for each domain that reached its state, False for
+                the ones still pending at the timeout.
+        """
+        if timeout is None:
+            timeout = self.__timeout
+        deadline = self.__clock() + timeout
+        pending = {domain_name: self.__state_code(state=state)
+            for domain_name, state in wanted_states.items()}
+        reached = dict.fromkeys(pending, False)
+        interval = self.__poll
+        if self.events_enabled:
+            interval = self.__max_poll
+        checked = set(pending)
+        with self.__condition:
+            seen_counts = {domain_name: self.__event_counts.get(domain_name, 0)
+                for domain_name in pending}
+        while True:
+            for domain_name in checked:
+                if self.__domain_state(domain_name) == pending[domain_name]:
+                    reached[domain_name] = True
+                    del pending[domain_name]
+            remaining = deadline - self.__clock()
+            if not pending or remaining <= 0:
+                return reached
+            with self.__condition:
+                notified = self.__condition.wait_for(
+                    lambda: self.__notified(pending=pending,
+                    seen_counts=seen_counts),
+                    timeout=min(interval, remaining))
+                checked = self.__notified(pending=pending,
+                    seen_counts=seen_counts)
+                for domain_name in checked:
+                    seen_counts[domain_name] = \
+                        self.__event_counts[domain_name]
+            if not notified:
+                checked = set(pending)
+                if not self.events_enabled:
+                    interval = min(interval * 2, self.__max_poll)
+
+    def __notified(self, pending, seen_counts):
+        """Get the pending domains with events not seen yet"""
+        return set(domain_name for domain_name in pending
+            if self.__event_counts.get(domain_name, 0)
+            != seen_counts[domain_name])
+
+    def __state_code(self, state):
+        try:
+            return self.STATES[state]
+        except KeyError:
+            raise ValueError('Unknown domain state: {0}'.format(state))
+
+    def __domain_state(self, domain_name):
+        domain = self.__domains.get(domain_name)
+        if domain is None:
+            domain = self.__domains[domain_name] = \
+                self.__connection.lookupByName(domain_name)
+        return domain.state()[0]
+
+    def close(self):
+        """Deregister the event callback"""
+        if self.__callback_id is not None:
+            self.__connection.domainEventDeregisterAny(self.__callback_id)
+            self.__callback_id = None
+
+    @property
+    def events_enabled(self):
+        return self.__callback_id is not None
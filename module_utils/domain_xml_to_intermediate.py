@@ -0,0 +1,50 @@
+from lazy_import import LazyModule
+from xml_filter import CompiledFilter
+from xml_to_intermediate import XmlToIntermediate
+
+etree = LazyModule('lxml.etree', globals(), 'etree')
+
+def parse_domain_xml(source):
+    """Parse a domain XML source into its root element
+
+    Args:
+        source (str|bytes|file|Element): the xml string or bytes, a file
+            name, a file object or an already parsed element or tree.
+
+    Returns:
+        Element: the root element of the XML.
+    """
+    if etree.iselement(source):
+        return source
+    if isinstance(source, etree._ElementTree):
+        return source.getroot()
+    if isinstance(source, bytes):
+        return etree.fromstring(source)
+    if isinstance(source, str) and source.lstrip().startswith('<'):
+        return etree.fromstring(source)
+    return etree.parse(source).getroot()
+
+def domain_xml_to_intermediate(source, filter_spec):
+    """Convert a libvirt domain XML to a filtered intermediate
+
+    Single pass equivalent of XmlFilter followed by XmlToIntermediate:
+    the source is parsed once and the filtered tree is handed over as a
+    live element, without serializing and reparsing it.
+
+    Args:
+        source (str|bytes|file|Element): the domain xml, see
+            parse_domain_xml.
+        filter_spec (dict|CompiledFilter): the filter spec or an already
+            compiled filter to be reused.
+
+    Returns:
+        dict: the filtered intermediate representation or None if the
+            root element is not in the filter spec.
+    """
+    if not isinstance(filter_spec, CompiledFilter):
+        filter_spec = CompiledFilter(filter_spec=filter_spec)
+    filtered_xml_tree = filter_spec.apply(
+        input_xml_tree=parse_domain_xml(source=source))
+    if filtered_xml_tree is None:
+        return None
+    return XmlToIntermediate(xml_string=filtered_xml_tree).representation
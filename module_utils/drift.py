@@ -0,0 +1,304 @@
+"""Check domain definitions for drift against module parameters
+
+Runs offline against domain XML files, e.g. the definitions dumped
+from a hypervisor, and a YAML or JSON file with the libvirt_domain
+module parameters of each domain, keyed by domain name:
+
+    python -m module_utils.drift --params params.yml /path/to/xml/dir
+
+or, with the libvirt Python bindings, against the domains defined on a
+hypervisor:
+
+    python -m module_utils.drift --params params.yml --uri qemu:///system
+
+Domain XML files are checked in a process pool, in chunks. One JSON line
+is written per domain as soon as its chunk completes and the throughput is
+reported on stderr. The exit status is 1 if any domain drifted, is
+missing or failed to be checked, else 0.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# The modules in this directory import each other by their plain names,
+# so make them importable when running as module_utils.drift.
+MODULE_UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+if MODULE_UTILS_DIR not in sys.path:
+    sys.path.insert(0, MODULE_UTILS_DIR)
+
+from domain_xml_to_intermediate import domain_xml_to_intermediate
+from intermediate_diff import IntermediateDiff
+from libvirt_connection import LibvirtConnectionManager
+from module_to_intermediate import ModuleToIntermediate
+from normalizer_pipeline import NormalizerPipeline
+from xml_filter import CompiledFilter
+
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+class ModuleParameters:
+    """Stand-in for AnsibleModule, holding only its params"""
+
+    def __init__(self, params):
+        self.params = params
+
+class DriftChecker:
+    """Compare domain XML files with libvirt_domain module parameters
+
+    Attributes:
+        params (dict): module parameters keyed by domain name.
+    """
+
+    FILTER_SPEC = {
+        'domain': {
+            '__attributes__': ['type'],
+            'name': {},
+            'uuid': {},
+            'title': {'required': False},
+            'description': {'required': False},
+            'memory': {'__attributes__': ['unit']},
+            'currentMemory': {'__attributes__': ['unit']},
+            'vcpu': {
+                '__attributes__': ['current']
+            },
+            'os': {
+                'type': {}
+            }
+        }
+    }
+
+    IN_SYNC = 'in_sync'
+    DRIFT = 'drift'
+    UNMANAGED = 'unmanaged'
+    MISSING = 'missing'
+    ERROR = 'error'
+
+    def __init__(self, params):
+        """Class constructor
+
+        Args:
+            params (dict): module parameters keyed by domain name. The
+                domain name is added as the 'name' parameter.
+        """
+        self.params = params
+        self.__compiled_filter = CompiledFilter(filter_spec=self.FILTER_SPEC)
+        self.__normalizer_pipeline = NormalizerPipeline.default()
+
+    def check_file(self, path):
+        """Check a domain XML file
+
+        Args:
+            path (str): the domain XML file.
+
+        Returns:
+            dict: the result, with the 'domain', 'file', 'status' and
+                'changes' keys, plus 'error' when the check failed.
+        """
+        return self.check_xml(source=path, file=path)
+
+    def check_xml(self, source, file=None):
+        """Check a domain XML
+
+        Args:
+            source (str|bytes|Element): the domain XML, a file name or
+                an already parsed element, as parse_domain_xml accepts.
+            file (str): the value of the result 'file' key.
+
+        Returns:
+            dict: the result, as check_file returns it.
+        """
+        result = {'domain': None, 'file': file, 'status': None,
+            'changes': []}
+        try:
+            domain_intermediate = domain_xml_to_intermediate(source=source,
+                filter_spec=self.__compiled_filter)
+            domain_name = self.__domain_name(intermediate=domain_intermediate)
+            result['domain'] = domain_name
+            if domain_name not in self.params:
+                result['status'] = self.UNMANAGED
+                return result
+            module_intermediate = self.module_intermediate(
+                domain_name=domain_name)
+            diff = IntermediateDiff(
+                old=self.__normalizer_pipeline.normalize(
+                    intermediate=domain_intermediate),
+                new=self.__normalizer_pipeline.normalize(
+                    intermediate=module_intermediate))
+        except Exception as e:
+            result['status'] = self.ERROR
+            result['error'] = '{0}: {1}'.format(type(e).__name__, e)
+            return result
+        result['changes'] = [change._asdict() for change in diff.changes]
+        result['status'] = self.DRIFT if diff.changes else self.IN_SYNC
+        return result
+
+    def module_intermediate(self, domain_name):
+        """Build the intermediate for a domain from its parameters"""
+        parameters = dict(self.params[domain_name], name=domain_name)
+        return ModuleToIntermediate(libvirt_domain_module=ModuleParameters(
+            params=parameters)).representation
+
+    def __domain_name(self, intermediate):
+        if intermediate is None:
+            raise ValueError('not a libvirt domain definition')
+        for child in intermediate.get('children', ()):
+            if child['element_name'] == 'name':
+                return child.get('text')
+        raise ValueError('domain without name')
+
+def load_params(path):
+    """Load module parameters from a YAML or JSON file
+
+    The file holds either a mapping of domain name to parameters or a
+    list of parameters with a 'name' key.
+
+    Returns:
+        dict: the parameters keyed by domain name.
+    """
+    with open(path, 'r') as file:
+        if path.endswith(('.yml', '.yaml')):
+            if not HAS_YAML:
+                raise RuntimeError('PyYAML is needed to read {0}'.format(path))
+            params = yaml.safe_load(file)
+        else:
+            params = json.load(file)
+    if isinstance(params, list):
+        return {domain_params['name']: domain_params
+            for domain_params in params}
+    return params
+
+def find_xml_files(paths):
+    """Expand directories into the XML files they contain"""
+    xml_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            xml_files.extend(sorted(glob.glob(os.path.join(path, '*.xml'))))
+        else:
+            xml_files.append(path)
+    return xml_files
+
+# Each worker process builds its checker once, in the pool initializer.
+_worker_checker = None
+
+def _init_worker(params):
+    global _worker_checker
+    _worker_checker = DriftChecker(params=params)
+
+def _check_chunk(paths):
+    return [_worker_checker.check_file(path=path) for path in paths]
+
+def check_files(xml_files, params, workers=None, chunk_size=16):
+    """Check domain XML files, yielding results as chunks complete
+
+    Args:
+        xml_files (list): the domain XML files.
+        params (dict): module parameters keyed by domain name.
+        workers (int): number of worker processes, the CPU count if
+            None, 0 to check in the current process.
+        chunk_size (int): number of files sent to a worker at once.
+
+    Yields:
+        dict: a DriftChecker.check_file result per file, then a MISSING
+            result for each domain with parameters but no XML file.
+    """
+    if workers == 0:
+        checker = DriftChecker(params=params)
+        results = (checker.check_file(path=path) for path in xml_files)
+    else:
+        results = _check_in_pool(xml_files=xml_files, params=params,
+            workers=workers, chunk_size=chunk_size)
+    return _add_missing(results=results, params=params)
+
+def check_uri(uri, params, connection_manager=None):
+    """Check the domains defined on a libvirt URI
+
+    The persistent definitions are fetched at once through the pooled
+    connection and checked in the current process.
+
+    Args:
+        uri (str): the libvirt URI, e.g. 'qemu:///system'.
+        params (dict): module parameters keyed by domain name.
+        connection_manager (LibvirtConnectionManager): the connection
+            pool, the process wide one if None.
+
+    Yields:
+        dict: a DriftChecker.check_xml result per domain, with the
+            domain URI as 'file', then a MISSING result for each domain
+            with parameters but no definition.
+    """
+    if connection_manager is None:
+        connection_manager = LibvirtConnectionManager.shared()
+    checker = DriftChecker(params=params)
+    domain_xmls = connection_manager.domain_xmls(uri=uri)
+    results = (checker.check_xml(source=xml, file=uri)
+        for _, xml in sorted(domain_xmls.items()))
+    return _add_missing(results=results, params=params)
+
+def _add_missing(results, params):
+    seen_domains = set()
+    for result in results:
+        seen_domains.add(result['domain'])
+        yield result
+    for domain_name in sorted(set(params) - seen_domains):
+        yield {'domain': domain_name, 'file': None,
+            'status': DriftChecker.MISSING, 'changes': []}
+
+def _check_in_pool(xml_files, params, workers, chunk_size):
+    chunks = [xml_files[index:index + chunk_size]
+        for index in range(0, len(xml_files), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+            initargs=(params,)) as executor:
+        futures = [executor.submit(_check_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
+
+def main(argv=None, output=sys.stdout, report=sys.stderr):
+    parser = argparse.ArgumentParser(prog='python -m module_utils.drift',
+        description='Check domain XML files for drift against '
+        'libvirt_domain module parameters.')
+    parser.add_argument('paths', nargs='*',
+        help='domain XML files or directories of XML files')
+    parser.add_argument('--uri',
+        help='check the domains defined on this libvirt URI instead')
+    parser.add_argument('--params', required=True,
+        help='YAML or JSON file with module parameters by domain name')
+    parser.add_argument('--workers', type=int, default=None,
+        help='worker processes, CPU count by default, 0 for none')
+    parser.add_argument('--chunk-size', type=int, default=16,
+        help='files sent to a worker at once (default: 16)')
+    args = parser.parse_args(argv)
+    if bool(args.paths) == bool(args.uri):
+        parser.error('give either paths or --uri')
+    params = load_params(path=args.params)
+    start = time.perf_counter()
+    if args.uri:
+        results = check_uri(uri=args.uri, params=params)
+    else:
+        results = check_files(xml_files=find_xml_files(paths=args.paths),
+            params=params, workers=args.workers, chunk_size=args.chunk_size)
+    total_checked = 0
+    failed = False
+    for result in results:
+        output.write(json.dumps(result, sort_keys=True) + '\n')
+        output.flush()
+        if result['file'] is not None:
+            total_checked += 1
+        if result['status'] not in (DriftChecker.IN_SYNC,
+                DriftChecker.UNMANAGED):
+            failed = True
+    elapsed = time.perf_counter() - start
+    report.write('checked {0} domains in {1:.3f}s ({2:.1f} domains/s)\n'
+        .format(total_checked, elapsed, total_checked / elapsed
+        if elapsed else 0.0))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
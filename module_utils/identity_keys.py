@@ -0,0 +1,124 @@
+from intermediate_access import (element_attribute, element_child,
+    element_name, element_text)
+
+class IdentityKeys:
+    """Identity keys of repeated elements
+
+    Repeated elements, such as devices, are identified by a key taken
+    from their content instead of by their position, so matching them
+    does not depend on the order libvirt dumps them in.
+
+    A key spec is a path relative to the element: 'target/@dev' is the
+    dev attribute of the target child, '@type' is the element type
+    attribute and 'model' is the text of the model child. A tuple of
+    paths makes a composite key.
+    """
+
+    DEFAULT_KEYS = {
+        'channel': 'target/@name',
+        'controller': ('@type', '@index'),
+        'disk': 'target/@dev',
+        'interface': 'mac/@address'
+    }
+
+    def __init__(self, keys=None):
+        """Class constructor
+
+        Args:
+            keys (dict): element name to key spec, DEFAULT_KEYS if None.
+        """
+        if keys is None:
+            keys = self.DEFAULT_KEYS
+        self.__keys = {}
+        for element_name, key_spec in keys.items():
+            if isinstance(key_spec, str):
+                key_spec = (key_spec,)
+            self.__keys[element_name] = tuple(self.__compile(path=path)
+                for path in key_spec)
+
+    def __compile(self, path):
+        """Split a key path into child names and attribute name
+
+        Returns:
+            tuple: the original path, the tuple of child element names
+                and the attribute name, None to use the text.
+        """
+        steps = path.split('/')
+        attribute_name = None
+        if steps[-1].startswith('@'):
+            attribute_name = steps.pop()[1:]
+        return (path, tuple(steps), attribute_name)
+
+    def key(self, element):
+        """Get the identity key of an element
+
+        Args:
+            element (dict|IntermediateNode): the element.
+
+        Returns:
+            tuple: the key values, in key spec order, or None if the
+                element has no key spec or any key value is missing.
+        """
+        compiled_paths = self.__keys.get(element_name(element))
+        if compiled_paths is None:
+            return None
+        key = []
+        for _, child_names, attribute_name in compiled_paths:
+            value = self.__value(element=element, child_names=child_names,
+                attribute_name=attribute_name)
+            if value is None:
+                return None
+            key.append(value)
+        return tuple(key)
+
+    def predicate(self, element_name, key):
+        """Format a key as XPath predicates
+
+        Returns:
+            str: e.g. "[target/@dev='vda']".
+        """
+        return ''.join("[{0}='{1}']".format(path, value) for (path, _, _),
+            value in zip(self.__keys[element_name], key))
+
+    def sort_key(self, element):
+        """Sort key ordering siblings by element name and identity key
+
+        Elements without an identity key go after the keyed ones with
+        the same element name, keeping their relative order.
+        """
+        key = self.key(element=element)
+        if key is None:
+            return (element_name(element), 1, ())
+        return (element_name(element), 0, key)
+
+    def group(self, children):
+        """Group siblings by identity key
+
+        Args:
+            children (list): the sibling elements.
+
+        Returns:
+            tuple: a dict mapping (element name, key) to the index of the
+                keyed child and the list of indexes of the children
+                without a key. Children repeating an already seen key are
+                treated as not keyed.
+        """
+        keyed = {}
+        unkeyed = []
+        for index, child in enumerate(children):
+            key = self.key(element=child)
+            group_key = (element_name(child), key)
+            if key is None or group_key in keyed:
+                unkeyed.append(index)
+                continue
+            keyed[group_key] = index
+        return keyed, unkeyed
+
+    def __value(self, element, child_names, attribute_name):
+        for child_name in child_names:
+            element = element_child(element, child_name)
+            if element is None:
+                return None
+        if attribute_name is None:
+            return element_text(element)
+        return element_attribute(element, attribute_name)
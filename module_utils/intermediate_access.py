@@ -0,0 +1,62 @@
+from intermediate_node import IntermediateNode
+
+def element_name(element):
+    """Get the element name of a dict or IntermediateNode element"""
+    if isinstance(element, IntermediateNode):
+        return element.element_name
+    return element['element_name']
+
+def element_text(element):
+    """Get the text of an element, None if it has none"""
+    if isinstance(element, IntermediateNode):
+        return element.text
+    return element.get('text')
+
+def element_children(element):
+    """Get the children of an element, in document order"""
+    if isinstance(element, IntermediateNode):
+        return element.children
+    return element.get('children', ())
+
+def element_child(element, element_name):
+    """Get the first child of an element with a name, None if none"""
+    if isinstance(element, IntermediateNode):
+        return element.child(element_name=element_name)
+    for child in element.get('children', ()):
+        if child['element_name'] == element_name:
+            return child
+    return None
+
+def element_attribute(element, attribute_name):
+    """Get an attribute value of an element, None if it has none"""
+    if isinstance(element, IntermediateNode):
+        return element.get_attribute(attribute_name=attribute_name)
+    for attribute in element.get('attributes', ()):
+        if attribute['attribute_name'] == attribute_name:
+            return attribute['attribute_value']
+    return None
+
+def sorted_attributes(element):
+    """Get the attributes of an element
+
+    Returns:
+        list: (name, value) pairs sorted by name, so dict and
+            IntermediateNode elements with the same attributes give the
+            same list.
+    """
+    if isinstance(element, IntermediateNode):
+        return list(element.attributes)
+    return sorted((attribute['attribute_name'], attribute['attribute_value'])
+        for attribute in element.get('attributes', ()))
+
+def group_children(element):
+    """Group the children of an element by element name
+
+    Returns:
+        dict: the list of children of each element name, in document
+            order.
+    """
+    groups = {}
+    for child in element_children(element):
+        groups.setdefault(element_name(child), []).append(child)
+    return groups
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from domain_xml_to_intermediate import domain_xml_to_intermediate
+from lazy_import import LazyModule
+from normalizer_pipeline import NormalizerPipeline
+
+# Only needed for the on-disk cache.
+tempfile = LazyModule('tempfile', globals(), 'tempfile')
+
+class IntermediateCache:
+    """Content addressed LRU cache of normalized domain intermediates
+
+    Entries are keyed by a digest of the raw XML bytes and of the filter
+    spec, and hold the filtered intermediate already passed through the
+    default NormalizerPipeline, which skips the memory elements left
+    out by the filter spec or the XML. The cache is bounded by number
+    of entries and by the total size of the cached XML sources, evicting
+    the least recently used entries first. The size bound counts the
+    source XML bytes, not the memory used by the cached intermediates,
+    which depends on how much of each XML the filter spec keeps.
+
+    When a cache directory is given, every computed intermediate is also
+    written there as a JSON file named after its key, so separate module
+    invocations on the same hypervisor can share results. The directory
+    is not bounded by the LRU limits.
+
+    The returned intermediates are shared with the cache and must be
+    treated as read-only.
+
+    Attributes:
+        hits (int): lookups answered from memory.
+        disk_hits (int): lookups answered from the cache directory.
+        misses (int): lookups that had to convert the XML.
+        evictions (int): entries evicted from memory.
+    """
+
+    # Bump when the conversion output changes, so stale files in a
+    # shared cache directory are not used.
+    FORMAT_VERSION = 1
+
+    def __init__(self, max_entries=1024, max_bytes=None, cache_dir=None):
+        """Class constructor
+
+        Args:
+            max_entries (int): maximum number of entries kept in memory,
+                None for no limit.
+            max_bytes (int): maximum total size, in bytes, of the XML
+                sources whose intermediates are kept in memory, None for
+                no limit. It does not bound the memory used by the
+                intermediates themselves.
+            cache_dir (str): optional directory used as on disk backing,
+                e.g. under the Ansible tmp dir. Created if missing.
+        """
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.__entries = OrderedDict()
+        self.__total_bytes = 0
+        self.__normalizer_pipeline = NormalizerPipeline.default()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, xml, filter_spec):
+        """Get the normalized intermediate for a domain XML
+
+        Args:
+            xml (str|bytes): the raw domain xml.
+            filter_spec (dict): the filter spec.
+
+        Returns:
+            dict: the filtered and memory normalized intermediate.
+        """
+        if isinstance(xml, str):
+            xml = xml.encode()
+        key = self.key(xml=xml, filter_spec=filter_spec)
+        entry = self.__entries.get(key)
+        if entry is not None:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        intermediate = self.__load(key=key)
+        if intermediate is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            intermediate = domain_xml_to_intermediate(source=xml,
+                filter_spec=filter_spec)
+            if intermediate is not None:
+                intermediate = self.__normalizer_pipeline.normalize(
+                    intermediate=intermediate)
+            self.__store(key=key, intermediate=intermediate)
+        self.__add(key=key, intermediate=intermediate, size=len(xml))
+        return intermediate
+
+    def key(self, xml, filter_spec):
+        """Compute the cache key for a domain XML and a filter spec
+
+        Args:
+            xml (bytes): the raw domain xml.
+            filter_spec (dict): the filter spec.
+
+        Returns:
+            str: the hexadecimal cache key.
+        """
+        key_hash = hashlib.blake2b(digest_size=20)
+        key_hash.update(self.__spec_digest(filter_spec=filter_spec))
+        key_hash.update(xml)
+        return key_hash.hexdigest()
+
+    def __spec_digest(self, filter_spec):
+        # Hashed on every call, as a spec can be changed in place between
+        # lookups. It only holds a handful of names.
+        spec_json = json.dumps([self.FORMAT_VERSION, filter_spec],
+            sort_keys=True)
+        return hashlib.blake2b(spec_json.encode(), digest_size=20).digest()
+
+    def __add(self, key, intermediate, size):
+        self.__entries[key] = (intermediate, size)
+        self.__total_bytes += size
+        while self.__entries and self.__over_limits():
+            _, (_, evicted_size) = self.__entries.popitem(last=False)
+            self.__total_bytes -= evicted_size
+            self.evictions += 1
+
+    def __over_limits(self):
+        if (self.__max_entries is not None
+                and len(self.__entries) > self.__max_entries):
+            return True
+        if (self.__max_bytes is not None
+                and self.__total_bytes > self.__max_bytes):
+            return True
+        return False
+
+    def __entry_path(self, key):
+        return os.path.join(self.__cache_dir, '{0}.json'.format(key))
+
+    def __load(self, key):
+        if self.__cache_dir is None:
+            return None
+        try:
+            with open(self.__entry_path(key=key), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def __store(self, key, intermediate):
+        """Write an entry atomically so concurrent readers never see a
+        partial file"""
+        if self.__cache_dir is None:
+            return
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.__cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'w') as file:
+                json.dump(intermediate, file)
+            os.replace(temporary_path, self.__entry_path(key=key))
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def clear(self):
+        """Drop every entry kept in memory"""
+        self.__entries.clear()
+        self.__total_bytes = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @property
+    def total_bytes(self):
+        """Total size of the XML sources of the entries in memory"""
+        return self.__total_bytes
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self.__entries),
+            'bytes': self.__total_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,41 @@
+from intermediate_node import IntermediateNode
+
+def copy_element(element):
+    """Copy an element so its text and attributes can be changed
+
+    The copy gets its own attributes, but shares the children with the
+    original element.
+
+    Args:
+        element (dict|IntermediateNode): the element to copy.
+
+    Returns:
+        dict|IntermediateNode: the element copy.
+    """
+    if isinstance(element, IntermediateNode):
+        return element.copy()
+    element_copy = dict(element)
+    if 'attributes' in element:
+        element_copy['attributes'] = [dict(attribute)
+            for attribute in element['attributes']]
+    return element_copy
+
+def copy_with_children(element, children):
+    """Copy an element replacing its children
+
+    Attributes and text are shared with the original element.
+
+    Args:
+        element (dict|IntermediateNode): the element to copy.
+        children (list): the children for the copy.
+
+    Returns:
+        dict|IntermediateNode: the element copy.
+    """
+    if isinstance(element, IntermediateNode):
+        element_copy = element.copy()
+        element_copy.children = children
+        return element_copy
+    element_copy = dict(element)
+    element_copy['children'] = list(children)
+    return element_copy
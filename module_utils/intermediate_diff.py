@@ -0,0 +1,225 @@
+from collections import namedtuple
+
+from identity_keys import IdentityKeys
+from intermediate_access import (element_name, element_text,
+    group_children, sorted_attributes)
+from intermediate_hasher import IntermediateHasher
+
+Change = namedtuple('Change', ['action', 'target', 'path', 'name',
+    'old_value', 'new_value'])
+Change.__doc__ = """A single difference between two intermediates
+
+Attributes:
+    action (str): IntermediateDiff.ADDED, REMOVED or CHANGED.
+    target (str): IntermediateDiff.ELEMENT, ATTRIBUTE or TEXT.
+    path (str): the element path, e.g. 'domain/devices/disk[2]'.
+    name (str): the attribute name for attribute changes, else None.
+    old_value: the old text, attribute value or element, None if added.
+    new_value: the new text, attribute value or element, None if removed.
+"""
+
+class IntermediateDiff:
+    """Minimal difference between two intermediate representations
+
+    Subtrees with equal digests are skipped without being visited, so
+    the cost is proportional to the differences and not to the size of
+    the documents. Repeated siblings with an identity key, such as disks
+    by target dev, are matched by key. The others are matched by content
+    first, so identical elements pair up whatever their position, and
+    only the remaining ones are paired in document order.
+
+    Elements may be dicts or IntermediateNode objects, or a mix of both.
+
+    Paths use the element names from the root, as in XPath. Keyed
+    elements get their key as a predicate, e.g.
+    "domain/devices/disk[target/@dev='vda']", and other siblings sharing
+    their element name get a 1-based index.
+
+    Attributes:
+        changes (list): the Change list, empty when both intermediates
+            are equal.
+    """
+
+    ADDED = 'added'
+    REMOVED = 'removed'
+    CHANGED = 'changed'
+
+    ELEMENT = 'element'
+    ATTRIBUTE = 'attribute'
+    TEXT = 'text'
+
+    def __init__(self, old, new, hasher=None, identity_keys=None):
+        """Class constructor
+
+        Args:
+            old (dict|IntermediateNode): the current intermediate, e.g.
+                from the domain XML.
+            new (dict|IntermediateNode): the wanted intermediate, e.g.
+                from the module parameters.
+            hasher (IntermediateHasher): the hasher of the elements, a
+                new one by default.
+            identity_keys (IdentityKeys): the identity keys of repeated
+                elements, IdentityKeys defaults if None.
+        """
+        if hasher is None:
+            hasher = IntermediateHasher()
+        if identity_keys is None:
+            identity_keys = IdentityKeys()
+        self.__hasher = hasher
+        self.__identity_keys = identity_keys
+        self.__changes = []
+        # Both intermediates stay alive and unmodified during the diff,
+        # so their digests are computed once and shared by all of it.
+        self.__digests = {}
+        if element_name(old) != element_name(new):
+            self.__changes.append(Change(self.CHANGED, self.ELEMENT,
+                element_name(old), None, old, new))
+        else:
+            self.__diff_element(old=old, new=new, path=element_name(old))
+        self.__digests = None
+
+    def __diff_element(self, old, new, path):
+        if self.__hasher.equal(left=old, right=new, cache=self.__digests):
+            return
+        self.__diff_text(old=old, new=new, path=path)
+        self.__diff_attributes(old=old, new=new, path=path)
+        self.__diff_children(old=old, new=new, path=path)
+
+    def __diff_text(self, old, new, path):
+        old_text = element_text(old)
+        new_text = element_text(new)
+        if old_text == new_text:
+            return
+        self.__changes.append(Change(self.__action(old_value=old_text,
+            new_value=new_text), self.TEXT, path, None, old_text, new_text))
+
+    def __diff_attributes(self, old, new, path):
+        old_attributes = dict(sorted_attributes(old))
+        new_attributes = dict(sorted_attributes(new))
+        if old_attributes == new_attributes:
+            return
+        for attribute_name in sorted(set(old_attributes)
+                | set(new_attributes)):
+            old_value = old_attributes.get(attribute_name)
+            new_value = new_attributes.get(attribute_name)
+            if old_value != new_value:
+                self.__changes.append(Change(self.__action(
+                    old_value=old_value, new_value=new_value),
+                    self.ATTRIBUTE, path, attribute_name, old_value,
+                    new_value))
+
+    def __diff_children(self, old, new, path):
+        old_groups = group_children(old)
+        new_groups = group_children(new)
+        for element_name in sorted(set(old_groups) | set(new_groups)):
+            old_children = old_groups.get(element_name, [])
+            new_children = new_groups.get(element_name, [])
+            repeated = max(len(old_children), len(new_children)) > 1
+            child_path = '{0}/{1}'.format(path, element_name)
+            pairs, removed, added = self._match_children(
+                old_children=old_children, new_children=new_children)
+            for old_index, new_index in pairs:
+                old_child = old_children[old_index]
+                self.__diff_element(old=old_child, new=new_children[new_index],
+                    path=self.__child_path(path=child_path, child=old_child,
+                    index=old_index, repeated=repeated))
+            for old_index in removed:
+                old_child = old_children[old_index]
+                self.__changes.append(Change(self.REMOVED, self.ELEMENT,
+                    self.__child_path(path=child_path, child=old_child,
+                    index=old_index, repeated=repeated), None, old_child,
+                    None))
+            for new_index in added:
+                new_child = new_children[new_index]
+                self.__changes.append(Change(self.ADDED, self.ELEMENT,
+                    self.__child_path(path=child_path, child=new_child,
+                    index=new_index, repeated=repeated), None, None,
+                    new_child))
+
+    def _match_children(self, old_children, new_children):
+        """Match siblings sharing an element name
+
+        Siblings with an identity key are paired by key, in O(n) hash
+        lookups, and keyed siblings whose key is only on one side are
+        added or removed. Siblings without a key are paired by digest
+        first and then in document order.
+
+        Args:
+            old_children (list): the old siblings.
+            new_children (list): the new siblings.
+
+        Returns:
+            tuple: the list of (old index, new index) pairs, the list of
+                unmatched old indexes and the list of unmatched new
+                indexes.
+        """
+        old_keyed, old_unkeyed = self.__identity_keys.group(
+            children=old_children)
+        new_keyed, new_unkeyed = self.__identity_keys.group(
+            children=new_children)
+        pairs = []
+        removed = []
+        added = []
+        for group_key, old_index in old_keyed.items():
+            new_index = new_keyed.get(group_key)
+            if new_index is None:
+                removed.append(old_index)
+            else:
+                pairs.append((old_index, new_index))
+        added.extend(new_index for group_key, new_index in new_keyed.items()
+            if group_key not in old_keyed)
+        unkeyed_pairs, unkeyed_removed, unkeyed_added = self.__match_unkeyed(
+            old_children=old_children, new_children=new_children,
+            old_indexes=old_unkeyed, new_indexes=new_unkeyed)
+        pairs.extend(unkeyed_pairs)
+        removed.extend(unkeyed_removed)
+        added.extend(unkeyed_added)
+        return sorted(pairs), sorted(removed), sorted(added)
+
+    def __match_unkeyed(self, old_children, new_children, old_indexes,
+            new_indexes):
+        if len(old_indexes) == 1 and len(new_indexes) == 1:
+            return [(old_indexes[0], new_indexes[0])], [], []
+        # Indexes are stored in reverse so pop() returns the first one.
+        old_by_digest = {}
+        for old_index in reversed(old_indexes):
+            old_by_digest.setdefault(self.__hasher.digest(
+                element=old_children[old_index], cache=self.__digests),
+                []).append(old_index)
+        pairs = []
+        unmatched_new = []
+        for new_index in new_indexes:
+            candidates = old_by_digest.get(self.__hasher.digest(
+                element=new_children[new_index], cache=self.__digests))
+            if candidates:
+                pairs.append((candidates.pop(), new_index))
+            else:
+                unmatched_new.append(new_index)
+        matched_old = set(old_index for old_index, _ in pairs)
+        unmatched_old = [old_index for old_index in old_indexes
+            if old_index not in matched_old]
+        total_positional = min(len(unmatched_old), len(unmatched_new))
+        pairs.extend(zip(unmatched_old[:total_positional],
+            unmatched_new[:total_positional]))
+        return (pairs, unmatched_old[total_positional:],
+            unmatched_new[total_positional:])
+
+    def __child_path(self, path, child, index, repeated):
+        key = self.__identity_keys.key(element=child)
+        if key is not None:
+            return path + self.__identity_keys.predicate(
+                element_name=element_name(child), key=key)
+        if repeated:
+            return '{0}[{1}]'.format(path, index + 1)
+        return path
+
+    def __action(self, old_value, new_value):
+        if old_value is None:
+            return self.ADDED
+        if new_value is None:
+            return self.REMOVED
+        return self.CHANGED
+
+    @property
+    def changes(self):
+        return self.__changes
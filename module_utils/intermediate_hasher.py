@@ -0,0 +1,128 @@
+import hashlib
+
+from intermediate_access import (element_children, element_name,
+    element_text, group_children, sorted_attributes)
+
+class IntermediateHasher:
+    """Merkle style content digests for intermediate representations
+
+    The digest of an element is computed bottom-up from its element
+    name, its attributes sorted by name, its text and the digests of its
+    children, in order. Two intermediates are equal if and only if their
+    digests are equal, so checking a whole domain costs one comparison
+    and a diff only needs to descend into children whose digests differ.
+
+    Digests are only cached for the duration of an operation, such as
+    one digest() call over a whole intermediate, so nothing is kept
+    alive by the hasher and an element modified after being hashed gets
+    its new digest the next time.
+    """
+
+    DIGEST_SIZE = 16
+
+    def digest(self, element, cache=None):
+        """Get the content digest of an element
+
+        Args:
+            element (dict|IntermediateNode): an intermediate
+                representation element. Dict and IntermediateNode
+                elements with the same content have the same digest.
+            cache (dict): the digests already computed, keyed by
+                id(element), to share between the calls of an operation
+                over elements that stay alive and unmodified meanwhile,
+                e.g. a diff. A cache local to the call if None.
+
+        Returns:
+            bytes: the element digest.
+        """
+        if cache is None:
+            cache = {}
+        element_digest = cache.get(id(element))
+        if element_digest is not None:
+            return element_digest
+        element_hash = hashlib.blake2b(digest_size=self.DIGEST_SIZE)
+        self.__update_field(element_hash, element_name(element))
+        attributes = sorted_attributes(element)
+        element_hash.update(len(attributes).to_bytes(4, 'big'))
+        for attribute_name, attribute_value in attributes:
+            self.__update_field(element_hash, attribute_name)
+            self.__update_field(element_hash, attribute_value)
+        self.__update_field(element_hash, element_text(element))
+        children = element_children(element)
+        element_hash.update(len(children).to_bytes(4, 'big'))
+        for child in children:
+            element_hash.update(self.digest(element=child, cache=cache))
+        element_digest = element_hash.digest()
+        cache[id(element)] = element_digest
+        return element_digest
+
+    def __update_field(self, element_hash, value):
+        """Feed a length prefixed value so fields cannot run together
+
+        None is fed as a distinct marker so a missing text does not hash
+        like an empty one.
+        """
+        if value is None:
+            element_hash.update(b'\x00')
+            return
+        encoded_value = str(value).encode()
+        element_hash.update(b'\x01')
+        element_hash.update(len(encoded_value).to_bytes(4, 'big'))
+        element_hash.update(encoded_value)
+
+    def equal(self, left, right, cache=None):
+        """Check if two intermediates have the same content
+
+        Args:
+            cache (dict): shared digest cache, as for digest().
+        """
+        return (self.digest(element=left, cache=cache)
+            == self.digest(element=right, cache=cache))
+
+    def changed_paths(self, left, right):
+        """List the paths of the elements whose own content differs
+
+        Only children with different digests are visited. Children are
+        paired by element name and position among the siblings with the
+        same name; repeated siblings get a 1-based index in the path, as
+        in XPath.
+
+        Args:
+            left (dict|IntermediateNode): an intermediate representation.
+            right (dict|IntermediateNode): the intermediate
+                representation to compare.
+
+        Returns:
+            list: the changed paths, e.g. ['domain/currentMemory'].
+        """
+        changed_paths = []
+        if element_name(left) != element_name(right):
+            return [element_name(left)]
+        self.__collect_changed_paths(left=left, right=right,
+            path=element_name(left), changed_paths=changed_paths, cache={})
+        return changed_paths
+
+    def __collect_changed_paths(self, left, right, path, changed_paths,
+            cache):
+        if self.equal(left=left, right=right, cache=cache):
+            return
+        if (element_text(left) != element_text(right)
+                or sorted_attributes(left) != sorted_attributes(right)):
+            changed_paths.append(path)
+        left_groups = group_children(left)
+        right_groups = group_children(right)
+        for element_name in sorted(set(left_groups) | set(right_groups)):
+            left_children = left_groups.get(element_name, [])
+            right_children = right_groups.get(element_name, [])
+            repeated = max(len(left_children), len(right_children)) > 1
+            for index in range(max(len(left_children), len(right_children))):
+                child_path = '{0}/{1}'.format(path, element_name)
+                if repeated:
+                    child_path = '{0}[{1}]'.format(child_path, index + 1)
+                if (index >= len(left_children)
+                        or index >= len(right_children)):
+                    changed_paths.append(child_path)
+                    continue
+                self.__collect_changed_paths(left=left_children[index],
+                    right=right_children[index], path=child_path,
+                    changed_paths=changed_paths, cache=cache)
@@ -0,0 +1,97 @@
+class IntermediateIndex:
+    """Name indexes over a dict intermediate representation
+
+    Child element and attribute lookups are answered from dictionaries
+    built on first use for each element and cached, so repeated lookups
+    cost O(1) instead of a scan of the 'children' or 'attributes' list.
+
+    The index is a snapshot of the structure: changing attribute values
+    or texts is fine, but elements or attributes added or removed after
+    they were indexed are not seen.
+    """
+
+    def __init__(self, intermediate):
+        """Class constructor
+
+        Args:
+            intermediate (dict): the intermediate representation root.
+        """
+        self.__root = intermediate
+        # Both map id(element) to (element, index). The element is kept
+        # so its id cannot be reused while it is cached.
+        self.__child_indexes = {}
+        self.__attribute_indexes = {}
+
+    @property
+    def root(self):
+        return self.__root
+
+    def children(self, element_name, element=None):
+        """Get the children of an element with a given element name
+
+        Args:
+            element_name (str): the children element name.
+            element (dict): the parent element, the root if None.
+
+        Returns:
+            list: the children, in order, or an empty list.
+        """
+        if element is None:
+            element = self.__root
+        cached = self.__child_indexes.get(id(element))
+        if cached is None:
+            child_index = {}
+            for child in element.get('children', ()):
+                child_index.setdefault(child['element_name'], []).append(child)
+            cached = (element, child_index)
+            self.__child_indexes[id(element)] = cached
+        return cached[1].get(element_name, [])
+
+    def child(self, element_name, element=None):
+        """Get the first child of an element with a given element name
+
+        Returns:
+            dict: the child or None if there is none.
+        """
+        children = self.children(element_name=element_name, element=element)
+        if children:
+            return children[0]
+        return None
+
+    def find(self, path, element=None):
+        """Get the first descendant matching a path
+
+        Args:
+            path (str): child element names separated by '/', relative
+                to the element, e.g. 'os/type'.
+            element (dict): the starting element, the root if None.
+
+        Returns:
+            dict: the element or None if there is none.
+        """
+        for element_name in path.split('/'):
+            element = self.child(element_name=element_name, element=element)
+            if element is None:
+                return None
+        return element
+
+    def attribute(self, attribute_name, element=None):
+        """Get an attribute of an element
+
+        Args:
+            attribute_name (str): the attribute name.
+            element (dict): the element, the root if None.
+
+        Returns:
+            dict: the attribute, with 'attribute_name' and
+                'attribute_value' keys, or None if it is not set.
+        """
+        if element is None:
+            element = self.__root
+        cached = self.__attribute_indexes.get(id(element))
+        if cached is None:
+            attribute_index = {attribute['attribute_name']: attribute
+                for attribute in reversed(element.get('attributes', []))}
+            cached = (element, attribute_index)
+            self.__attribute_indexes[id(element)] = cached
+        return cached[1].get(attribute_name)
@@ -0,0 +1,192 @@
+from sys import intern
+
+class IntermediateNode:
+    """Compact element of an intermediate representation
+
+    Holds the same information as the dict form ('element_name',
+    'attributes', 'text' and 'children' keys) with far fewer Python
+    objects: the class uses __slots__, attributes are a tuple of
+    (name, value) pairs sorted by name and element and attribute names
+    are interned, so repeated tags share a single string.
+
+    Lookups by child element name and by attribute name go through
+    indexes built on first use and cached in the node. They are dropped
+    whenever the children or the attributes are replaced.
+
+    A dict element with an explicit None text, e.g. from
+    ModuleToIntermediate when a parameter is None, keeps its 'text' key
+    through from_dict and to_dict, so both forms round-trip.
+
+    Attributes:
+        element_name (str): the element name.
+        attributes (tuple): (name, value) pairs sorted by name.
+        text (str): the element text or None.
+        children (tuple): the children IntermediateNode objects.
+    """
+
+    __slots__ = ('element_name', '_attributes', 'text', '_children',
+        '_attribute_index', '_child_index', '_text_present')
+
+    def __init__(self, element_name, attributes=(), text=None, children=()):
+        """Class constructor
+
+        Args:
+            element_name (str): the element name.
+            attributes (iterable): (name, value) pairs, e.g. the items
+                of an attributes dictionary.
+            text (str): the element text, None for no text.
+            children (iterable): the children IntermediateNode objects.
+        """
+        self.element_name = intern(element_name)
+        self.attributes = attributes
+        self.text = text
+        self.children = children
+        # Set by from_dict for a 'text' key holding None.
+        self._text_present = False
+
+    @property
+    def attributes(self):
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes):
+        self._attributes = tuple(sorted((intern(attribute_name),
+            attribute_value) for attribute_name, attribute_value
+            in attributes))
+        self._attribute_index = None
+
+    @property
+    def children(self):
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = tuple(children)
+        self._child_index = None
+
+    @classmethod
+    def from_dict(cls, element):
+        """Build a node tree from the dict form
+
+        Args:
+            element (dict): an intermediate representation element.
+
+        Returns:
+            IntermediateNode: the equivalent node tree.
+        """
+        node = cls(element_name=element['element_name'],
+            attributes=((attribute['attribute_name'],
+                attribute['attribute_value'])
+                for attribute in element.get('attributes', ())),
+            text=element.get('text'),
+            children=(cls.from_dict(element=child)
+                for child in element.get('children', ())))
+        if 'text' in element:
+            node._text_present = True
+        return node
+
+    def to_dict(self):
+        """Get the dict form of the node tree
+
+        Returns:
+            dict: the intermediate representation element, as produced
+                before IntermediateNode existed.
+        """
+        element = {'element_name': self.element_name}
+        if self.attributes:
+            element['attributes'] = [{'attribute_name': attribute_name,
+                'attribute_value': attribute_value}
+                for attribute_name, attribute_value in self.attributes]
+        if self.text is not None or self._text_present:
+            element['text'] = self.text
+        if self.children:
+            element['children'] = [child.to_dict() for child in self.children]
+        return element
+
+    def copy(self):
+        """Get a shallow copy of the node
+
+        The copy shares the attributes tuple and the children with this
+        node, but replacing them in the copy does not affect it.
+
+        Returns:
+            IntermediateNode: the node copy.
+        """
+        node_copy = IntermediateNode.__new__(IntermediateNode)
+        node_copy.element_name = self.element_name
+        node_copy._attributes = self._attributes
+        node_copy._attribute_index = self._attribute_index
+        node_copy.text = self.text
+        node_copy._children = self._children
+        node_copy._child_index = self._child_index
+        node_copy._text_present = self._text_present
+        return node_copy
+
+    def children_named(self, element_name):
+        """Get the children with a given element name
+
+        Returns:
+            tuple: the children, in order, or an empty tuple.
+        """
+        if self._child_index is None:
+            child_index = {}
+            for child in self._children:
+                child_index.setdefault(child.element_name, []).append(child)
+            self._child_index = {name: tuple(children) for name, children
+                in child_index.items()}
+        return self._child_index.get(element_name, ())
+
+    def child(self, element_name):
+        """Get the first child with a given element name
+
+        Returns:
+            IntermediateNode: the child or None if there is none.
+        """
+        children = self.children_named(element_name=element_name)
+        if children:
+            return children[0]
+        return None
+
+    def find(self, path):
+        """Get the first descendant matching a path
+
+        Args:
+            path (str): child element names separated by '/', relative
+                to this node, e.g. 'os/type'.
+
+        Returns:
+            IntermediateNode: the node or None if there is none.
+        """
+        node = self
+        for element_name in path.split('/'):
+            node = node.child(element_name=element_name)
+            if node is None:
+                return None
+        return node
+
+    def get_attribute(self, attribute_name):
+        """Get an attribute value, None if the attribute is not set"""
+        if self._attribute_index is None:
+            self._attribute_index = dict(self._attributes)
+        return self._attribute_index.get(attribute_name)
+
+    def set_attribute(self, attribute_name, attribute_value):
+        """Set an attribute value keeping the attributes sorted"""
+        attributes = dict(self._attributes)
+        attributes[attribute_name] = attribute_value
+        self.attributes = attributes.items()
+
+    def __eq__(self, other):
+        if not isinstance(other, IntermediateNode):
+            return NotImplemented
+        return (self.element_name == other.element_name
+            and self.attributes == other.attributes
+            and self.text == other.text
+            and self.children == other.children)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return ('IntermediateNode(element_name={0!r}, attributes={1!r}, '
+            'text={2!r}, children={3!r})'.format(self.element_name,
+            self.attributes, self.text, self.children))
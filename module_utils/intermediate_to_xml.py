@@ -1,24 +1,148 @@
-from lxml import etree
+import time
+from contextlib import ExitStack
+from io import BytesIO
+
+from intermediate_node import IntermediateNode
+from lazy_import import LazyModule
+
+etree = LazyModule('lxml.etree', globals(), 'etree')
+
+class _ByteCounter:
+    """Binary file wrapper counting the bytes written through it"""
+
+    def __init__(self, file):
+        self.file = file
+        self.total_bytes = 0
+
+    def write(self, data):
+        self.total_bytes += len(data)
+        return self.file.write(data)
 
 class IntermediateToXml:
     """Convert an XML to an intermediate representation
 
+    The write class method is the streaming alternative: it serializes
+    the intermediate element by element without building the XML tree.
+
     Properties:
         xml (str): the xml conversion result
     """
 
-    def __init__(self, intermediate_representation):
+    def __init__(self, intermediate_representation, stats=None):
         """Class constructor
 
         Args:
-            intermediate (dict): intermediate representation dictionary
+            intermediate (dict|IntermediateNode): intermediate
+                representation dictionary or node
+            stats (PipelineStats): records the conversion under the
+                'IntermediateToXml' stage.
         """
+        if stats is not None:
+            start = time.perf_counter()
         self.__xml_tree = None
-        self.generate_xml_tree(
-            element_definition=intermediate_representation,
-            parent_element=self.__xml_tree
-        )
+        if isinstance(intermediate_representation, IntermediateNode):
+            self.__xml_tree = self.generate_xml_tree_from_node(
+                node=intermediate_representation)
+        else:
+            self.generate_xml_tree(
+                element_definition=intermediate_representation,
+                parent_element=self.__xml_tree
+            )
         self.__xml = etree.tostring(self.__xml_tree)
+        if stats is not None:
+            seconds = time.perf_counter() - start
+            stats.record(stage='IntermediateToXml', seconds=seconds,
+                nodes=sum(1 for _ in self.__xml_tree.iter()),
+                bytes_serialized=len(self.__xml))
+
+    @classmethod
+    def write(cls, intermediate_representation, output=None, stats=None):
+        """Serialize an intermediate incrementally
+
+        Elements are written with etree.xmlfile as they are visited, so
+        only the ancestors of the current element are open at any time
+        and no XML tree is built. The 'children' of dict elements can be
+        any iterable, including a generator producing them on the fly,
+        so a whole definition can be serialized without ever holding it
+        in memory. The output is the same as the xml property.
+
+        Args:
+            intermediate_representation (dict|IntermediateNode): the
+                intermediate to serialize.
+            output (str|file): a file name or a binary file object to
+                write to, None to return the XML.
+            stats (PipelineStats): records the serialization under the
+                'IntermediateToXml' stage.
+
+        Returns:
+            bytes: the XML if output is None, e.g. to be decoded and
+                passed to defineXML, else None.
+        """
+        if stats is not None:
+            start = time.perf_counter()
+        xml_buffer = None
+        if output is None:
+            xml_buffer = output = BytesIO()
+        with ExitStack() as exit_stack:
+            if stats is not None:
+                # The bytes are counted as they are written, so files
+                # are measured too, even when they cannot seek.
+                if isinstance(output, str):
+                    output = exit_stack.enter_context(open(output, 'wb'))
+                output = byte_counter = _ByteCounter(file=output)
+            with etree.xmlfile(output) as xml_file:
+                total_nodes = cls.__write_element(xml_file=xml_file,
+                    element=intermediate_representation)
+        xml = None
+        if xml_buffer is not None:
+            xml = xml_buffer.getvalue()
+        if stats is not None:
+            seconds = time.perf_counter() - start
+            stats.record(stage='IntermediateToXml', seconds=seconds,
+                nodes=total_nodes,
+                bytes_serialized=byte_counter.total_bytes)
+        return xml
+
+    @classmethod
+    def __write_element(cls, xml_file, element):
+        """Write an element and its descendants
+
+        Returns:
+            int: the number of elements written.
+        """
+        if isinstance(element, IntermediateNode):
+            element_name = element.element_name
+            attributes = dict(element.attributes)
+            text = element.text
+            children = element.children
+        else:
+            element_name = element['element_name']
+            attributes = {attribute['attribute_name']:
+                attribute['attribute_value']
+                for attribute in element.get('attributes', ())}
+            text = element.get('text')
+            children = element.get('children', ())
+        if text is not None:
+            children = ()
+        children_iterator = iter(children)
+        first_child = next(children_iterator, None)
+        if first_child is None and text is None:
+            # Empty elements are written as small elements, so they
+            # serialize as etree.tostring does, e.g. as <acpi/>.
+            xml_file.write(etree.Element(element_name, attributes))
+            return 1
+        if first_child is None:
+            with xml_file.element(element_name, attributes):
+                xml_file.write(text)
+            return 1
+        total_nodes = 1
+        with xml_file.element(element_name, attributes):
+            total_nodes += cls.__write_element(xml_file=xml_file,
+                element=first_child)
+            for child in children_iterator:
+                total_nodes += cls.__write_element(xml_file=xml_file,
+                    element=child)
+        return total_nodes
 
     def generate_xml_tree(self, element_definition, parent_element):
         """Generate an XML tree from a dict definition
@@ -46,6 +170,30 @@ class IntermediateToXml:
             return
         parent_element.append(element)
 
+    def generate_xml_tree_from_node(self, node, parent_element=None):
+        """Generate an XML tree from an IntermediateNode
+
+        Args:
+            node (IntermediateNode): the node to be converted.
+            parent_element (Element): the parent element, None for the
+                root element.
+
+        Returns:
+            Element: the generated element.
+        """
+        if parent_element is None:
+            element = etree.Element(node.element_name, dict(node.attributes))
+        else:
+            element = etree.SubElement(parent_element, node.element_name,
+                dict(node.attributes))
+        if node.text is not None:
+            element.text = node.text
+        else:
+            for child in node.children:
+                self.generate_xml_tree_from_node(node=child,
+                    parent_element=element)
+        return element
+
     def parse_children(self, children, parent_element):
         """Parse children of an element
 
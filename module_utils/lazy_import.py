@@ -0,0 +1,78 @@
+import sys
+
+class LazyModule:
+    """Module imported on the first attribute access
+
+    Ansible starts the module code fresh for every task, so heavy
+    dependencies such as lxml are only imported once a code path really
+    uses them. Assign it to the module global it stands for:
+
+        etree = LazyModule('lxml.etree', globals(), 'etree')
+
+    On the first attribute access the module is imported and replaces
+    the placeholder in that namespace, so later lookups go straight to
+    the real module.
+    """
+
+    def __init__(self, module_name, namespace=None, global_name=None):
+        """Class constructor
+
+        Args:
+            module_name (str): the absolute module name, e.g.
+                'lxml.etree'.
+            namespace (dict): the globals() holding the placeholder.
+            global_name (str): the name of the placeholder in namespace.
+        """
+        self.__module_name = module_name
+        self.__namespace = namespace
+        self.__global_name = global_name
+
+    def load(self):
+        """Import the module and replace the placeholder
+
+        Raises:
+            ImportError: if the module is not installed.
+
+        Returns:
+            module: the imported module.
+        """
+        __import__(self.__module_name)
+        module = sys.modules[self.__module_name]
+        if self.__namespace is not None:
+            self.__namespace[self.__global_name] = module
+        return module
+
+    def __getattr__(self, attribute_name):
+        return getattr(self.load(), attribute_name)
+
+    def __repr__(self):
+        return '<LazyModule {0!r}>'.format(self.__module_name)
+
+class LazyClassAttribute:
+    """Class attribute computed on its first access
+
+    Keeps the type of a public class constant whose value needs a heavy
+    module, without importing it with the class:
+
+        UUID_NAMESPACE = LazyClassAttribute(
+            lambda cls: uuid.UUID(cls.NAMESPACE_HEX))
+
+    The factory receives the class the attribute is read from, and its
+    result is kept for that class.
+    """
+
+    def __init__(self, factory):
+        """Class constructor
+
+        Args:
+            factory (callable): receives the class and returns the value.
+        """
+        self.__factory = factory
+        self.__values = {}
+
+    def __get__(self, instance, owner):
+        try:
+            return self.__values[owner]
+        except KeyError:
+            value = self.__values[owner] = self.__factory(owner)
+            return value
@@ -0,0 +1,147 @@
+import threading
+
+from domain_xml_to_intermediate import domain_xml_to_intermediate
+from lazy_import import LazyModule
+from xml_filter import CompiledFilter
+
+libvirt = LazyModule('libvirt', globals(), 'libvirt')
+
+# Same value as libvirt.VIR_DOMAIN_XML_INACTIVE, defined here so the
+# flag can be used without importing libvirt.
+VIR_DOMAIN_XML_INACTIVE = 2
+
+class LibvirtConnectionManager:
+    """Pool of libvirt connections, one per URI
+
+    A connection is opened on the first use of its URI and reused for
+    the life of the manager. A connection found dead is reopened. The
+    manager is thread safe, and shared() returns the instance shared by
+    the whole process.
+
+    Connections are opened with libvirt.open by default. Any other
+    callable taking the URI can be given instead, e.g. to use a mock or
+    libvirt.openReadOnly.
+    """
+
+    __shared = None
+    __shared_lock = threading.Lock()
+
+    def __init__(self, open_connection=None):
+        """Class constructor
+
+        Args:
+            open_connection (callable): receives a URI and returns a
+                connection, libvirt.open if None.
+        """
+        self.__open_connection = open_connection
+        self.__connections = {}
+        self.__uri_locks = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """Get the manager shared by the whole process"""
+        with cls.__shared_lock:
+            if cls.__shared is None:
+                cls.__shared = cls()
+            return cls.__shared
+
+    def connection(self, uri):
+        """Get the pooled connection to a URI
+
+        Args:
+            uri (str): the libvirt URI, e.g. 'qemu:///system'.
+
+        Returns:
+            virConnect: the open connection.
+        """
+        with self.__lock:
+            connection = self.__connections.get(uri)
+            uri_lock = self.__uri_locks.setdefault(uri, threading.Lock())
+        if connection is not None and connection.isAlive():
+            return connection
+        # Connections are opened under a lock of their own URI, so a
+        # slow or unreachable hypervisor does not block the others, and
+        # concurrent callers do not open the same URI twice.
+        with uri_lock:
+            with self.__lock:
+                connection = self.__connections.get(uri)
+            if connection is not None:
+                if connection.isAlive():
+                    return connection
+                self.__close_connection(connection=connection)
+            open_connection = self.__open_connection
+            if open_connection is None:
+                open_connection = libvirt.open
+            connection = open_connection(uri)
+            with self.__lock:
+                self.__connections[uri] = connection
+            return connection
+
+    def domain_xmls(self, uri, names=None, flags=VIR_DOMAIN_XML_INACTIVE):
+        """Get the XML definitions of many domains at once
+
+        The domains are listed with a single listAllDomains call instead
+        of a lookup per domain, then XMLDesc is called on each of them.
+
+        Args:
+            uri (str): the libvirt URI.
+            names (iterable): the domain names to get, all if None.
+            flags (int): the XMLDesc flags, the persistent definition by
+                default.
+
+        Returns:
+            dict: the XML of each domain, keyed by domain name. Domains
+                in names that do not exist are left out.
+        """
+        if names is not None:
+            names = set(names)
+        domain_xmls = {}
+        for domain in self.connection(uri=uri).listAllDomains(0):
+            domain_name = domain.name()
+            if names is None or domain_name in names:
+                domain_xmls[domain_name] = domain.XMLDesc(flags)
+        return domain_xmls
+
+    def domain_intermediates(self, uri, filter_spec, names=None,
+            flags=VIR_DOMAIN_XML_INACTIVE):
+        """Get the filtered intermediates of many domains at once
+
+        Args:
+            uri (str): the libvirt URI.
+            filter_spec (dict|CompiledFilter): the filter spec, compiled
+                once for all the domains.
+            names (iterable): the domain names to get, all if None.
+            flags (int): the XMLDesc flags.
+
+        Returns:
+            dict: the intermediate of each domain, keyed by domain name.
+        """
+        if not isinstance(filter_spec, CompiledFilter):
+            filter_spec = CompiledFilter(filter_spec=filter_spec)
+        return {domain_name: domain_xml_to_intermediate(source=xml,
+            filter_spec=filter_spec) for domain_name, xml in self.domain_xmls(
+            uri=uri, names=names, flags=flags).items()}
+
+    def close(self, uri=None):
+        """Close the connection to a URI, or every connection if None"""
+        with self.__lock:
+            if uri is None:
+                uris = list(self.__connections)
+            else:
+                uris = [uri] if uri in self.__connections else []
+            connections = [self.__connections.pop(closed_uri)
+                for closed_uri in uris]
+        for connection in connections:
+            self.__close_connection(connection=connection)
+
+    def __close_connection(self, connection):
+        # Dead connections are closed too, to release their resources.
+        # That may fail, with nothing left to release then.
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def __len__(self):
+        return len(self.__connections)
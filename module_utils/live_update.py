@@ -0,0 +1,294 @@
+import re
+from collections import namedtuple
+
+from domain_xml_to_intermediate import parse_domain_xml
+from intermediate_access import element_child, element_text
+from intermediate_diff import IntermediateDiff
+from intermediate_to_xml import IntermediateToXml
+from lazy_import import LazyModule
+from normalizer_pipeline import NormalizerPipeline
+
+etree = LazyModule('lxml.etree', globals(), 'etree')
+
+# Same values as libvirt.VIR_DOMAIN_AFFECT_LIVE and VIR_DOMAIN_AFFECT_CONFIG,
+# which setMemoryFlags and setVcpusFlags share as VIR_DOMAIN_MEM_* and
+# VIR_DOMAIN_VCPU_*.
+VIR_DOMAIN_AFFECT_LIVE = 1
+VIR_DOMAIN_AFFECT_CONFIG = 2
+
+# Same values as libvirt.VIR_DOMAIN_METADATA_DESCRIPTION and
+# VIR_DOMAIN_METADATA_TITLE.
+VIR_DOMAIN_METADATA_DESCRIPTION = 0
+VIR_DOMAIN_METADATA_TITLE = 1
+
+# Same value as libvirt.VIR_DOMAIN_XML_INACTIVE.
+VIR_DOMAIN_XML_INACTIVE = 2
+
+Operation = namedtuple('Operation', ['method', 'arguments', 'changes'])
+Operation.__doc__ = """A libvirt call applying some changes to a domain
+
+Attributes:
+    method (str): the virDomain method name, e.g. 'setMemoryFlags', or
+        LiveUpdatePlanner.REDEFINE to define the whole domain XML.
+    arguments (tuple): the call arguments, without the flags, which are
+        chosen when the plan is applied. Empty for a redefine, whose XML
+        is built from the domain definition when the plan is applied.
+    changes (list): the IntermediateDiff Change list applied by the call.
+"""
+
+class UpdatePlan:
+    """The libvirt calls bringing a domain to its wanted definition
+
+    Attributes:
+        strategy (str): LiveUpdatePlanner.NONE when there is nothing to
+            change, LIVE when every change has a targeted call, else
+            REDEFINE.
+        operations (list): the Operation list, in call order.
+        changes (list): every IntermediateDiff Change of the plan.
+    """
+
+    def __init__(self, strategy, operations, changes, planner):
+        self.strategy = strategy
+        self.operations = operations
+        self.changes = changes
+        self.__planner = planner
+
+    def apply(self, domain):
+        """Run the plan on a domain
+
+        The targeted calls change both the persistent definition and,
+        when the domain is running, the running guest, so no restart is
+        needed. A redefine patches the changes into the full persistent
+        definition of the domain and defines it again, so the elements
+        the intermediates do not carry are kept. It only changes the
+        persistent definition, the changes reach a running guest on its
+        next restart.
+
+        Args:
+            domain (virDomain): the domain, from the connection it must
+                be redefined on.
+
+        Returns:
+            dict: the report, with the 'strategy', 'operations' (the
+                method names called) and 'restart_required' keys.
+        """
+        active = bool(domain.isActive())
+        flags = VIR_DOMAIN_AFFECT_CONFIG
+        if active:
+            flags |= VIR_DOMAIN_AFFECT_LIVE
+        for operation in self.operations:
+            if operation.method == LiveUpdatePlanner.REDEFINE:
+                xml = self.__planner.redefine_xml(
+                    xml=domain.XMLDesc(VIR_DOMAIN_XML_INACTIVE),
+                    changes=operation.changes)
+                domain.connect().defineXML(xml)
+            else:
+                getattr(domain, operation.method)(*operation.arguments,
+                    flags)
+        return {
+            'strategy': self.strategy,
+            'operations': [operation.method
+                for operation in self.operations],
+            'restart_required': active
+                and self.strategy == LiveUpdatePlanner.REDEFINE
+        }
+
+class LiveUpdatePlanner:
+    """Map the differences of a domain onto the cheapest libvirt calls
+
+    The current and wanted intermediates are normalized and compared
+    with IntermediateDiff, then each change is mapped onto a targeted
+    call:
+
+        currentMemory: setMemoryFlags, with the new size in KiB.
+        vcpu current attribute: setVcpusFlags.
+        title and description: setMetadata.
+
+    When any change has no targeted call, e.g. the maximum memory, the
+    plan is a single redefine covering the other changes too. Only the
+    changed elements, texts and attributes are patched into the full
+    domain definition, so the devices and features the intermediates
+    leave out are defined again unchanged.
+    """
+
+    NONE = 'none'
+    LIVE = 'live'
+    REDEFINE = 'redefine'
+
+    METADATA_TYPES = {
+        'title': VIR_DOMAIN_METADATA_TITLE,
+        'description': VIR_DOMAIN_METADATA_DESCRIPTION
+    }
+
+    def __init__(self, normalizer_pipeline=None):
+        """Class constructor
+
+        Args:
+            normalizer_pipeline (NormalizerPipeline): normalizes both
+                intermediates before comparing them, the default one if
+                None.
+        """
+        if normalizer_pipeline is None:
+            normalizer_pipeline = NormalizerPipeline.default()
+        self.__normalizer_pipeline = normalizer_pipeline
+
+    def plan(self, old, new):
+        """Plan the update of a domain
+
+        Args:
+            old (dict|IntermediateNode): the current intermediate, from
+                the domain XML.
+            new (dict|IntermediateNode): the wanted intermediate, e.g. from
+                ModuleToIntermediate. Both are left untouched.
+
+        Returns:
+            UpdatePlan: the plan.
+        """
+        old = self.__normalizer_pipeline.normalize(intermediate=old,
+            copy_on_write=True)
+        new = self.__normalizer_pipeline.normalize(intermediate=new,
+            copy_on_write=True)
+        changes = IntermediateDiff(old=old, new=new).changes
+        if not changes:
+            return UpdatePlan(strategy=self.NONE, operations=[],
+                changes=changes, planner=self)
+        operations = {}
+        for change in changes:
+            operation = self._operation(change=change, new=new)
+            if operation is None:
+                return UpdatePlan(strategy=self.REDEFINE, operations=[
+                    Operation(self.REDEFINE, (), changes)], changes=changes,
+                    planner=self)
+            method, arguments = operation
+            operations.setdefault((method, arguments), []).append(change)
+        return UpdatePlan(strategy=self.LIVE, operations=[
+            Operation(method, arguments, operation_changes)
+            for (method, arguments), operation_changes in operations.items()],
+            changes=changes, planner=self)
+
+    def _operation(self, change, new):
+        """Map a change onto a targeted call
+
+        Args:
+            change (Change): the change.
+            new (dict|IntermediateNode): the normalized wanted
+                intermediate.
+
+        Returns:
+            tuple: the method name and its arguments, None if the change
+                needs a redefine.
+        """
+        path = change.path.split('/', 1)[-1]
+        if (path == 'currentMemory' and change.target == IntermediateDiff.TEXT
+                and change.new_value is not None):
+            return 'setMemoryFlags', (int(change.new_value),)
+        if (path == 'vcpu' and change.target == IntermediateDiff.ATTRIBUTE
+                and change.name == 'current'):
+            current = change.new_value
+            if current is None:
+                current = element_text(element_child(new, 'vcpu'))
+            return 'setVcpusFlags', (int(current),)
+        metadata_type = self.METADATA_TYPES.get(path)
+        if metadata_type is not None and change.target in (
+                IntermediateDiff.TEXT, IntermediateDiff.ELEMENT):
+            element = element_child(new, path)
+            text = element_text(element) if element is not None else None
+            return 'setMetadata', (metadata_type, text or None, None, None)
+        return None
+
+    def redefine_xml(self, xml, changes):
+        """Patch changes into a full domain definition
+
+        The elements are found by their change path, e.g.
+        "domain/devices/disk[target/@dev='vda']", before any of them is
+        changed, so removals do not shift the positions of the others.
+        Elements with a text or attribute change are normalized first,
+        as the intermediates were, so a memory size in GiB is rewritten
+        in KiB before the KiB value is set.
+
+        Args:
+            xml (str): the domain XML, e.g. from
+                XMLDesc(VIR_DOMAIN_XML_INACTIVE).
+            changes (list): the IntermediateDiff Change list, between
+                the normalized intermediates.
+
+        Returns:
+            str: the patched domain XML, to be passed to defineXML.
+
+        Raises:
+            ValueError: if a change path is not in the definition.
+        """
+        root = parse_domain_xml(source=xml)
+        targets = []
+        for change in changes:
+            path = change.path
+            if change.target == IntermediateDiff.ELEMENT:
+                if change.action == IntermediateDiff.CHANGED:
+                    raise ValueError('cannot replace the root element '
+                        '{0}'.format(path))
+                if change.action == IntermediateDiff.ADDED:
+                    path = path.rsplit('/', 1)[0]
+            targets.append((change, self.__find(root=root, path=path)))
+        normalized = set()
+        for change, element in targets:
+            if change.target == IntermediateDiff.ELEMENT:
+                if change.action == IntermediateDiff.ADDED:
+                    self.__insert(parent=element, child=etree.fromstring(
+                        IntermediateToXml(
+                        intermediate_representation=change.new_value).xml))
+                else:
+                    element.getparent().remove(element)
+                continue
+            if element not in normalized:
+                normalized.add(element)
+                self.__normalize(element=element, path=change.path)
+            if change.target == IntermediateDiff.TEXT:
+                element.text = change.new_value
+            elif change.new_value is None:
+                element.attrib.pop(change.name, None)
+            else:
+                element.set(change.name, change.new_value)
+        return etree.tostring(root, encoding='unicode')
+
+    def __find(self, root, path):
+        steps = path.split('/', 1)
+        if len(steps) == 1:
+            return root
+        elements = root.xpath(steps[1])
+        if not elements:
+            raise ValueError('{0} is not in the domain definition'.format(
+                path))
+        return elements[0]
+
+    def __insert(self, parent, child):
+        """Append a child after its last sibling with the same name"""
+        siblings = parent.findall(child.tag)
+        if siblings:
+            siblings[-1].addnext(child)
+        else:
+            parent.append(child)
+
+    def __normalize(self, element, path):
+        """Normalize an lxml element as its intermediate was"""
+        # The pipeline paths have neither the root nor the predicates.
+        path = re.sub(r'\[[^\]]*\]', '', path).split('/', 1)[-1]
+        intermediate = {
+            'element_name': element.tag,
+            'attributes': [{'attribute_name': attribute_name,
+                'attribute_value': attribute_value}
+                for attribute_name, attribute_value in element.items()]
+        }
+        if element.text is not None and len(element) == 0:
+            intermediate['text'] = element.text
+        self.__normalizer_pipeline.normalize_element(element=intermediate,
+            path=path)
+        if len(element) == 0:
+            element.text = intermediate.get('text')
+        attributes = dict((attribute['attribute_name'],
+            attribute['attribute_value'])
+            for attribute in intermediate.get('attributes', ()))
+        for attribute_name in list(element.attrib):
+            if attribute_name not in attributes:
+                del element.attrib[attribute_name]
+        for attribute_name, attribute_value in attributes.items():
+            element.set(attribute_name, attribute_value)
@@ -1,14 +1,120 @@
-import math
+import time
+
+from intermediate_access import element_children
+from intermediate_copy import copy_element, copy_with_children
+from intermediate_index import IntermediateIndex
+from intermediate_node import IntermediateNode
+from lazy_import import LazyModule
+
+# NumPy takes longer to import than everything else here, so it is only
+# imported by the first vectorized conversion.
+numpy = LazyModule('numpy', globals(), 'numpy')
+_has_numpy = None
+
+def has_numpy():
+    """Tell whether NumPy is installed, importing it the first time"""
+    global _has_numpy
+    if _has_numpy is None:
+        try:
+            # Any attribute access imports it, if it is still lazy.
+            numpy.__name__
+            _has_numpy = True
+        except ImportError:
+            _has_numpy = False
+    return _has_numpy
+
+def __getattr__(name):
+    # HAS_NUMPY is computed on first access, as it imports NumPy.
+    if name == 'HAS_NUMPY':
+        return has_numpy()
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(
+        __name__, name))
 
 class MemoryNormalizer():
     """Normalizer memory in an intermediate representation
 
+    Can also be built without an intermediate and used for single
+    elements through normalize_element, e.g. as a NormalizerPipeline
+    normalizer.
+
     Attributes:
-        normalized (dict): the intermediate representation with the
-            memory entries normalized to KiB.
+        normalized (dict|IntermediateNode): the intermediate
+            representation with the memory entries normalized to KiB.
     """
-    def __init__(self, intermediate):
-        self._normalize(intermediate=intermediate)
+
+    # Upper cased unit to the (numerator, denominator) fraction that
+    # converts it to KiB, reduced so the products stay small.
+    UNIT_TO_KIBIBYTE = {
+        'B': (1, 1024),
+        'K': (1, 1),
+        'KIB': (1, 1),
+        'KB': (125, 128),
+        'M': (1024, 1),
+        'MIB': (1024, 1),
+        'MB': (15625, 16),
+        'G': (1024**2, 1),
+        'GIB': (1024**2, 1),
+        'GB': (1953125, 2),
+        'T': (1024**3, 1),
+        'TIB': (1024**3, 1),
+        'TB': (976562500, 1)
+    }
+
+    INT64_MAX = 2**63 - 1
+
+    def __init__(self, intermediate=None, copy_on_write=False, stats=None):
+        """Class constructor
+
+        Args:
+            intermediate (dict|IntermediateNode): the intermediate to be
+                normalized, None to only normalize single elements.
+            copy_on_write (bool): leave the intermediate untouched and
+                normalize a copy. Only the root and the memory elements
+                are copied, every other element is shared.
+            stats (PipelineStats): records the normalization under the
+                'MemoryNormalizer' stage, counting the memory elements
+                normalized as nodes.
+        """
+        self._index = None
+        self._normalized = None
+        if intermediate is None:
+            return
+        if stats is not None:
+            start = time.perf_counter()
+        if copy_on_write:
+            self._normalize_copy(intermediate=intermediate)
+        else:
+            self._normalize(intermediate=intermediate)
+        if stats is not None:
+            seconds = time.perf_counter() - start
+            stats.record(stage='MemoryNormalizer', seconds=seconds,
+                nodes=sum(1 for element in (
+                    self._get_memory_element(intermediate=intermediate),
+                    self._get_current_memory_element(
+                        intermediate=intermediate))
+                if element is not None))
+
+    def normalize_element(self, element):
+        """Normalize a single memory element to KiB
+
+        Args:
+            element (dict|IntermediateNode): a memory element, such as
+                memory or currentMemory.
+
+        Returns:
+            dict|IntermediateNode: the normalized element.
+        """
+        return self._normalize_element(element=element)
+
+    def _get_index(self, intermediate):
+        """Get the name index of a dict intermediate
+
+        The index is built once per intermediate and shared by every
+        lookup, so normalizing more fields does not add more scans.
+        """
+        if self._index is None or self._index.root is not intermediate:
+            self._index = IntermediateIndex(intermediate=intermediate)
+        return self._index
 
     def _normalize(self, intermediate):
         memory_element = self._get_memory_element(intermediate=intermediate)
@@ -18,8 +124,23 @@ class MemoryNormalizer():
         self._normalize_element(element=current_memory_element)
         self._normalized = intermediate
 
+    def _normalize_copy(self, intermediate):
+        memory_elements = [element for element in (
+            self._get_memory_element(intermediate=intermediate),
+            self._get_current_memory_element(intermediate=intermediate))
+            if element is not None]
+        children = list(element_children(intermediate))
+        for index, child in enumerate(children):
+            if any(child is element for element in memory_elements):
+                children[index] = self._normalize_element(
+                    element=copy_element(element=child))
+        self._normalized = copy_with_children(element=intermediate,
+            children=children)
+
     def _normalize_element(self, element):
         """Receives an element and normalizes its memory"""
+        if isinstance(element, IntermediateNode):
+            return self._normalize_node(node=element)
         old_memory_value = self._get_memory_value(memory_element=element)
         unit_attribute = self._get_attribute_from_element(element=element,
             attribute_name='unit')
@@ -32,13 +153,25 @@ class MemoryNormalizer():
         self._set_memory_unit(unit_attribute=unit_attribute, value='KiB')
         return element
 
+    def _normalize_node(self, node):
+        """Receives an IntermediateNode and normalizes its memory"""
+        new_memory_value = self._convert_to_kibibyte(value=int(node.text),
+            unit=node.get_attribute(attribute_name='unit'))
+        node.text = str(new_memory_value)
+        node.set_attribute(attribute_name='unit', attribute_value='KiB')
+        return node
+
     def _get_memory_element(self, intermediate):
-        return self._get_element_from_list(element_list=
-            intermediate['children'], element_name='memory')
+        if isinstance(intermediate, IntermediateNode):
+            return intermediate.child(element_name='memory')
+        return self._get_index(intermediate=intermediate).child(
+            element_name='memory')
 
     def _get_current_memory_element(self, intermediate):
-        return self._get_element_from_list(element_list=
-            intermediate['children'], element_name='currentMemory')
+        if isinstance(intermediate, IntermediateNode):
+            return intermediate.child(element_name='currentMemory')
+        return self._get_index(intermediate=intermediate).child(
+            element_name='currentMemory')
 
     def _get_element_from_list(self, element_list, element_name):
         try:
@@ -49,13 +182,10 @@ class MemoryNormalizer():
         return None
 
     def _get_attribute_from_element(self, element, attribute_name):
-        if 'attributes' in element:
-            try:
-                return next(filter(lambda child : child['attribute_name'] ==
-                    attribute_name, element['attributes']))
-            except StopIteration as e:
-                return None
-        return None
+        index = self._index
+        if index is None:
+            index = IntermediateIndex(intermediate=element)
+        return index.attribute(attribute_name=attribute_name, element=element)
 
     def _get_memory_value(self, memory_element):
         """Get the value of the memory from memory element
@@ -94,7 +224,9 @@ class MemoryNormalizer():
     def _convert_to_kibibyte(self, value, unit):
         """Conver to kibibyte
 
-        As Libvirt may round up kibibytes, so will this.
+        As Libvirt may round up kibibytes, so will this. The conversion
+        uses exact integer arithmetic, so it does not lose precision on
+        large values.
 
         Args:
             value (int): The value to be converted
@@ -104,25 +236,52 @@ class MemoryNormalizer():
         Returns:
             int: kibibyte value rounded up.
         """
-        if unit.upper() == 'B':
-            return int(math.ceil(value/1024))
-        if unit.upper() == 'KIB' or unit.upper() == 'K':
-            return value
-        if unit.upper() == 'KB':
-            return int(math.ceil((value*1000)/1024))
-        if unit.upper() == 'MIB' or unit.upper() == 'M':
-            return value*1024
-        if unit.upper() == 'MB':
-            return int(math.ceil((value*1000*1000)/1024))
-        if unit.upper() == 'GIB' or unit.upper() == 'G':
-            return value*1024*1024
-        if unit.upper() == 'GB':
-            return int(math.ceil((value*1000*1000*1000)/1024))
-        if unit.upper() == 'TIB' or unit.upper() == 'T':
-            return value*1024*1024*1024
-        if unit.upper() == 'TB':
-            return int(math.ceil((value*1000*1000*1000*1000)/1024))
-        raise Exception('Unit now allowed: {0}'.format(unit))
+        numerator, denominator = self._get_unit_fraction(unit=unit)
+        return -(-value * numerator // denominator)
+
+    def _get_unit_fraction(self, unit):
+        try:
+            return self.UNIT_TO_KIBIBYTE[unit.upper()]
+        except KeyError:
+            raise Exception('Unit now allowed: {0}'.format(unit))
+
+    def convert_many(self, values, units, use_numpy=None):
+        """Convert many memory values to kibibyte in one call
+
+        Args:
+            values (list): the int values to be converted.
+            units (str|list): the unit of every value, or a list with
+                the unit of each value. See _convert_to_kibibyte.
+            use_numpy (bool): use a vectorized NumPy conversion. By
+                default NumPy is used when it is installed. Values too
+                large for int64 arithmetic are always converted with
+                Python integers.
+
+        Returns:
+            list: the kibibyte values rounded up, as ints.
+        """
+        if isinstance(units, str):
+            fractions = [self._get_unit_fraction(unit=units)] * len(values)
+        else:
+            fractions = [self._get_unit_fraction(unit=unit) for unit in units]
+        if use_numpy is None:
+            use_numpy = has_numpy()
+        if use_numpy and self.__fits_int64(values=values, fractions=fractions):
+            values_array = numpy.array(values, dtype=numpy.int64)
+            numerators = numpy.array([fraction[0] for fraction in fractions],
+                dtype=numpy.int64)
+            denominators = numpy.array([fraction[1]
+                for fraction in fractions], dtype=numpy.int64)
+            return (-(-values_array * numerators // denominators)).tolist()
+        return [-(-value * numerator // denominator)
+            for value, (numerator, denominator) in zip(values, fractions)]
+
+    def __fits_int64(self, values, fractions):
+        if not values:
+            return False
+        largest_value = max(abs(value) for value in values)
+        largest_numerator = max(fraction[0] for fraction in fractions)
+        return largest_value * largest_numerator <= self.INT64_MAX
 
     @property
     def normalized(self):
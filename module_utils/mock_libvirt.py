@@ -0,0 +1,153 @@
+import itertools
+
+from lxml import etree
+
+class MockLibvirtError(Exception):
+    """Mock for libvirt.libvirtError"""
+
+class MockDomain:
+    """Mock for libvirt.virDomain"""
+
+    # libvirt.VIR_DOMAIN_RUNNING and VIR_DOMAIN_SHUTOFF
+    RUNNING = 1
+    SHUTOFF = 5
+
+    def __init__(self, connection, xml, active=False):
+        self.connection = connection
+        self.xml = xml
+        self.active = active
+        self.xml_desc_calls = []
+        self.state_calls = 0
+        self.update_calls = []
+
+    def state(self, flags=0):
+        self.state_calls += 1
+        return [self.RUNNING if self.active else self.SHUTOFF, 1]
+
+    def set_active(self, active, emit_event=True):
+        """Change the state, emitting a lifecycle event by default"""
+        self.active = active
+        if emit_event:
+            self.connection.emit_lifecycle_event(domain=self,
+                event=2 if active else 5)
+
+    def name(self):
+        return self.xml.split('<name>', 1)[1].split('</name>', 1)[0]
+
+    def UUIDString(self):
+        return self.xml.split('<uuid>', 1)[1].split('</uuid>', 1)[0]
+
+    def XMLDesc(self, flags=0):
+        self.xml_desc_calls.append(flags)
+        return self.xml
+
+    def isActive(self):
+        return 1 if self.active else 0
+
+    def connect(self):
+        return self.connection
+
+    def setMemoryFlags(self, memory, flags=0):
+        self.update_calls.append(('setMemoryFlags', memory, flags))
+        self.__update_element(element_name='currentMemory', text=str(memory),
+            attributes={'unit': 'KiB'})
+        return 0
+
+    def setVcpusFlags(self, nvcpus, flags=0):
+        self.update_calls.append(('setVcpusFlags', nvcpus, flags))
+        self.__update_element(element_name='vcpu',
+            attributes={'current': str(nvcpus)})
+        return 0
+
+    def setMetadata(self, type, metadata, key, uri, flags=0):
+        self.update_calls.append(('setMetadata', type, metadata, flags))
+        # libvirt.VIR_DOMAIN_METADATA_TITLE is 1, DESCRIPTION is 0
+        element_name = 'title' if type == 1 else 'description'
+        if metadata is None:
+            self.__update_element(element_name=element_name, remove=True)
+        else:
+            self.__update_element(element_name=element_name, text=metadata)
+        return 0
+
+    def __update_element(self, element_name, text=None, attributes=None,
+            remove=False):
+        root = etree.fromstring(self.xml)
+        element = root.find(element_name)
+        if remove:
+            if element is not None:
+                root.remove(element)
+        else:
+            if element is None:
+                element = etree.SubElement(root, element_name)
+            if text is not None:
+                element.text = text
+            for attribute_name, attribute_value in (attributes or {}).items():
+                element.set(attribute_name, attribute_value)
+        self.xml = etree.tostring(root, encoding='unicode')
+
+class MockConnection:
+    """Mock for libvirt.virConnect
+
+    Holds a set of domains defined from XML, like the test:///default
+    driver, and counts the calls made to it.
+    """
+
+    def __init__(self, uri, domain_xmls=(), events=True):
+        self.uri = uri
+        self.alive = True
+        self.events = events
+        self.event_callbacks = {}
+        # libvirt never reuses a callback id.
+        self.__callback_ids = itertools.count(1)
+        self.domains = [MockDomain(connection=self, xml=xml)
+            for xml in domain_xmls]
+        self.list_all_domains_calls = 0
+        self.lookup_calls = 0
+        self.close_calls = 0
+
+    def listAllDomains(self, flags=0):
+        self.list_all_domains_calls += 1
+        return list(self.domains)
+
+    def lookupByName(self, name):
+        self.lookup_calls += 1
+        for domain in self.domains:
+            if domain.name() == name:
+                return domain
+        raise MockLibvirtError('Domain not found: {0}'.format(name))
+
+    def defineXML(self, xml):
+        domain = MockDomain(connection=self, xml=xml)
+        for index, defined_domain in enumerate(self.domains):
+            if defined_domain.name() == domain.name():
+                domain.active = defined_domain.active
+                self.domains[index] = domain
+                return domain
+        self.domains.append(domain)
+        return domain
+
+    def domainEventRegisterAny(self, dom, eventID, cb, opaque):
+        if not self.events:
+            raise MockLibvirtError('no event loop registered')
+        callback_id = next(self.__callback_ids)
+        self.event_callbacks[callback_id] = (dom, eventID, cb, opaque)
+        return callback_id
+
+    def domainEventDeregisterAny(self, callbackID):
+        del self.event_callbacks[callbackID]
+        return 0
+
+    def emit_lifecycle_event(self, domain, event, detail=0):
+        """Call the lifecycle callbacks registered for a domain"""
+        for dom, event_id, callback, opaque in list(
+                self.event_callbacks.values()):
+            if event_id == 0 and (dom is None or dom.name() == domain.name()):
+                callback(self, domain, event, detail, opaque)
+
+    def isAlive(self):
+        return 1 if self.alive else 0
+
+    def close(self):
+        self.close_calls += 1
+        self.alive = False
+        return 0
@@ -1,136 +1,372 @@
-import uuid
+import time
+from operator import itemgetter
+
+from intermediate_node import IntermediateNode
+from lazy_import import LazyClassAttribute, LazyModule
+from pipeline_stats import count_nodes
+from uuid_cache import UuidCache
+
+uuid = LazyModule('uuid', globals(), 'uuid')
+
+def _parameter_getter(parameter_path, required=True):
+    """Build a function looking a parameter up by its path
+
+    Args:
+        parameter_path (str): the parameter path, e.g.
+            'resources/os_type'.
+        required (bool): False to get None when the last key is missing
+            instead of raising KeyError.
+
+    Returns:
+        function: receives the module parameters and returns the value.
+    """
+    keys = parameter_path.split('/')
+    scope_getters = [itemgetter(key) for key in keys[:-1]]
+    last_key = keys[-1]
+    if required:
+        get_last = itemgetter(last_key)
+    else:
+        get_last = lambda scope: scope.get(last_key)
+    if not scope_getters:
+        return get_last
+
+    def get_parameter(params):
+        for get_scope in scope_getters:
+            params = get_scope(params)
+        return get_last(params)
+    return get_parameter
+
+def _value_spec(value_spec):
+    """Split a text or attribute spec into its path and conversion"""
+    if isinstance(value_spec, tuple):
+        return value_spec
+    return value_spec, None
+
+def _attributes_builder(attributes):
+    """Build a function building the attribute list of an element
+
+    Returns:
+        function: receives the module parameters and returns the
+            attribute dicts, None if there are no attributes.
+    """
+    if not attributes:
+        return None
+    getters = []
+    for attribute_name, value_spec in sorted(attributes.items()):
+        parameter_path, convert = _value_spec(value_spec=value_spec)
+        getters.append((attribute_name, _parameter_getter(
+            parameter_path=parameter_path), convert))
+
+    def build_attributes(params):
+        attribute_list = []
+        for attribute_name, get_value, convert in getters:
+            attribute_value = get_value(params)
+            if convert is not None:
+                attribute_value = convert(attribute_value)
+            attribute_list.append({'attribute_name': attribute_name,
+                'attribute_value': attribute_value})
+        return attribute_list
+    return build_attributes
 
 class ModuleToIntermediate:
     """Convert libvirt_domain module to an intermediate representation
+
+    The conversion is driven by the FIELDS table. Each field maps an
+    element path, relative to the domain element, to the module
+    parameters holding its text and attributes:
+
+        path (str): the element path, e.g. 'os/type'. Parent elements
+            are created as needed and shared between fields.
+        text (str|tuple): the parameter path of the text, e.g.
+            'resources/os_type', or a (parameter path, conversion) pair
+            such as ('resources/vcpus_max', str). Values without a
+            conversion are used as they are.
+        attributes (dict): attribute name to parameter path, or to a
+            (parameter path, conversion) pair.
+        required (bool): False to leave the element out when the text
+            parameter is missing or empty. Defaults to True.
+        default (tuple): for optional fields, the parameter path of a
+            value and a function receiving the class and that value,
+            used to build the text when the text parameter is empty.
+
+    The table is compiled once per class into a converter function, so
+    converting more domains does no parsing of the table.
     """
 
     # Copied and adapted from core.py
-    UUID_NAMESPACE_ANSIBLE = uuid.UUID('361E6D51-FAEC-444A-9079-341386DA8E2E')
+    UUID_NAMESPACE_ANSIBLE = LazyClassAttribute(
+        lambda cls: uuid.UUID(cls._NAMESPACE_HEX))
+
+    # The namespace as a string, so uuid is only imported when
+    # UUID_NAMESPACE_ANSIBLE is used.
+    _NAMESPACE_HEX = '361E6D51-FAEC-444A-9079-341386DA8E2E'
+
+    # The UuidCache of each namespace, shared by every class using it, so
+    # the UUID of a domain name is only derived once per process.
+    _UUID_CACHES = {}
+
+    # The cache of the class namespace, which follows a subclass
+    # overriding UUID_NAMESPACE_ANSIBLE.
+    UUID_CACHE = LazyClassAttribute(lambda cls: cls._namespace_cache())
+
+    ROOT_ATTRIBUTES = {'type': 'resources/domain_type'}
+
+    # Libvirt convert memory units to KiB when dumping XML information,
+    # the units are normalized later by MemoryNormalizer.
+    FIELDS = (
+        {'path': 'currentMemory', 'text': ('resources/memory_current', str),
+            'attributes': {'unit': 'resources/memory_current_unit'}},
+        {'path': 'description', 'text': 'resources/description',
+            'required': False},
+        {'path': 'memory', 'text': ('resources/memory_max', str),
+            'attributes': {'unit': 'resources/memory_max_unit'}},
+        {'path': 'name', 'text': 'name'},
+        {'path': 'os/type', 'text': 'resources/os_type'},
+        {'path': 'title', 'text': 'resources/title', 'required': False},
+        {'path': 'uuid', 'text': 'resources/uuid', 'required': False,
+            'default': ('name', lambda cls, name: cls.to_uuid(string=name))},
+        {'path': 'vcpu', 'text': ('resources/vcpus_max', str),
+            'attributes': {'current': ('resources/vcpus_current', str)}}
+    )
 
-    def __init__(self, libvirt_domain_module):
-        """Class constructor"""
+    def __init__(self, libvirt_domain_module, as_node=False, stats=None):
+        """Class constructor
+
+        Args:
+            libvirt_domain_module (AnsibleModule): the module instance.
+            as_node (bool): produce an IntermediateNode instead of a
+                dict.
+            stats (PipelineStats): records the conversion under the
+                'ModuleToIntermediate' stage.
+        """
+        if stats is not None:
+            start = time.perf_counter()
         self.libvirt_domain_module = libvirt_domain_module
-        self.__parse_domain_element()
-        self.parse_current_memory()
-        self.parse_description()
-        self.parse_memory()
-        self.parse_name()
-        self.parse_os_type()
-        self.parse_title()
-        self.parse_uuid()
-        self.parse_vcpu()
-
-    def __parse_domain_element(self):
-        self.__representation = {
-            'element_name': 'domain',
-            'attributes': [{
-                'attribute_name': 'type',
-                'attribute_value': (self.libvirt_domain_module.params
-                    ['resources']['domain_type']),
-            }],
-            'children': []
-        }
+        self.__representation = self._convert(
+            params=libvirt_domain_module.params)
+        if as_node:
+            self.__representation = IntermediateNode.from_dict(
+                element=self.__representation)
+        if stats is not None:
+            seconds = time.perf_counter() - start
+            stats.record(stage='ModuleToIntermediate', seconds=seconds,
+                nodes=count_nodes(intermediate=self.__representation))
+
+    @classmethod
+    def convert_many(cls, param_sets, as_node=False, stats=None):
+        """Convert the module parameters of many domains
+
+        Args:
+            param_sets (iterable): the module parameters of each domain.
+            as_node (bool): produce IntermediateNode objects instead of
+                dicts.
+            stats (PipelineStats): records the whole conversion as one
+                'ModuleToIntermediate' run.
+
+        Returns:
+            list: the intermediates, in param_sets order.
+        """
+        if stats is not None:
+            start = time.perf_counter()
+        convert = cls._convert
+        intermediates = [convert(params=params) for params in param_sets]
+        if as_node:
+            from_dict = IntermediateNode.from_dict
+            intermediates = [from_dict(element=intermediate)
+                for intermediate in intermediates]
+        if stats is not None:
+            seconds = time.perf_counter() - start
+            stats.record(stage='ModuleToIntermediate', seconds=seconds,
+                nodes=sum(count_nodes(intermediate=intermediate)
+                for intermediate in intermediates))
+        return intermediates
+
+    @classmethod
+    def _convert(cls, params):
+        """Convert module parameters with the compiled field table
+
+        Returns:
+            dict: the domain intermediate.
+        """
+        converter = cls.__dict__.get('_converter')
+        if converter is None:
+            converter = cls._compile_fields()
+        return converter(params)
+
+    @classmethod
+    def _compile_fields(cls):
+        """Compile ROOT_ATTRIBUTES and FIELDS into a converter function
+
+        Each parameter path becomes a chain of itemgetters and each
+        field a function building its element, so converting a domain
+        only runs the lookups. The converter and the element builders,
+        by field path, are stored on the class, so they are built once
+        per process.
+
+        Returns:
+            function: receives the module parameters and returns the
+                domain intermediate.
+        """
+        build_root_attributes = _attributes_builder(
+            attributes=cls.ROOT_ATTRIBUTES)
+        fields = [(tuple(field['path'].split('/')[:-1]),
+            cls.__element_builder(field=field)) for field in cls.FIELDS]
+        cls._element_builders = {field['path']: build_element
+            for field, (_, build_element) in zip(cls.FIELDS, fields)}
+
+        def convert(params):
+            children = []
+            parents = {}
+            for parent_path, build_element in fields:
+                element = build_element(params)
+                if element is None:
+                    continue
+                siblings = children
+                for depth in range(len(parent_path)):
+                    parent = parents.get(parent_path[:depth + 1])
+                    if parent is None:
+                        parent = parents[parent_path[:depth + 1]] = {
+                            'element_name': parent_path[depth],
+                            'children': []}
+                        siblings.append(parent)
+                    siblings = parent['children']
+                siblings.append(element)
+            return {'element_name': 'domain',
+                'attributes': build_root_attributes(params),
+                'children': children}
+
+        cls._converter = convert
+        return convert
+
+    @classmethod
+    def __element_builder(cls, field):
+        """Build a function building the element of a field
+
+        Returns:
+            function: receives the module parameters and returns the
+                element, None if an optional element is left out.
+        """
+        element_name = field['path'].split('/')[-1]
+        required = field.get('required', True)
+        text_path, convert_text = _value_spec(value_spec=field['text'])
+        get_text = _parameter_getter(parameter_path=text_path,
+            required=required)
+        build_attributes = _attributes_builder(
+            attributes=field.get('attributes'))
+        default = field.get('default')
+        if default is not None:
+            default_path, default_function = default
+            get_default = _parameter_getter(parameter_path=default_path)
+
+        def build_element(params):
+            text = get_text(params)
+            if not required and not text:
+                if default is None:
+                    return None
+                text = default_function(cls, get_default(params))
+            if convert_text is not None:
+                text = convert_text(text)
+            element = {'element_name': element_name, 'text': text}
+            if build_attributes is not None:
+                element['attributes'] = build_attributes(params)
+            return element
+        return build_element
+
+    def _build_field(self, path):
+        """Build the element of one field from the module parameters
+
+        Args:
+            path (str): the field path, e.g. 'os/type'.
+
+        Returns:
+            dict: the element, inside its parent elements if it has any,
+                as it is added to the domain children. None if an
+                optional element is left out.
+        """
+        cls = type(self)
+        if '_element_builders' not in cls.__dict__:
+            cls._compile_fields()
+        element = cls._element_builders[path](
+            self.libvirt_domain_module.params)
+        if element is None:
+            return None
+        for parent_name in reversed(path.split('/')[:-1]):
+            element = {'element_name': parent_name, 'children': [element]}
+        return element
 
     def parse_name(self):
-        self.__representation['children'].append({
-            'element_name': 'name',
-            'text': self.libvirt_domain_module.params['name']
-        })
+        return self._build_field(path='name')
 
     def parse_uuid(self):
-        domain_uuid = self.to_uuid(
-            string=self.libvirt_domain_module.params['name'])
-        if ('uuid' in self.libvirt_domain_module.params['resources']
-            and self.libvirt_domain_module.params['resources']['uuid']):
-            domain_uuid = self.libvirt_domain_module.params['resources']['uuid']
-        self.__representation['children'].append({
-            'element_name': 'uuid',
-            'text': domain_uuid
-        })
+        return self._build_field(path='uuid')
 
     def parse_title(self):
-        if ('title' in self.libvirt_domain_module.params['resources']
-            and self.libvirt_domain_module.params['resources']['title']):
-            self.__representation['children'].append({
-                'element_name': 'title',
-                'text': self.libvirt_domain_module.params['resources']['title']
-            })
+        return self._build_field(path='title')
 
     def parse_description(self):
-        if ('description' in self.libvirt_domain_module.params['resources']
-            and self.libvirt_domain_module.params['resources']['description']):
-            self.__representation['children'].append({
-                'element_name': 'description',
-                'text': (self.libvirt_domain_module.params['resources']
-                    ['description'])
-            })
-
-    # We must pay attention for int/string conversions and decide if
-    # we're gonna do this here, in the libvirt_domain_xml or the
-    # module will do.
+        return self._build_field(path='description')
+
     def parse_vcpu(self):
-        self.__representation['children'].append({
-            'element_name': 'vcpu',
-            'text': str(self.libvirt_domain_module.params['resources']
-                ['vcpus_max']),
-            'attributes': [{
-                'attribute_name': 'current',
-                'attribute_value': str(self.libvirt_domain_module.params
-                    ['resources']['vcpus_current'])
-            }]
-        })
+        return self._build_field(path='vcpu')
 
     def parse_memory(self):
-        """Parses memory element
+        """Build the memory element
 
-        Libvirt convert units to KiB when dumping XML information.
-        Because of this, if we want to maintain comparison simple,
-        we need to convert unit to KiB, though it is not strictly
-        needed for definition/creation.
+        Libvirt convert units to KiB when dumping XML information, the
+        unit is normalized later by MemoryNormalizer.
         """
-        self.__representation['children'].append({
-            'element_name': 'memory',
-            'text': str(self.libvirt_domain_module.params['resources']
-                ['memory_max']),
-            'attributes': [{
-                'attribute_name': 'unit',
-                'attribute_value': (self.libvirt_domain_module.params
-                    ['resources']['memory_max_unit'])
-            }]
-        })
+        return self._build_field(path='memory')
 
     def parse_current_memory(self):
-        """Parses current memory element
+        """Build the current memory element
 
-        Libvirt convert units to KiB when dumping XML information.
-        Because of this, if we want to maintain comparison simple,
-        we need to convert unit to KiB, though it is not strictly
-        needed for definition/creation.
+        Libvirt convert units to KiB when dumping XML information, the
+        unit is normalized later by MemoryNormalizer.
         """
-        self.__representation['children'].append({
-            'element_name': 'currentMemory',
-            'text': str(self.libvirt_domain_module.params['resources']
-                ['memory_current']),
-            'attributes': [{
-                'attribute_name': 'unit',
-                'attribute_value': (self.libvirt_domain_module.params
-                    ['resources']['memory_current_unit'])
-            }]
-        })
+        return self._build_field(path='currentMemory')
 
     def parse_os_type(self):
-        self.__representation['children'].append({
-            'element_name': 'os',
-            'children': [{
-                'element_name': 'type',
-                'text': (self.libvirt_domain_module.params['resources']
-                    ['os_type'])
-            }]
-        })
+        return self._build_field(path='os/type')
+
+    @classmethod
+    def _namespace_cache(cls):
+        """Get the UuidCache of the class namespace
+
+        UUID_NAMESPACE_ANSIBLE is only read when a subclass overrides
+        it, with a UUID or a string, so the default namespace does not
+        import uuid.
+
+        Returns:
+            UuidCache: the cache, shared with the classes using the same
+                namespace.
+        """
+        namespace = cls._NAMESPACE_HEX
+        for klass in cls.__mro__:
+            if 'UUID_NAMESPACE_ANSIBLE' in klass.__dict__:
+                if not isinstance(klass.__dict__['UUID_NAMESPACE_ANSIBLE'],
+                        LazyClassAttribute):
+                    namespace = cls.UUID_NAMESPACE_ANSIBLE
+                break
+        key = str(namespace).replace('-', '').lower()
+        uuid_cache = cls._UUID_CACHES.get(key)
+        if uuid_cache is None:
+            uuid_cache = cls._UUID_CACHES.setdefault(key,
+                UuidCache(namespace=namespace))
+        return uuid_cache
 
     # Copied and adapted from core.py
-    def to_uuid(self, string):
-        return str(uuid.uuid5(self.UUID_NAMESPACE_ANSIBLE, str(string)))
+    @classmethod
+    def to_uuid(cls, string):
+        return cls.UUID_CACHE.uuid_for(name=string)
+
+    @classmethod
+    def uuids_for(cls, names):
+        """Get the UUIDs generated for many domain names
+
+        Returns:
+            list: the UUIDs, as to_uuid returns them, in names order.
+        """
+        return cls.UUID_CACHE.uuids_for(names=names)
 
     @property
     def representation(self):
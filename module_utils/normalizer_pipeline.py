@@ -0,0 +1,154 @@
+import time
+
+from intermediate_access import element_children, element_name
+from intermediate_copy import copy_element, copy_with_children
+from memory_normalizer import MemoryNormalizer
+
+class NormalizerPipeline:
+    """Apply a registry of field normalizers in a single traversal
+
+    Normalizers are registered with the path of the elements they apply
+    to, relative to the root element (e.g. 'memory' or 'os/type'). The
+    intermediate is walked once, descending only into elements on a
+    registered path, and every normalizer registered for an element's
+    path is applied to it in registration order.
+
+    A normalizer is a callable that receives an element, dict or
+    IntermediateNode, and normalizes its text and attributes in place.
+
+    In copy on write mode the intermediate is left untouched: normalizers
+    get copies of their elements, the ancestors of the changed elements
+    are copied too and every other subtree is shared with the input.
+
+    Attributes:
+        timings (dict): seconds spent in each registered normalizer,
+            keyed by its (path, normalizer name) registration, so a
+            callable registered for several paths is timed per path.
+        calls (dict): number of elements each registered normalizer was
+            applied to, keyed as timings.
+    """
+
+    def __init__(self, normalizers=()):
+        """Class constructor
+
+        Args:
+            normalizers (iterable): (path, normalizer) pairs.
+        """
+        self.__normalizers = {}
+        self.__prefixes = set()
+        self.timings = {}
+        self.calls = {}
+        for path, normalizer in normalizers:
+            self.register(path=path, normalizer=normalizer)
+
+    @classmethod
+    def default(cls):
+        """Build a pipeline with the standard normalizers
+
+        Returns:
+            NormalizerPipeline: a pipeline normalizing memory and
+                currentMemory to KiB.
+        """
+        memory_normalizer = MemoryNormalizer()
+        return cls(normalizers=[
+            ('memory', memory_normalizer.normalize_element),
+            ('currentMemory', memory_normalizer.normalize_element)
+        ])
+
+    def register(self, path, normalizer):
+        """Register a normalizer for the elements at a path
+
+        Args:
+            path (str): child element names separated by '/', relative
+                to the root element.
+            normalizer (callable): receives the element to normalize.
+        """
+        name = getattr(normalizer, '__qualname__', repr(normalizer))
+        self.__normalizers.setdefault(path, []).append((normalizer,
+            (path, name)))
+        element_names = path.split('/')
+        for index in range(1, len(element_names)):
+            self.__prefixes.add('/'.join(element_names[:index]))
+
+    def normalize(self, intermediate, copy_on_write=False):
+        """Normalize an intermediate
+
+        Args:
+            intermediate (dict|IntermediateNode): the intermediate
+                representation.
+            copy_on_write (bool): leave the intermediate untouched and
+                return a normalized copy sharing the unchanged subtrees.
+
+        Returns:
+            dict|IntermediateNode: the normalized intermediate.
+        """
+        if copy_on_write:
+            return self.__normalize_copy(element=intermediate, path=None)
+        stack = [(child, None)
+            for child in reversed(element_children(intermediate))]
+        while stack:
+            element, parent_path = stack.pop()
+            path = element_name(element)
+            if parent_path is not None:
+                path = '{0}/{1}'.format(parent_path, path)
+            for normalizer, key in self.__normalizers.get(path, ()):
+                self.__apply(normalizer=normalizer, key=key, element=element)
+            if path in self.__prefixes:
+                stack.extend((child, path)
+                    for child in reversed(element_children(element)))
+        return intermediate
+
+    def normalize_element(self, element, path):
+        """Apply the normalizers registered for a path to one element
+
+        Args:
+            element (dict|IntermediateNode): the element, normalized in
+                place. Its children are left alone.
+            path (str): the element path, relative to the root element.
+
+        Returns:
+            dict|IntermediateNode: the element.
+        """
+        for normalizer, key in self.__normalizers.get(path, ()):
+            self.__apply(normalizer=normalizer, key=key, element=element)
+        return element
+
+    def __normalize_copy(self, element, path):
+        """Normalize an element and its registered descendants
+
+        Args:
+            element (dict|IntermediateNode): the element.
+            path (str): the element path, None for the root element.
+
+        Returns:
+            dict|IntermediateNode: the element itself if nothing in it
+                was normalized, otherwise a normalized copy.
+        """
+        normalizers = self.__normalizers.get(path, ())
+        if normalizers:
+            element = copy_element(element=element)
+            for normalizer, key in normalizers:
+                self.__apply(normalizer=normalizer, key=key, element=element)
+        if path is not None and path not in self.__prefixes:
+            return element
+        children = element_children(element)
+        new_children = None
+        for index, child in enumerate(children):
+            child_path = element_name(child)
+            if path is not None:
+                child_path = '{0}/{1}'.format(path, child_path)
+            new_child = self.__normalize_copy(element=child, path=child_path)
+            if new_child is not child:
+                if new_children is None:
+                    new_children = list(children)
+                new_children[index] = new_child
+        if new_children is None:
+            return element
+        return copy_with_children(element=element, children=new_children)
+
+    def __apply(self, normalizer, key, element):
+        start = time.perf_counter()
+        normalizer(element)
+        self.timings[key] = (self.timings.get(key, 0.0)
+            + time.perf_counter() - start)
+        self.calls[key] = self.calls.get(key, 0) + 1
@@ -0,0 +1,108 @@
+from intermediate_node import IntermediateNode
+
+class PipelineStats:
+    """Counters collected by the conversion stages
+
+    Instrumentation is opt-in: pass the same PipelineStats as the stats
+    argument of XmlFilter, XmlToIntermediate, IntermediateToXml,
+    ModuleToIntermediate and MemoryNormalizer and each of them records
+    its wall time and counters under its own stage name. Without stats
+    the stages skip every measurement and count.
+
+    The result of as_dict is plain data, meant to be returned by the
+    module, e.g. under the 'diagnostics' key of its result.
+    """
+
+    COUNTERS = ('calls', 'seconds', 'nodes', 'xpath_queries', 'bytes_parsed',
+        'bytes_serialized')
+
+    def __init__(self):
+        self.__stages = {}
+
+    def record(self, stage, seconds=0.0, nodes=0, xpath_queries=0,
+            bytes_parsed=0, bytes_serialized=0, calls=1):
+        """Add a stage run to the counters
+
+        Args:
+            stage (str): the stage name, e.g. 'XmlFilter'.
+            seconds (float): wall time spent.
+            nodes (int): number of elements visited.
+            xpath_queries (int): number of XPath queries issued.
+            bytes_parsed (int): size of the XML parsed.
+            bytes_serialized (int): size of the XML serialized.
+            calls (int): 0 when adding to the previous run, e.g. for a
+                deferred serialization.
+        """
+        counters = self.__stages.get(stage)
+        if counters is None:
+            counters = self.__stages[stage] = dict.fromkeys(self.COUNTERS, 0)
+            counters['seconds'] = 0.0
+        counters['calls'] += calls
+        counters['seconds'] += seconds
+        counters['nodes'] += nodes
+        counters['xpath_queries'] += xpath_queries
+        counters['bytes_parsed'] += bytes_parsed
+        counters['bytes_serialized'] += bytes_serialized
+
+    def stage(self, stage):
+        """Get the counters of a stage
+
+        Returns:
+            dict: the counters, all zero if the stage never ran.
+        """
+        counters = self.__stages.get(stage)
+        if counters is None:
+            counters = dict.fromkeys(self.COUNTERS, 0)
+            counters['seconds'] = 0.0
+        return dict(counters)
+
+    def as_dict(self):
+        """Get every counter
+
+        Returns:
+            dict: the 'stages' key maps each stage name to its counters
+                and the 'total_seconds' key holds the summed wall time.
+        """
+        return {
+            'stages': {stage: dict(counters)
+                for stage, counters in self.__stages.items()},
+            'total_seconds': sum(counters['seconds']
+                for counters in self.__stages.values())
+        }
+
+    def clear(self):
+        self.__stages.clear()
+
+def count_nodes(intermediate):
+    """Count the elements of an intermediate
+
+    Args:
+        intermediate (dict|IntermediateNode): the intermediate.
+
+    Returns:
+        int: the number of elements, the root included.
+    """
+    total_nodes = 0
+    stack = [intermediate]
+    while stack:
+        element = stack.pop()
+        total_nodes += 1
+        if isinstance(element, IntermediateNode):
+            stack.extend(element.children)
+        else:
+            stack.extend(element.get('children', ()))
+    return total_nodes
+
+def xml_size(xml):
+    """Get the size in bytes of an XML document
+
+    Args:
+        xml (str|bytes): the XML. Strings are counted as UTF-8, so
+            non-ASCII XML is not under-reported.
+
+    Returns:
+        int: the number of bytes.
+    """
+    if isinstance(xml, str):
+        return len(xml.encode('utf-8'))
+    return len(xml)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from async_drift import check_domains
+from drift import DriftChecker
+from libvirt_connection import LibvirtConnectionManager
+from mock_libvirt import MockConnection
+
+class SlowConnection(MockConnection):
+
+    def listAllDomains(self, flags=0):
+        time.sleep(0.3)
+        return super().listAllDomains(flags=flags)
+
+class TestAsyncDrift(unittest.TestCase):
+
+    PARAMS = {
+        'vm-algol': {
+            'resources': {
+                'domain_type': 'kvm',
+                'uuid': 'bfbd7e3a-8b7e-5591-a73f-831f4e162627',
+                'title': 'cn-croquidigital2',
+                'memory_max': 8,
+                'memory_max_unit': 'GiB',
+                'memory_current': 8192,
+                'memory_current_unit': 'MiB',
+                'vcpus_max': 2,
+                'vcpus_current': 1,
+                'os_type': 'hvm'
+            }
+        }
+    }
+
+    HANGING_SECONDS = 1
+
+    @classmethod
+    def setUpClass(cls):
+        with open('domain.xml', 'r') as file:
+            cls.xml_string = file.read()
+
+    def open_connection(self, uri):
+        domain_xmls = [self.xml_string, self.xml_string.replace('vm-algol',
+            'vm-other')]
+        if uri == 'test:///slow':
+            return SlowConnection(uri=uri, domain_xmls=domain_xmls)
+        if uri == 'test:///broken':
+            raise ConnectionError('unreachable host')
+        if uri == 'test:///hanging':
+            time.sleep(self.HANGING_SECONDS)
+        return MockConnection(uri=uri, domain_xmls=domain_xmls)
+
+    def collect(self, uri_to_params, **kwargs):
+        async def collect_results():
+            return [result async for result in check_domains(
+                uri_to_params=uri_to_params, connection_manager=
+                LibvirtConnectionManager(open_connection=self.open_connection),
+                **kwargs)]
+        return asyncio.run(collect_results())
+
+    def test_results_as_they_finish(self):
+        with ThreadPoolExecutor(max_workers=2) as cpu_executor:
+            results = self.collect(uri_to_params={
+                'test:///slow': self.PARAMS,
+                'test:///fast': dict(self.PARAMS, **{'vm-absent': {}}),
+                'test:///broken': self.PARAMS
+            }, cpu_executor=cpu_executor, chunk_size=1)
+        # The slow host is listed last, after every other result.
+        self.assertEqual([result['file'] for result in results[-2:]],
+            ['test:///slow', 'test:///slow'])
+        self.assertEqual(sorted((result['file'] or '', result['domain'] or '',
+            result['status']) for result in results[:-2]), [
+            ('', 'vm-absent', DriftChecker.MISSING),
+            ('test:///broken', '', DriftChecker.ERROR),
+            ('test:///fast', 'vm-algol', DriftChecker.IN_SYNC),
+            ('test:///fast', 'vm-other', DriftChecker.UNMANAGED)
+        ])
+        self.assertEqual(sorted((result['domain'], result['status'])
+            for result in results[-2:]), [
+            ('vm-algol', DriftChecker.IN_SYNC),
+            ('vm-other', DriftChecker.UNMANAGED)
+        ])
+
+    def test_slow_connect(self):
+        arrivals = []
+
+        async def collect_arrivals():
+            start = time.perf_counter()
+            async for result in check_domains(uri_to_params={
+                    'test:///hanging': self.PARAMS,
+                    'test:///fast': self.PARAMS,
+                    'test:///other': self.PARAMS
+                    }, connection_manager=LibvirtConnectionManager(
+                    open_connection=self.open_connection),
+                    cpu_executor=cpu_executor):
+                arrivals.append((result['file'],
+                    time.perf_counter() - start))
+
+        with ThreadPoolExecutor(max_workers=2) as cpu_executor:
+            asyncio.run(collect_arrivals())
+        self.assertEqual([file for file, _ in arrivals[-2:]],
+            ['test:///hanging', 'test:///hanging'])
+        self.assertEqual(sorted(file for file, _ in arrivals[:-2]),
+            ['test:///fast', 'test:///fast', 'test:///other',
+            'test:///other'])
+        self.assertTrue(all(seconds < self.HANGING_SECONDS
+            for _, seconds in arrivals[:-2]))
+
+    def test_process_pool(self):
+        results = self.collect(uri_to_params={'test:///fast': self.PARAMS})
+        self.assertEqual(sorted((result['domain'], result['status'])
+            for result in results), [
+            ('vm-algol', DriftChecker.IN_SYNC),
+            ('vm-other', DriftChecker.UNMANAGED)
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
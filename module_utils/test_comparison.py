@@ -5,6 +5,7 @@ import unittest
 from lxml import etree
 
 from mock_ansible_module import MockAnsibleModule
+from domain_xml_to_intermediate import domain_xml_to_intermediate
 from xml_filter import XmlFilter
 from module_to_intermediate import ModuleToIntermediate
 from xml_to_intermediate import XmlToIntermediate
@@ -37,6 +38,15 @@ class TestComparison(unittest.TestCase):
         domain_intermediate = XmlToIntermediate(xml_string=filtered_xml)
         self.assertEqual(module_intermediate.representation, domain_intermediate.representation)
 
+    def test_xml_and_module_comparison_single_pass(self):
+        ansible_module = self.get_anisble_module()
+        module_intermediate = ModuleToIntermediate(
+            libvirt_domain_module=ansible_module)
+        domain_intermediate = domain_xml_to_intermediate(source='domain.xml',
+            filter_spec=self.FILTER_SPEC)
+        self.assertEqual(module_intermediate.representation,
+            domain_intermediate)
+
     def get_anisble_module(self):
         module_parameters = {
             'name': 'vm-algol',
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from definition_index import DefinitionIndex, InotifyWatcher
+
+try:
+    InotifyWatcher(directory=tempfile.gettempdir()).close()
+    HAS_INOTIFY = True
+except (OSError, AttributeError):
+    HAS_INOTIFY = False
+
+class TestDefinitionIndex(unittest.TestCase):
+
+    FILTER_SPEC = {
+        'domain': {
+            'name': {},
+            'uuid': {},
+            'currentMemory': {'__attributes__': ['unit']}
+        }
+    }
+
+    XML_TEMPLATE = ('<domain type="kvm"><name>{0}</name>'
+        '<uuid>{1}</uuid><currentMemory unit="MiB">{2}</currentMemory>'
+        '<devices><disk type="file"/></devices></domain>')
+
+    UUIDS = {
+        'vm-foo': '6404F873-9FAE-5BD4-B141-5D1B1BD27DF9',
+        'vm-bar': 'bfbd7e3a-8b7e-5591-a73f-831f4e162627'
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.write(file_name='vm-foo.xml', domain_name='vm-foo')
+        self.write(file_name='vm-bar.xml', domain_name='vm-bar')
+        with open(os.path.join(self.directory, 'notes.txt'), 'w') as file:
+            file.write('not a definition')
+        self.index = DefinitionIndex(directory=self.directory,
+            filter_spec=self.FILTER_SPEC)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, file_name, domain_name, memory=512, mtime=None):
+        path = os.path.join(self.directory, file_name)
+        with open(path, 'w') as file:
+            file.write(self.XML_TEMPLATE.format(domain_name,
+                self.UUIDS[domain_name], memory))
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def memory(self, intermediate):
+        return [child['text'] for child in intermediate['children']
+            if child['element_name'] == 'currentMemory'][0]
+
+    def test_scan(self):
+        changes = self.index.scan()
+        self.assertEqual(changes, {
+            DefinitionIndex.ADDED: [os.path.join(self.directory, file_name)
+                for file_name in ('vm-bar.xml', 'vm-foo.xml')],
+            DefinitionIndex.CHANGED: [],
+            DefinitionIndex.REMOVED: []
+        })
+        self.assertEqual(sorted(self.index.names()), ['vm-bar', 'vm-foo'])
+        self.assertEqual(len(self.index), 2)
+        intermediate = self.index.by_name('vm-foo')
+        self.assertEqual(self.memory(intermediate), '524288')
+        self.assertIs(self.index.by_uuid(self.UUIDS['vm-foo'].lower()),
+            intermediate)
+        self.assertIsNone(self.index.by_name('vm-missing'))
+        self.assertEqual(self.index.path('vm-bar'),
+            os.path.join(self.directory, 'vm-bar.xml'))
+
+    def test_rescan_only_changed(self):
+        self.index.scan()
+        foo = self.index.by_name('vm-foo')
+        bar = self.index.by_name('vm-bar')
+        self.assertEqual(self.index.scan(), {DefinitionIndex.ADDED: [],
+            DefinitionIndex.CHANGED: [], DefinitionIndex.REMOVED: []})
+        # Same content with a new mtime is not converted again.
+        self.write(file_name='vm-bar.xml', domain_name='vm-bar',
+            mtime=10 ** 18)
+        path = self.write(file_name='vm-foo.xml', domain_name='vm-foo',
+            memory=1024, mtime=10 ** 18)
+        self.assertEqual(self.index.scan()[DefinitionIndex.CHANGED], [path])
+        self.assertIs(self.index.by_name('vm-bar'), bar)
+        self.assertIsNot(self.index.by_name('vm-foo'), foo)
+        self.assertEqual(self.memory(self.index.by_name('vm-foo')),
+            '1048576')
+
+    def test_removed_and_broken(self):
+        self.index.scan()
+        os.remove(os.path.join(self.directory, 'vm-bar.xml'))
+        broken = os.path.join(self.directory, 'vm-foo.xml')
+        with open(broken, 'w') as file:
+            file.write('<domain>')
+        changes = self.index.scan()
+        self.assertEqual(sorted(changes[DefinitionIndex.REMOVED]), [
+            os.path.join(self.directory, 'vm-bar.xml'), broken])
+        self.assertEqual(len(self.index), 0)
+        self.assertIsNone(self.index.by_uuid(self.UUIDS['vm-bar']))
+        self.assertEqual(list(self.index.errors), [broken])
+        self.write(file_name='vm-foo.xml', domain_name='vm-foo')
+        self.assertEqual(self.index.scan()[DefinitionIndex.ADDED], [broken])
+        self.assertEqual(self.index.errors, {})
+
+    def test_same_domain_in_many_files(self):
+        self.write(file_name='vm-foo.xml', domain_name='vm-foo',
+            mtime=10 ** 18)
+        save_file = self.write(file_name='vm-foo.save.xml',
+            domain_name='vm-foo', memory=2048, mtime=2 * 10 ** 18)
+        self.index.scan()
+        self.assertEqual(self.index.path('vm-foo'), save_file)
+        os.remove(save_file)
+        self.index.update(paths=[save_file])
+        self.assertEqual(self.index.path('vm-foo'),
+            os.path.join(self.directory, 'vm-foo.xml'))
+        self.assertEqual(self.memory(self.index.by_uuid(
+            self.UUIDS['vm-foo'])), '524288')
+
+    def test_touched_file_wins(self):
+        path = self.write(file_name='vm-foo.xml', domain_name='vm-foo',
+            mtime=10 ** 18)
+        save_file = self.write(file_name='vm-foo.save.xml',
+            domain_name='vm-foo', memory=2048, mtime=2 * 10 ** 18)
+        self.index.scan()
+        self.assertEqual(self.index.path('vm-foo'), save_file)
+        # Same content with a newer mtime.
+        os.utime(path, ns=(3 * 10 ** 18, 3 * 10 ** 18))
+        self.assertEqual(self.index.scan()[DefinitionIndex.CHANGED], [])
+        self.assertEqual(self.index.path('vm-foo'), path)
+        self.assertEqual(self.memory(self.index.by_uuid(
+            self.UUIDS['vm-foo'])), '524288')
+
+    @unittest.skipUnless(HAS_INOTIFY, 'inotify is not available')
+    def test_watch(self):
+        self.index.scan()
+        self.assertEqual(self.index.watch(timeout=0),
+            {DefinitionIndex.ADDED: [], DefinitionIndex.CHANGED: [],
+            DefinitionIndex.REMOVED: []})
+        # Written then renamed over the old file, as libvirt does.
+        temporary_path = self.write(file_name='vm-foo.xml.new',
+            domain_name='vm-foo', memory=4096)
+        path = os.path.join(self.directory, 'vm-foo.xml')
+        os.replace(temporary_path, path)
+        self.assertEqual(self.index.watch(timeout=5)[DefinitionIndex.CHANGED],
+            [path])
+        self.assertEqual(self.memory(self.index.by_name('vm-foo')),
+            '4194304')
+
+if __name__ == '__main__':
+    unittest.main()
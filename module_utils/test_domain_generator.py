@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from benchmarks.domain_generator import DomainGenerator
+
+class TestDomainGenerator(unittest.TestCase):
+
+    def test_deterministic(self):
+        self.assertEqual(DomainGenerator(total_disks=3, seed=7).xml,
+            DomainGenerator(total_disks=3, seed=7).xml)
+        self.assertNotEqual(DomainGenerator(total_disks=3, seed=7).xml,
+            DomainGenerator(total_disks=3, seed=8).xml)
+
+    def test_device_counts(self):
+        domain = DomainGenerator(total_disks=30, total_interfaces=4,
+            total_channels=2).xml_tree
+        self.assertEqual(len(domain.findall('devices/disk')), 30)
+        self.assertEqual(len(domain.findall('devices/interface')), 4)
+        self.assertEqual(len(domain.findall('devices/channel')), 2)
+        disk_targets = domain.xpath('devices/disk/target/@dev')
+        self.assertEqual(len(set(disk_targets)), 30)
+        self.assertEqual(disk_targets[26:28], ['vdaa', 'vdab'])
+
+    def test_for_total_devices(self):
+        domain = DomainGenerator.for_total_devices(total_devices=10).xml_tree
+        self.assertEqual(len(domain.findall('devices/disk')), 5)
+        self.assertEqual(len(domain.findall('devices/interface')), 3)
+        self.assertEqual(len(domain.findall('devices/channel')), 2)
+
+    def test_nesting_depth(self):
+        domain = DomainGenerator(total_disks=1, nesting_depth=3).xml_tree
+        self.assertEqual(len(domain.findall(
+            'devices/disk/backingStore/backingStore/backingStore')), 1)
+
+if __name__ == '__main__':
+    unittest.main()
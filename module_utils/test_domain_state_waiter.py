@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+import unittest
+
+from domain_state_waiter import DomainStateWaiter
+from mock_libvirt import MockConnection
+
+class TestDomainStateWaiter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open('domain.xml', 'r') as file:
+            xml_string = file.read()
+        cls.domain_xmls = [xml_string.replace('vm-algol', 'vm-{0}'.format(
+            index)) for index in range(3)]
+
+    def start_later(self, connection, domain_names, emit_event=True,
+            delay=0.05):
+        def start_domains():
+            time.sleep(delay)
+            for domain_name in domain_names:
+                connection.lookupByName(domain_name).set_active(active=True,
+                    emit_event=emit_event)
+        thread = threading.Thread(target=start_domains)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_events(self):
+        connection = MockConnection(uri='test:///default',
+            domain_xmls=self.domain_xmls)
+        waiter = DomainStateWaiter(connection=connection, max_poll=10)
+        self.assertTrue(waiter.events_enabled)
+        self.start_later(connection=connection, domain_names=['vm-0'])
+        start = time.monotonic()
+        self.assertTrue(waiter.wait(domain_name='vm-0', state='running',
+            timeout=5))
+        self.assertLess(time.monotonic() - start, 1)
+        # One check before waiting and one after the event.
+        self.assertEqual(connection.domains[0].state_calls, 2)
+        waiter.close()
+        self.assertEqual(connection.event_callbacks, {})
+
+    def test_waiters_after_close(self):
+        connection = MockConnection(uri='test:///default',
+            domain_xmls=self.domain_xmls)
+        first_waiter = DomainStateWaiter(connection=connection, max_poll=10)
+        second_waiter = DomainStateWaiter(connection=connection, max_poll=10)
+        first_waiter.close()
+        # Registered after a close, it must not replace the callback of
+        # the second waiter.
+        third_waiter = DomainStateWaiter(connection=connection, max_poll=10)
+        self.assertEqual(len(connection.event_callbacks), 2)
+        self.start_later(connection=connection, domain_names=['vm-0'])
+        start = time.monotonic()
+        self.assertTrue(second_waiter.wait(domain_name='vm-0',
+            state='running', timeout=5))
+        self.assertLess(time.monotonic() - start, 1)
+        second_waiter.close()
+        third_waiter.close()
+        self.assertEqual(connection.event_callbacks, {})
+
+    def test_polling_fallback(self):
+        connection = MockConnection(uri='test:///default',
+            domain_xmls=self.domain_xmls, events=False)
+        waiter = DomainStateWaiter(connection=connection, poll=0.01,
+            max_poll=0.04)
+        self.assertFalse(waiter.events_enabled)
+        self.start_later(connection=connection, domain_names=['vm-0'],
+            emit_event=False, delay=0.2)
+        self.assertTrue(waiter.wait(domain_name='vm-0', state='running',
+            timeout=5))
+        # Backing off from 0.01 s to 0.04 s takes far fewer checks than
+        # polling every 0.01 s for 0.2 s.
+        self.assertLess(connection.domains[0].state_calls, 12)
+
+    def test_timeout(self):
+        connection = MockConnection(uri='test:///default',
+            domain_xmls=self.domain_xmls)
+        waiter = DomainStateWaiter(connection=connection, poll=0.01)
+        self.assertEqual(waiter.wait_many(wanted_states={'vm-0': 'running',
+            'vm-1': 'shutoff'}, timeout=0.05), {'vm-0': False, 'vm-1': True})
+
+    def test_wait_many_concurrently(self):
+        connection = MockConnection(uri='test:///default',
+            domain_xmls=self.domain_xmls)
+        waiter = DomainStateWaiter(connection=connection, max_poll=10)
+        self.start_later(connection=connection,
+            domain_names=['vm-0', 'vm-1', 'vm-2'])
+        results = {}
+        thread = threading.Thread(target=lambda: results.update(
+            waiter.wait_many(wanted_states={'vm-2': 'running'}, timeout=5)))
+        thread.start()
+        results.update(waiter.wait_many(wanted_states={'vm-0': 'running',
+            'vm-1': 'running'}, timeout=5))
+        thread.join()
+        self.assertEqual(results, {'vm-0': True, 'vm-1': True, 'vm-2': True})
+
+    def test_many_waiters_on_one_domain(self):
+        connection = MockConnection(uri='test:///default',
+            domain_xmls=self.domain_xmls)
+        waiter = DomainStateWaiter(connection=connection, max_poll=10)
+        self.start_later(connection=connection, domain_names=['vm-0'],
+            delay=0.2)
+        elapsed = []
+
+        def wait_running():
+            start = time.monotonic()
+            self.assertTrue(waiter.wait(domain_name='vm-0', state='running',
+                timeout=5))
+            elapsed.append(time.monotonic() - start)
+
+        threads = [threading.Thread(target=wait_running) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Both waits see the event, none waits for the safety check.
+        self.assertEqual(len(elapsed), 2)
+        self.assertLess(max(elapsed), 1)
+
+    def test_unknown_state(self):
+        waiter = DomainStateWaiter(connection=MockConnection(
+            uri='test:///default', domain_xmls=self.domain_xmls))
+        with self.assertRaises(ValueError):
+            waiter.wait(domain_name='vm-0', state='flying')
+
+if __name__ == '__main__':
+    unittest.main()
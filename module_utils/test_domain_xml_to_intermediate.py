@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from lxml import etree
+
+from domain_xml_to_intermediate import (domain_xml_to_intermediate,
+    parse_domain_xml)
+from xml_filter import CompiledFilter, XmlFilter
+from xml_to_intermediate import XmlToIntermediate
+
+class TestDomainXmlToIntermediate(unittest.TestCase):
+
+    FILTER_SPEC = {
+        'domain': {
+            '__attributes__': ['type'],
+            'name': {},
+            'uuid': {},
+            'title': {'required': False},
+            'description': {'required': False},
+            'memory': {'__attributes__': ['unit']},
+            'currentMemory': {'__attributes__': ['unit']},
+            'vcpu': {
+                '__attributes__': ['current']
+            },
+            'os': {
+                'type': {}
+            }
+        }
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open('domain.xml', 'rb') as file:
+            cls.xml_bytes = file.read()
+        xml_filter = XmlFilter(filter_spec=cls.FILTER_SPEC,
+            input_xml=cls.xml_bytes)
+        cls.expected = XmlToIntermediate(
+            xml_string=xml_filter.output_xml).representation
+
+    def test_from_bytes(self):
+        self.assertEqual(domain_xml_to_intermediate(source=self.xml_bytes,
+            filter_spec=self.FILTER_SPEC), self.expected)
+
+    def test_from_file_name(self):
+        self.assertEqual(domain_xml_to_intermediate(source='domain.xml',
+            filter_spec=self.FILTER_SPEC), self.expected)
+
+    def test_from_element(self):
+        element = etree.fromstring(self.xml_bytes)
+        compiled_filter = CompiledFilter(filter_spec=self.FILTER_SPEC)
+        self.assertEqual(domain_xml_to_intermediate(source=element,
+            filter_spec=compiled_filter), self.expected)
+
+    def test_root_not_in_filter(self):
+        self.assertIsNone(domain_xml_to_intermediate(source=self.xml_bytes,
+            filter_spec={'network': {}}))
+
+    def test_parse_domain_xml(self):
+        element = parse_domain_xml(source=self.xml_bytes.decode())
+        self.assertEqual(element.tag, 'domain')
+        self.assertIs(parse_domain_xml(source=element), element)
+        tree = etree.ElementTree(element)
+        self.assertIs(parse_domain_xml(source=tree), element)
+
+    def test_chained_elements(self):
+        xml_filter = XmlFilter(filter_spec=self.FILTER_SPEC,
+            input_xml=etree.fromstring(self.xml_bytes))
+        self.assertTrue(etree.iselement(xml_filter.output_xml_tree))
+        xml_to_intermediate = XmlToIntermediate(
+            xml_string=xml_filter.output_xml_tree)
+        self.assertEqual(xml_to_intermediate.representation, self.expected)
+
+if __name__ == '__main__':
+    unittest.main()
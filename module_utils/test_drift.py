@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from drift import DriftChecker, check_files, check_uri, main
+from libvirt_connection import LibvirtConnectionManager
+from mock_libvirt import MockConnection
+
+class TestDrift(unittest.TestCase):
+
+    PARAMS = {
+        'vm-algol': {
+            'resources': {
+                'domain_type': 'kvm',
+                'uuid': 'bfbd7e3a-8b7e-5591-a73f-831f4e162627',
+                'title': 'cn-croquidigital2',
+                'memory_max': 8,
+                'memory_max_unit': 'GiB',
+                'memory_current': 8192,
+                'memory_current_unit': 'MiB',
+                'vcpus_max': 2,
+                'vcpus_current': 1,
+                'os_type': 'hvm'
+            }
+        }
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.xml_directory = os.path.join(self.directory, 'qemu')
+        os.mkdir(self.xml_directory)
+        shutil.copy('domain.xml', os.path.join(self.xml_directory,
+            'vm-algol.xml'))
+        with open('domain.xml', 'r') as file:
+            xml_string = file.read()
+        with open(os.path.join(self.xml_directory, 'vm-other.xml'),
+                'w') as file:
+            file.write(xml_string.replace('vm-algol', 'vm-other'))
+        with open(os.path.join(self.xml_directory, 'broken.xml'), 'w') as file:
+            file.write('<domain>')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_params(self, params):
+        params_path = os.path.join(self.directory, 'params.json')
+        with open(params_path, 'w') as file:
+            json.dump(params, file)
+        return params_path
+
+    def run_main(self, params, workers):
+        output = io.StringIO()
+        report = io.StringIO()
+        exit_status = main(argv=['--params', self.write_params(params),
+            '--workers', str(workers), '--chunk-size', '1',
+            self.xml_directory], output=output, report=report)
+        results = [json.loads(line) for line in
+            output.getvalue().splitlines()]
+        return exit_status, sorted(results, key=lambda x: x['file'] or ''), \
+            report.getvalue()
+
+    def test_check_file_in_sync(self):
+        checker = DriftChecker(params=self.PARAMS)
+        result = checker.check_file(path='domain.xml')
+        self.assertEqual(result['domain'], 'vm-algol')
+        self.assertEqual(result['status'], DriftChecker.IN_SYNC)
+        self.assertEqual(result['changes'], [])
+
+    def test_check_file_drift(self):
+        params = json.loads(json.dumps(self.PARAMS))
+        params['vm-algol']['resources']['memory_current'] = 4
+        params['vm-algol']['resources']['memory_current_unit'] = 'GiB'
+        result = DriftChecker(params=params).check_file(path='domain.xml')
+        self.assertEqual(result['status'], DriftChecker.DRIFT)
+        self.assertEqual(result['changes'], [{
+            'action': 'changed', 'target': 'text',
+            'path': 'domain/currentMemory', 'name': None,
+            'old_value': '8388608', 'new_value': '4194304'
+        }])
+
+    def test_check_files_missing(self):
+        params = dict(self.PARAMS, **{'vm-absent': {}})
+        results = list(check_files(xml_files=['domain.xml'], params=params,
+            workers=0))
+        self.assertEqual([result['status'] for result in results],
+            [DriftChecker.IN_SYNC, DriftChecker.MISSING])
+
+    def test_check_uri(self):
+        with open('domain.xml', 'r') as file:
+            xml_string = file.read()
+        connection_manager = LibvirtConnectionManager(
+            open_connection=lambda uri: MockConnection(uri=uri,
+            domain_xmls=[xml_string, xml_string.replace('vm-algol',
+            'vm-other')]))
+        params = dict(self.PARAMS, **{'vm-absent': {}})
+        results = list(check_uri(uri='test:///default', params=params,
+            connection_manager=connection_manager))
+        self.assertEqual([(result['domain'], result['status'])
+            for result in results], [
+            ('vm-algol', DriftChecker.IN_SYNC),
+            ('vm-other', DriftChecker.UNMANAGED),
+            ('vm-absent', DriftChecker.MISSING)
+        ])
+        self.assertEqual(results[0]['file'], 'test:///default')
+
+    def test_main_in_process(self):
+        exit_status, results, report = self.run_main(params=self.PARAMS,
+            workers=0)
+        self.assertEqual(exit_status, 1)
+        self.assertEqual([(os.path.basename(result['file']), result['status'])
+            for result in results], [
+            ('broken.xml', DriftChecker.ERROR),
+            ('vm-algol.xml', DriftChecker.IN_SYNC),
+            ('vm-other.xml', DriftChecker.UNMANAGED)
+        ])
+        self.assertIn('checked 3 domains', report)
+        self.assertIn('domains/s', report)
+
+    def test_main_process_pool(self):
+        _, expected, _ = self.run_main(params=self.PARAMS, workers=0)
+        exit_status, results, _ = self.run_main(params=self.PARAMS, workers=2)
+        self.assertEqual(exit_status, 1)
+        self.assertEqual(results, expected)
+
+    def test_module_entry_point(self):
+        os.remove(os.path.join(self.xml_directory, 'broken.xml'))
+        package_directory = os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__)))
+        completed = subprocess.run([sys.executable, '-m', 'module_utils.drift',
+            '--params', self.write_params(self.PARAMS), '--workers', '1',
+            self.xml_directory], cwd=package_directory,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(len(completed.stdout.splitlines()), 2)
+        self.assertIn('domains/s', completed.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
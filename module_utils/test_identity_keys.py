@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from identity_keys import IdentityKeys
+from intermediate_node import IntermediateNode
+
+class TestIdentityKeys(unittest.TestCase):
+
+    DISK = {
+        'element_name': 'disk',
+        'attributes': [{'attribute_name': 'type', 'attribute_value': 'file'}],
+        'children': [{
+            'element_name': 'target',
+            'attributes': [{'attribute_name': 'dev', 'attribute_value': 'vda'}]
+        }]
+    }
+
+    CONTROLLER = {
+        'element_name': 'controller',
+        'attributes': [
+            {'attribute_name': 'index', 'attribute_value': '0'},
+            {'attribute_name': 'type', 'attribute_value': 'usb'}
+        ]
+    }
+
+    def setUp(self):
+        self.identity_keys = IdentityKeys()
+
+    def test_attribute_key(self):
+        self.assertEqual(self.identity_keys.key(element=self.DISK), ('vda',))
+
+    def test_composite_key(self):
+        self.assertEqual(self.identity_keys.key(element=self.CONTROLLER),
+            ('usb', '0'))
+        self.assertEqual(self.identity_keys.predicate(
+            element_name='controller', key=('usb', '0')),
+            "[@type='usb'][@index='0']")
+
+    def test_missing_key(self):
+        self.assertIsNone(self.identity_keys.key(
+            element={'element_name': 'disk'}))
+        self.assertIsNone(self.identity_keys.key(
+            element={'element_name': 'video'}))
+
+    def test_text_key(self):
+        identity_keys = IdentityKeys(keys={'hostdev': 'alias'})
+        element = {'element_name': 'hostdev',
+            'children': [{'element_name': 'alias', 'text': 'hostdev0'}]}
+        self.assertEqual(identity_keys.key(element=element), ('hostdev0',))
+
+    def test_node_key(self):
+        node = IntermediateNode.from_dict(element=self.DISK)
+        self.assertEqual(self.identity_keys.key(element=node), ('vda',))
+
+    def test_sort_key(self):
+        children = [
+            {'element_name': 'disk',
+                'children': [{'element_name': 'target',
+                'attributes': [{'attribute_name': 'dev',
+                'attribute_value': 'vdb'}]}]},
+            {'element_name': 'disk'},
+            self.DISK,
+            {'element_name': 'controller'}
+        ]
+        children.sort(key=self.identity_keys.sort_key)
+        self.assertEqual([self.identity_keys.key(element=child)
+            for child in children], [None, ('vda',), ('vdb',), None])
+        self.assertEqual(children[0]['element_name'], 'controller')
+
+    def test_group(self):
+        other_disk = {'element_name': 'disk', 'children': [{
+            'element_name': 'target',
+            'attributes': [{'attribute_name': 'dev', 'attribute_value': 'vda'}]
+        }]}
+        keyed, unkeyed = self.identity_keys.group(children=[self.DISK,
+            {'element_name': 'disk'}, other_disk])
+        self.assertEqual(keyed, {('disk', ('vda',)): 0})
+        self.assertEqual(unkeyed, [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
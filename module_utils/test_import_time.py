@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+import json
+import unittest
+
+from benchmarks.import_time import IMPORT_BUDGETS_MS, heavy_imports
+from lazy_import import LazyClassAttribute, LazyModule
+
+class TestImportTime(unittest.TestCase):
+
+    # The time budgets are checked by python -m benchmarks.import_time.
+    def test_no_heavy_imports(self):
+        for module_name in sorted(IMPORT_BUDGETS_MS):
+            with self.subTest(module_name=module_name):
+                self.assertEqual(heavy_imports(module_name=module_name), [])
+
+class TestLazyImport(unittest.TestCase):
+
+    def test_lazy_module(self):
+        namespace = {}
+        namespace['json'] = LazyModule('json', namespace, 'json')
+        self.assertEqual(namespace['json'].dumps([1]), '[1]')
+        self.assertIs(namespace['json'], json)
+
+    def test_lazy_class_attribute(self):
+        calls = []
+
+        class Constants:
+            VALUE = LazyClassAttribute(lambda cls: calls.append(cls)
+                or cls.__name__)
+
+        class MoreConstants(Constants):
+            pass
+
+        self.assertEqual(calls, [])
+        self.assertEqual(Constants.VALUE, 'Constants')
+        self.assertEqual(Constants().VALUE, 'Constants')
+        self.assertEqual(MoreConstants.VALUE, 'MoreConstants')
+        self.assertEqual(calls, [Constants, MoreConstants])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+
+from intermediate_cache import IntermediateCache
+
+class TestIntermediateCache(unittest.TestCase):
+
+    FILTER_SPEC = {
+        'domain': {
+            '__attributes__': ['type'],
+            'name': {},
+            'memory': {'__attributes__': ['unit']},
+            'currentMemory': {'__attributes__': ['unit']}
+        }
+    }
+
+    XML_TEMPLATE = ('<domain type="kvm"><name>{0}</name>'
+        '<memory unit="GiB">1</memory>'
+        '<currentMemory unit="MiB">512</currentMemory>'
+        '<devices><disk type="file"/></devices></domain>')
+
+    def get_xml(self, name):
+        return self.XML_TEMPLATE.format(name).encode()
+
+    def test_miss_then_hit(self):
+        cache = IntermediateCache()
+        first = cache.get(xml=self.get_xml('vm-foo'),
+            filter_spec=self.FILTER_SPEC)
+        second = cache.get(xml=self.get_xml('vm-foo'),
+            filter_spec=self.FILTER_SPEC)
+        self.assertIs(first, second)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_normalized(self):
+        cache = IntermediateCache()
+        intermediate = cache.get(xml=self.get_xml('vm-foo'),
+            filter_spec=self.FILTER_SPEC)
+        memory = next(filter(lambda x: x['element_name'] == 'memory',
+            intermediate['children']))
+        self.assertEqual(memory['text'], str(1024*1024))
+        self.assertEqual(memory['attributes'][0]['attribute_value'], 'KiB')
+        self.assertNotIn('devices', [child['element_name'] for child in
+            intermediate['children']])
+
+    def test_without_memory(self):
+        cache = IntermediateCache()
+        with open('domain.xml', 'rb') as file:
+            xml = file.read()
+        intermediate = cache.get(xml=xml, filter_spec={'domain': {'name': {}}})
+        self.assertEqual(intermediate['children'], [{'element_name': 'name',
+            'text': 'vm-algol'}])
+        intermediate = cache.get(xml=self.get_xml('vm-foo').replace(
+            b'<currentMemory unit="MiB">512</currentMemory>', b''),
+            filter_spec=self.FILTER_SPEC)
+        self.assertEqual([child['element_name']
+            for child in intermediate['children']], ['memory', 'name'])
+
+    def test_filter_spec_in_key(self):
+        cache = IntermediateCache()
+        xml = self.get_xml('vm-foo')
+        other_spec = dict(self.FILTER_SPEC)
+        other_spec['domain'] = dict(self.FILTER_SPEC['domain'], uuid={})
+        self.assertNotEqual(cache.key(xml=xml, filter_spec=self.FILTER_SPEC),
+            cache.key(xml=xml, filter_spec=other_spec))
+
+    def test_filter_spec_changed_in_place(self):
+        cache = IntermediateCache()
+        xml = self.get_xml('vm-foo')
+        filter_spec = {'domain': {'name': {}}}
+        first = cache.get(xml=xml, filter_spec=filter_spec)
+        filter_spec['domain']['devices'] = {'disk': {}}
+        second = cache.get(xml=xml, filter_spec=filter_spec)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual([child['element_name']
+            for child in first['children']], ['name'])
+        self.assertEqual([child['element_name']
+            for child in second['children']], ['devices', 'name'])
+
+    def test_entries_bound(self):
+        cache = IntermediateCache(max_entries=2)
+        for name in ('vm-a', 'vm-b', 'vm-a', 'vm-c'):
+            cache.get(xml=self.get_xml(name), filter_spec=self.FILTER_SPEC)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        # vm-a was used more recently than vm-b, so vm-b was evicted.
+        cache.get(xml=self.get_xml('vm-a'), filter_spec=self.FILTER_SPEC)
+        self.assertEqual(cache.hits, 2)
+        cache.get(xml=self.get_xml('vm-b'), filter_spec=self.FILTER_SPEC)
+        self.assertEqual(cache.misses, 4)
+
+    def test_bytes_bound(self):
+        xml_size = len(self.get_xml('vm-a'))
+        cache = IntermediateCache(max_entries=None, max_bytes=xml_size * 2)
+        for name in ('vm-a', 'vm-b', 'vm-c'):
+            cache.get(xml=self.get_xml(name), filter_spec=self.FILTER_SPEC)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.total_bytes, xml_size * 2)
+        self.assertEqual(cache.stats['evictions'], 1)
+
+    def test_cache_dir_shared(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first_cache = IntermediateCache(cache_dir=cache_dir)
+            expected = first_cache.get(xml=self.get_xml('vm-foo'),
+                filter_spec=self.FILTER_SPEC)
+            second_cache = IntermediateCache(cache_dir=cache_dir)
+            intermediate = second_cache.get(xml=self.get_xml('vm-foo'),
+                filter_spec=self.FILTER_SPEC)
+            self.assertEqual(intermediate, expected)
+            self.assertEqual(second_cache.disk_hits, 1)
+            self.assertEqual(second_cache.misses, 0)
+
+if __name__ == '__main__':
+    unittest.main()
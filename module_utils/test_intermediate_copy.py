@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from intermediate_copy import copy_element, copy_with_children
+from intermediate_node import IntermediateNode
+
+class TestIntermediateCopy(unittest.TestCase):
+
+    ELEMENT = {
+        'element_name': 'memory',
+        'text': '1',
+        'attributes': [{'attribute_name': 'unit', 'attribute_value': 'GiB'}]
+    }
+
+    def test_copy_element(self):
+        element_copy = copy_element(element=self.ELEMENT)
+        self.assertEqual(element_copy, self.ELEMENT)
+        element_copy['attributes'][0]['attribute_value'] = 'KiB'
+        element_copy['text'] = '1048576'
+        self.assertEqual(self.ELEMENT['attributes'][0]['attribute_value'],
+            'GiB')
+        self.assertEqual(self.ELEMENT['text'], '1')
+
+    def test_copy_with_children(self):
+        child = {'element_name': 'type', 'text': 'hvm'}
+        element = {'element_name': 'os', 'children': [child]}
+        new_child = {'element_name': 'type', 'text': 'xen'}
+        element_copy = copy_with_children(element=element,
+            children=[new_child])
+        self.assertIs(element['children'][0], child)
+        self.assertIs(element_copy['children'][0], new_child)
+
+    def test_copy_node(self):
+        node = IntermediateNode(element_name='memory',
+            attributes=[('unit', 'GiB')], text='1')
+        node_copy = copy_element(element=node)
+        self.assertEqual(node_copy, node)
+        node_copy.set_attribute(attribute_name='unit', attribute_value='KiB')
+        node_copy.text = '1048576'
+        self.assertEqual(node.get_attribute(attribute_name='unit'), 'GiB')
+        self.assertEqual(node.text, '1')
+
+    def test_copy_node_with_children(self):
+        child = IntermediateNode(element_name='type', text='hvm')
+        node = IntermediateNode(element_name='os', children=[child])
+        new_child = IntermediateNode(element_name='type', text='xen')
+        node_copy = copy_with_children(element=node, children=[new_child])
+        self.assertIs(node.child(element_name='type'), child)
+        self.assertIs(node_copy.child(element_name='type'), new_child)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+import unittest
+import copy
+
+from identity_keys import IdentityKeys
+from intermediate_diff import Change, IntermediateDiff
+from intermediate_node import IntermediateNode
+from mock_ansible_module import MockAnsibleModule
+from module_to_intermediate import ModuleToIntermediate
+
+class TestIntermediateDiff(unittest.TestCase):
+
+    INTERMEDIATE = {
+        'element_name': 'domain',
+        'attributes': [{'attribute_name': 'type', 'attribute_value': 'kvm'}],
+        'children': [{
+            'element_name': 'currentMemory',
+            'text': '524288',
+            'attributes': [{'attribute_name': 'unit', 'attribute_value': 'KiB'}]
+        },{
+            'element_name': 'devices',
+            'children': [{
+                'element_name': 'disk',
+                'attributes': [{
+                    'attribute_name': 'device', 'attribute_value': 'disk'
+                }]
+            },{
+                'element_name': 'disk',
+                'attributes': [{
+                    'attribute_name': 'device', 'attribute_value': 'cdrom'
+                }]
+            }]
+        },{
+            'element_name': 'name',
+            'text': 'vm-foo'
+        },{
+            'element_name': 'vcpu',
+            'text': '2',
+            'attributes': [{'attribute_name': 'current', 'attribute_value': '1'}]
+        }]
+    }
+
+    def get_intermediate(self):
+        return copy.deepcopy(self.INTERMEDIATE)
+
+    def test_equal(self):
+        diff = IntermediateDiff(old=self.INTERMEDIATE,
+            new=self.get_intermediate())
+        self.assertEqual(diff.changes, [])
+
+    def test_changed_text(self):
+        new = self.get_intermediate()
+        new['children'][0]['text'] = '1048576'
+        diff = IntermediateDiff(old=self.INTERMEDIATE, new=new)
+        self.assertEqual(diff.changes, [Change(IntermediateDiff.CHANGED,
+            IntermediateDiff.TEXT, 'domain/currentMemory', None, '524288',
+            '1048576')])
+
+    def test_nodes(self):
+        new = self.get_intermediate()
+        new['children'][0]['text'] = '1048576'
+        new['children'][3]['attributes'][0]['attribute_value'] = '2'
+        expected = IntermediateDiff(old=self.INTERMEDIATE, new=new).changes
+        old_node = IntermediateNode.from_dict(element=self.INTERMEDIATE)
+        new_node = IntermediateNode.from_dict(element=new)
+        self.assertEqual(IntermediateDiff(old=old_node,
+            new=new_node).changes, expected)
+        self.assertEqual(IntermediateDiff(old=old_node, new=new).changes,
+            expected)
+        self.assertEqual(IntermediateDiff(old=old_node, new=IntermediateNode
+            .from_dict(element=self.INTERMEDIATE)).changes, [])
+
+    def test_attributes(self):
+        new = self.get_intermediate()
+        new['children'][3]['attributes'] = [
+            {'attribute_name': 'current', 'attribute_value': '2'},
+            {'attribute_name': 'placement', 'attribute_value': 'static'}
+        ]
+        del new['attributes']
+        diff = IntermediateDiff(old=self.INTERMEDIATE, new=new)
+        self.assertEqual(diff.changes, [
+            Change(IntermediateDiff.REMOVED, IntermediateDiff.ATTRIBUTE,
+                'domain', 'type', 'kvm', None),
+            Change(IntermediateDiff.CHANGED, IntermediateDiff.ATTRIBUTE,
+                'domain/vcpu', 'current', '1', '2'),
+            Change(IntermediateDiff.ADDED, IntermediateDiff.ATTRIBUTE,
+                'domain/vcpu', 'placement', None, 'static')
+        ])
+
+    def test_added_and_removed_elements(self):
+        new = self.get_intermediate()
+        title = {'element_name': 'title', 'text': 'foo'}
+        new['children'].append(title)
+        removed_name = new['children'].pop(2)
+        diff = IntermediateDiff(old=self.INTERMEDIATE, new=new)
+        self.assertEqual(diff.changes, [
+            Change(IntermediateDiff.REMOVED, IntermediateDiff.ELEMENT,
+                'domain/name', None, removed_name, None),
+            Change(IntermediateDiff.ADDED, IntermediateDiff.ELEMENT,
+                'domain/title', None, None, title)
+        ])
+
+    def test_reordered_repeated_siblings(self):
+        new = self.get_intermediate()
+        new['children'][1]['children'].reverse()
+        diff = IntermediateDiff(old=self.INTERMEDIATE, new=new)
+        self.assertEqual(diff.changes, [])
+
+    def test_changed_repeated_sibling(self):
+        new = self.get_intermediate()
+        new['children'][1]['children'].reverse()
+        new['children'][1]['children'][1]['attributes'][0][
+            'attribute_value'] = 'lun'
+        diff = IntermediateDiff(old=self.INTERMEDIATE, new=new)
+        self.assertEqual(diff.changes, [Change(IntermediateDiff.CHANGED,
+            IntermediateDiff.ATTRIBUTE, 'domain/devices/disk[1]', 'device',
+            'disk', 'lun')])
+
+    def get_devices(self, *target_devs):
+        return {
+            'element_name': 'devices',
+            'children': [{
+                'element_name': 'disk',
+                'attributes': [{
+                    'attribute_name': 'type', 'attribute_value': 'file'
+                }],
+                'children': [{
+                    'element_name': 'target',
+                    'attributes': [{
+                        'attribute_name': 'dev', 'attribute_value': dev
+                    }]
+                }]
+            } for dev in target_devs]
+        }
+
+    def test_keyed_siblings(self):
+        old = self.get_devices('vda', 'vdb', 'vdc')
+        new = self.get_devices('vdc', 'vda', 'vdb')
+        new['children'][2]['attributes'][0]['attribute_value'] = 'block'
+        diff = IntermediateDiff(old=old, new=new)
+        self.assertEqual(diff.changes, [Change(IntermediateDiff.CHANGED,
+            IntermediateDiff.ATTRIBUTE, "devices/disk[target/@dev='vdb']",
+            'type', 'file', 'block')])
+
+    def test_keyed_siblings_added_and_removed(self):
+        old = self.get_devices('vda', 'vdb')
+        new = self.get_devices('vda', 'vdc')
+        diff = IntermediateDiff(old=old, new=new)
+        self.assertEqual([(change.action, change.path) for change
+            in diff.changes], [
+            (IntermediateDiff.REMOVED, "devices/disk[target/@dev='vdb']"),
+            (IntermediateDiff.ADDED, "devices/disk[target/@dev='vdc']")
+        ])
+
+    def test_custom_identity_keys(self):
+        old = self.get_devices('vda', 'vdb')
+        new = self.get_devices('vdb', 'vda')
+        diff = IntermediateDiff(old=old, new=new,
+            identity_keys=IdentityKeys(keys={}))
+        self.assertEqual(diff.changes, [])
+        new['children'][0]['attributes'][0]['attribute_value'] = 'block'
+        diff = IntermediateDiff(old=old, new=new,
+            identity_keys=IdentityKeys(keys={}))
+        self.assertEqual([change.path for change in diff.changes],
+            ['devices/disk[2]'])
+
+    def test_module_intermediate(self):
+        parameters = copy.deepcopy(MockAnsibleModule.DEFAULT_PARAMETERS)
+        parameters['name'] = MockAnsibleModule.DEFAULT_DOMAIN_NAME
+        old = ModuleToIntermediate(libvirt_domain_module=MockAnsibleModule(
+            parameters=parameters)).representation
+        parameters['resources']['memory_current'] = 768
+        new = ModuleToIntermediate(libvirt_domain_module=MockAnsibleModule(
+            parameters=parameters)).representation
+        diff = IntermediateDiff(old=old, new=new)
+        self.assertEqual([(change.path, change.target) for change
+            in diff.changes], [('domain/currentMemory', 'text')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import unittest
+import copy
+
+from intermediate_hasher import IntermediateHasher
+from intermediate_node import IntermediateNode
+
+class TestIntermediateHasher(unittest.TestCase):
+
+    INTERMEDIATE = {
+        'element_name': 'domain',
+        'attributes': [{'attribute_name': 'type', 'attribute_value': 'kvm'}],
+        'children': [{
+            'element_name': 'currentMemory',
+            'text': '524288',
+            'attributes': [{'attribute_name': 'unit', 'attribute_value': 'KiB'}]
+        },{
+            'element_name': 'devices',
+            'children': [{
+                'element_name': 'disk',
+                'attributes': [{
+                    'attribute_name': 'device', 'attribute_value': 'disk'
+                }]
+            },{
+                'element_name': 'disk',
+                'attributes': [{
+                    'attribute_name': 'device', 'attribute_value': 'cdrom'
+                }]
+            }]
+        },{
+            'element_name': 'memory',
+            'text': '1048576',
+            'attributes': [{'attribute_name': 'unit', 'attribute_value': 'KiB'}]
+        },{
+            'element_name': 'name',
+            'text': 'vm-foo'
+        }]
+    }
+
+    def setUp(self):
+        self.hasher = IntermediateHasher()
+
+    def test_equal_copies(self):
+        other = copy.deepcopy(self.INTERMEDIATE)
+        self.assertEqual(self.hasher.digest(element=self.INTERMEDIATE),
+            self.hasher.digest(element=other))
+        self.assertTrue(self.hasher.equal(left=self.INTERMEDIATE,
+            right=other))
+        self.assertEqual(self.hasher.changed_paths(left=self.INTERMEDIATE,
+            right=other), [])
+
+    def test_stable_across_hashers(self):
+        self.assertEqual(self.hasher.digest(element=self.INTERMEDIATE),
+            IntermediateHasher().digest(element=self.INTERMEDIATE))
+
+    def test_attribute_order_ignored(self):
+        left = {'element_name': 'a', 'attributes': [
+            {'attribute_name': 'x', 'attribute_value': '1'},
+            {'attribute_name': 'y', 'attribute_value': '2'}]}
+        right = {'element_name': 'a', 'attributes': [
+            {'attribute_name': 'y', 'attribute_value': '2'},
+            {'attribute_name': 'x', 'attribute_value': '1'}]}
+        self.assertTrue(self.hasher.equal(left=left, right=right))
+
+    def test_missing_and_empty_text_differ(self):
+        self.assertFalse(self.hasher.equal(left={'element_name': 'a'},
+            right={'element_name': 'a', 'text': ''}))
+
+    def test_fields_do_not_run_together(self):
+        self.assertFalse(self.hasher.equal(
+            left={'element_name': 'ab', 'text': 'c'},
+            right={'element_name': 'a', 'text': 'bc'}))
+
+    def test_changed_text(self):
+        other = copy.deepcopy(self.INTERMEDIATE)
+        other['children'][0]['text'] = '1048576'
+        self.assertFalse(self.hasher.equal(left=self.INTERMEDIATE,
+            right=other))
+        self.assertEqual(self.hasher.changed_paths(left=self.INTERMEDIATE,
+            right=other), ['domain/currentMemory'])
+
+    def test_changed_repeated_child(self):
+        other = copy.deepcopy(self.INTERMEDIATE)
+        other['children'][1]['children'][1]['attributes'][0][
+            'attribute_value'] = 'floppy'
+        self.assertEqual(self.hasher.changed_paths(left=self.INTERMEDIATE,
+            right=other), ['domain/devices/disk[2]'])
+
+    def test_added_child(self):
+        other = copy.deepcopy(self.INTERMEDIATE)
+        other['children'].append({'element_name': 'title', 'text': 'foo'})
+        self.assertEqual(self.hasher.changed_paths(left=self.INTERMEDIATE,
+            right=other), ['domain/title'])
+
+    def test_nodes(self):
+        node = IntermediateNode.from_dict(element=self.INTERMEDIATE)
+        self.assertEqual(self.hasher.digest(element=node),
+            IntermediateHasher().digest(element=self.INTERMEDIATE))
+        other = copy.deepcopy(self.INTERMEDIATE)
+        other['children'][0]['text'] = '1048576'
+        self.assertEqual(self.hasher.changed_paths(left=node,
+            right=IntermediateNode.from_dict(element=other)),
+            ['domain/currentMemory'])
+
+    def test_changed_child(self):
+        element = copy.deepcopy(self.INTERMEDIATE)
+        first_digest = self.hasher.digest(element=element)
+        element['children'][1]['children'][0]['attributes'][0][
+            'attribute_value'] = 'lun'
+        second_digest = self.hasher.digest(element=element)
+        self.assertNotEqual(second_digest, first_digest)
+        self.assertEqual(second_digest, IntermediateHasher().digest(
+            element=copy.deepcopy(element)))
+        node = IntermediateNode.from_dict(element=element)
+        node_digest = self.hasher.digest(element=node)
+        node.children[2].text = '2097152'
+        self.assertNotEqual(self.hasher.digest(element=node), node_digest)
+
+if __name__ == '__main__':
+    unittest.main()
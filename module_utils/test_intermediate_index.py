@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from intermediate_index import IntermediateIndex
+
+class TestIntermediateIndex(unittest.TestCase):
+
+    INTERMEDIATE = {
+        'element_name': 'domain',
+        'attributes': [{'attribute_name': 'type', 'attribute_value': 'kvm'}],
+        'children': [{
+            'element_name': 'memory',
+            'text': '1',
+            'attributes': [{'attribute_name': 'unit', 'attribute_value': 'GiB'}]
+        },{
+            'element_name': 'disk',
+            'attributes': [{'attribute_name': 'device', 'attribute_value': 'disk'}]
+        },{
+            'element_name': 'disk',
+            'attributes': [{
+                'attribute_name': 'device', 'attribute_value': 'cdrom'
+            }]
+        },{
+            'element_name': 'os',
+            'children': [{
+                'element_name': 'type',
+                'text': 'hvm'
+            }]
+        }]
+    }
+
+    def setUp(self):
+        self.index = IntermediateIndex(intermediate=self.INTERMEDIATE)
+
+    def test_child(self):
+        memory = self.index.child(element_name='memory')
+        self.assertIs(memory, self.INTERMEDIATE['children'][0])
+        self.assertIsNone(self.index.child(element_name='vcpu'))
+
+    def test_children(self):
+        disks = self.index.children(element_name='disk')
+        self.assertEqual(len(disks), 2)
+        self.assertIs(disks[1], self.INTERMEDIATE['children'][2])
+        self.assertEqual(self.index.children(element_name='vcpu'), [])
+
+    def test_find(self):
+        os_type = self.index.find(path='os/type')
+        self.assertEqual(os_type['text'], 'hvm')
+        self.assertIsNone(self.index.find(path='os/loader'))
+        self.assertIsNone(self.index.find(path='vcpu/type'))
+
+    def test_attribute(self):
+        self.assertEqual(self.index.attribute(attribute_name='type')
+            ['attribute_value'], 'kvm')
+        memory = self.index.child(element_name='memory')
+        unit = self.index.attribute(attribute_name='unit', element=memory)
+        self.assertIs(unit, memory['attributes'][0])
+        self.assertIsNone(self.index.attribute(attribute_name='foo',
+            element=memory))
+        self.assertIsNone(self.index.attribute(attribute_name='unit',
+            element=self.index.find(path='os/type')))
+
+if __name__ == '__main__':
+    unittest.main()
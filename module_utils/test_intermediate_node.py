@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from intermediate_node import IntermediateNode
+
+class TestIntermediateNode(unittest.TestCase):
+
+    INTERMEDIATE = {
+        'element_name': 'domain',
+        'attributes': [{'attribute_name': 'type', 'attribute_value': 'kvm'}],
+        'children': [{
+            'element_name': 'memory',
+            'text': '1',
+            'attributes': [{'attribute_name': 'unit', 'attribute_value': 'GiB'}]
+        },{
+            'element_name': 'os',
+            'children': [{
+                'element_name': 'type',
+                'text': 'hvm'
+            }]
+        }]
+    }
+
+    def test_round_trip(self):
+        node = IntermediateNode.from_dict(element=self.INTERMEDIATE)
+        self.assertEqual(node.to_dict(), self.INTERMEDIATE)
+
+    def test_round_trip_none_text(self):
+        element = {'element_name': 'os', 'children': [
+            {'element_name': 'type', 'text': None},
+            {'element_name': 'loader'}]}
+        node = IntermediateNode.from_dict(element=element)
+        self.assertEqual(node.to_dict(), element)
+        self.assertEqual(node.copy().to_dict(), element)
+        self.assertEqual(node, IntermediateNode(element_name='os', children=[
+            IntermediateNode(element_name='type'),
+            IntermediateNode(element_name='loader')]))
+
+    def test_slots(self):
+        node = IntermediateNode(element_name='name', text='vm-foo')
+        self.assertFalse(hasattr(node, '__dict__'))
+        with self.assertRaises(AttributeError):
+            node.foo = 'bar'
+
+    def test_sorted_attributes(self):
+        node = IntermediateNode(element_name='vcpu',
+            attributes={'placement': 'static', 'current': '1'}.items())
+        self.assertEqual(node.attributes,
+            (('current', '1'), ('placement', 'static')))
+
+    def test_interned_names(self):
+        first = IntermediateNode(element_name=''.join(['dis', 'k']),
+            attributes=[(''.join(['de', 'v']), 'vda')])
+        second = IntermediateNode(element_name=''.join(['di', 'sk']),
+            attributes=[(''.join(['d', 'ev']), 'vdb')])
+        self.assertIs(first.element_name, second.element_name)
+        self.assertIs(first.attributes[0][0], second.attributes[0][0])
+
+    def test_attribute_access(self):
+        node = IntermediateNode(element_name='memory',
+            attributes=[('unit', 'GiB')], text='1')
+        self.assertEqual(node.get_attribute(attribute_name='unit'), 'GiB')
+        self.assertIsNone(node.get_attribute(attribute_name='foo'))
+        node.set_attribute(attribute_name='unit', attribute_value='KiB')
+        node.set_attribute(attribute_name='dump', attribute_value='on')
+        self.assertEqual(node.attributes, (('dump', 'on'), ('unit', 'KiB')))
+
+    def test_child(self):
+        node = IntermediateNode.from_dict(element=self.INTERMEDIATE)
+        self.assertEqual(node.child(element_name='os').children[0].text, 'hvm')
+        self.assertIsNone(node.child(element_name='vcpu'))
+
+    def test_children_named_and_find(self):
+        node = IntermediateNode(element_name='devices', children=[
+            IntermediateNode(element_name='disk', attributes=[('dev', 'vda')]),
+            IntermediateNode(element_name='interface'),
+            IntermediateNode(element_name='disk', attributes=[('dev', 'vdb')])
+        ])
+        disks = node.children_named(element_name='disk')
+        self.assertEqual([disk.get_attribute(attribute_name='dev')
+            for disk in disks], ['vda', 'vdb'])
+        self.assertEqual(node.children_named(element_name='video'), ())
+        domain = IntermediateNode.from_dict(element=self.INTERMEDIATE)
+        self.assertEqual(domain.find(path='os/type').text, 'hvm')
+        self.assertIsNone(domain.find(path='os/loader'))
+
+    def test_index_dropped_on_replace(self):
+        node = IntermediateNode(element_name='os',
+            children=[IntermediateNode(element_name='type', text='hvm')])
+        self.assertIsNotNone(node.child(element_name='type'))
+        node.children = [IntermediateNode(element_name='loader')]
+        self.assertIsNone(node.child(element_name='type'))
+        self.assertIsNotNone(node.child(element_name='loader'))
+
+    def test_equality(self):
+        self.assertEqual(IntermediateNode.from_dict(element=self.INTERMEDIATE),
+            IntermediateNode.from_dict(element=self.INTERMEDIATE))
+        self.assertNotEqual(IntermediateNode(element_name='a', text='1'),
+            IntermediateNode(element_name='a', text='2'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,9 +2,11 @@
 
 import unittest
 import copy
+from io import BytesIO
 
 from lxml import etree
 
+from intermediate_node import IntermediateNode
 from intermediate_to_xml import IntermediateToXml
 
 class TestIntermediateToXml(unittest.TestCase):
@@ -129,5 +131,48 @@ class TestIntermediateToXml(unittest.TestCase):
         self.assertEqual(type_element.tag, 'type')
         self.assertEqual(type_element.text, 'hvm')
 
+    def test_node_intermediate(self):
+        node = IntermediateNode.from_dict(element=self.INTERMEDIATE)
+        intermediate_to_xml = IntermediateToXml(
+            intermediate_representation=node)
+        self.assertEqual(intermediate_to_xml.xml, self.intermediate_to_xml.xml)
+
+    def test_write(self):
+        self.assertEqual(IntermediateToXml.write(
+            intermediate_representation=self.INTERMEDIATE),
+            self.intermediate_to_xml.xml)
+        node = IntermediateNode.from_dict(element=self.INTERMEDIATE)
+        self.assertEqual(IntermediateToXml.write(
+            intermediate_representation=node), self.intermediate_to_xml.xml)
+
+    def test_write_generated_children(self):
+        def generate_disks():
+            for index in range(3):
+                yield {
+                    'element_name': 'disk',
+                    'children': [{
+                        'element_name': 'target',
+                        'attributes': [{'attribute_name': 'dev',
+                            'attribute_value': 'vd' + 'abc'[index]}]
+                    }]
+                }
+        intermediate = {
+            'element_name': 'domain',
+            'children': [{
+                'element_name': 'devices',
+                'children': generate_disks()
+            }, {
+                'element_name': 'features',
+                'children': iter(())
+            }]
+        }
+        output = BytesIO()
+        self.assertIsNone(IntermediateToXml.write(
+            intermediate_representation=intermediate, output=output))
+        xml_tree = etree.fromstring(output.getvalue())
+        self.assertEqual(xml_tree.xpath('devices/disk/target/@dev'),
+            ['vda', 'vdb', 'vdc'])
+        self.assertIn(b'<features/>', output.getvalue())
+
 if __name__ == '__main__':
     unittest.main()
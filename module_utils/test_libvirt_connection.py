@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from libvirt_connection import (LibvirtConnectionManager,
+    VIR_DOMAIN_XML_INACTIVE)
+from mock_libvirt import MockConnection
+
+try:
+    import libvirt
+    HAS_LIBVIRT = True
+except ImportError:
+    HAS_LIBVIRT = False
+
+class TestLibvirtConnectionManager(unittest.TestCase):
+
+    FILTER_SPEC = {'domain': {'name': {}, 'memory': {}}}
+
+    @classmethod
+    def setUpClass(cls):
+        with open('domain.xml', 'r') as file:
+            xml_string = file.read()
+        cls.domain_xmls = [xml_string, xml_string.replace('vm-algol',
+            'vm-other')]
+
+    def setUp(self):
+        self.opened = []
+        self.connection_manager = LibvirtConnectionManager(
+            open_connection=self.open_connection)
+
+    def open_connection(self, uri):
+        connection = MockConnection(uri=uri, domain_xmls=self.domain_xmls)
+        self.opened.append(connection)
+        return connection
+
+    def test_pooling(self):
+        connection = self.connection_manager.connection(uri='test:///a')
+        self.assertIs(self.connection_manager.connection(uri='test:///a'),
+            connection)
+        self.assertIsNot(self.connection_manager.connection(uri='test:///b'),
+            connection)
+        self.assertEqual(len(self.connection_manager), 2)
+        connection.alive = False
+        self.assertIsNot(self.connection_manager.connection(uri='test:///a'),
+            connection)
+        self.assertEqual(len(self.opened), 3)
+        self.assertEqual(connection.close_calls, 1)
+
+    def test_slow_open(self):
+        # A URI slow to connect does not block the other URIs.
+        opening = threading.Event()
+        release = threading.Event()
+
+        def open_connection(uri):
+            if uri == 'test:///slow':
+                opening.set()
+                release.wait(5)
+            return self.open_connection(uri=uri)
+
+        connection_manager = LibvirtConnectionManager(
+            open_connection=open_connection)
+        slow_thread = threading.Thread(target=connection_manager.connection,
+            args=('test:///slow',))
+        slow_thread.start()
+        self.assertTrue(opening.wait(5))
+        start = time.perf_counter()
+        connection_manager.connection(uri='test:///fast')
+        self.assertLess(time.perf_counter() - start, 1)
+        release.set()
+        slow_thread.join()
+        self.assertEqual(len(connection_manager), 2)
+
+    def test_single_open_per_uri(self):
+        barrier = threading.Barrier(4)
+
+        def get_connection():
+            barrier.wait()
+            return self.connection_manager.connection(uri='test:///a')
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            connections = list(executor.map(lambda _: get_connection(),
+                range(4)))
+        self.assertEqual(len(self.opened), 1)
+        self.assertTrue(all(connection is self.opened[0]
+            for connection in connections))
+
+    def test_close(self):
+        connection = self.connection_manager.connection(uri='test:///a')
+        self.connection_manager.connection(uri='test:///b')
+        self.connection_manager.close(uri='test:///a')
+        self.assertFalse(connection.alive)
+        self.assertEqual(len(self.connection_manager), 1)
+        self.connection_manager.close()
+        self.assertEqual(len(self.connection_manager), 0)
+
+    def test_domain_xmls(self):
+        domain_xmls = self.connection_manager.domain_xmls(uri='test:///a')
+        self.assertEqual(sorted(domain_xmls), ['vm-algol', 'vm-other'])
+        connection = self.opened[0]
+        self.assertEqual(connection.list_all_domains_calls, 1)
+        self.assertEqual(connection.lookup_calls, 0)
+        self.assertEqual([domain.xml_desc_calls
+            for domain in connection.domains],
+            [[VIR_DOMAIN_XML_INACTIVE]] * 2)
+        self.assertEqual(list(self.connection_manager.domain_xmls(
+            uri='test:///a', names=['vm-other', 'vm-missing'])),
+            ['vm-other'])
+
+    def test_domain_intermediates(self):
+        intermediates = self.connection_manager.domain_intermediates(
+            uri='test:///a', filter_spec=self.FILTER_SPEC)
+        self.assertEqual(intermediates['vm-other']['children'][1], {
+            'element_name': 'name', 'text': 'vm-other'})
+
+    def test_shared(self):
+        self.assertIs(LibvirtConnectionManager.shared(),
+            LibvirtConnectionManager.shared())
+
+    @unittest.skipUnless(HAS_LIBVIRT, 'libvirt is not installed')
+    def test_test_driver(self):
+        connection_manager = LibvirtConnectionManager()
+        domain_xmls = connection_manager.domain_xmls(uri='test:///default')
+        self.assertIn('test', domain_xmls)
+        connection_manager.close()
+
+if __name__ == '__main__':
+    unittest.main()
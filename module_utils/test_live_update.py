@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import copy
+import unittest
+
+from lxml import etree
+
+from domain_xml_to_intermediate import domain_xml_to_intermediate
+from drift import DriftChecker
+from intermediate_node import IntermediateNode
+from live_update import (LiveUpdatePlanner, VIR_DOMAIN_AFFECT_CONFIG,
+    VIR_DOMAIN_AFFECT_LIVE, VIR_DOMAIN_METADATA_DESCRIPTION,
+    VIR_DOMAIN_METADATA_TITLE, VIR_DOMAIN_XML_INACTIVE)
+from mock_libvirt import MockConnection
+
+try:
+    import libvirt
+    HAS_LIBVIRT = True
+except ImportError:
+    HAS_LIBVIRT = False
+
+class TestLiveUpdatePlanner(unittest.TestCase):
+
+    RESOURCES = {
+        'domain_type': 'kvm',
+        'uuid': 'bfbd7e3a-8b7e-5591-a73f-831f4e162627',
+        'title': 'cn-croquidigital2',
+        'memory_max': 8,
+        'memory_max_unit': 'GiB',
+        'memory_current': 8192,
+        'memory_current_unit': 'MiB',
+        'vcpus_max': 2,
+        'vcpus_current': 1,
+        'os_type': 'hvm'
+    }
+
+    def setUp(self):
+        with open('domain.xml', 'r') as file:
+            self.connection = MockConnection(uri='test:///default',
+                domain_xmls=[file.read()])
+        self.domain = self.connection.lookupByName('vm-algol')
+        self.planner = LiveUpdatePlanner()
+
+    def plan(self, **resources):
+        params = {'vm-algol': {'resources': dict(self.RESOURCES,
+            **resources)}}
+        checker = DriftChecker(params=params)
+        self.checker = checker
+        old = domain_xml_to_intermediate(source=self.domain.xml,
+            filter_spec=checker.FILTER_SPEC)
+        new = checker.module_intermediate(domain_name='vm-algol')
+        old_copy = copy.deepcopy(old)
+        plan = self.planner.plan(old=old, new=new)
+        self.assertEqual(old, old_copy)
+        return plan
+
+    def assert_in_sync(self):
+        result = self.checker.check_xml(source=self.domain.xml)
+        self.assertEqual(result['status'], DriftChecker.IN_SYNC)
+
+    def test_no_changes(self):
+        plan = self.plan()
+        self.assertEqual(plan.strategy, LiveUpdatePlanner.NONE)
+        self.assertEqual(plan.apply(domain=self.domain), {
+            'strategy': LiveUpdatePlanner.NONE, 'operations': [],
+            'restart_required': False})
+
+    def test_live_update(self):
+        self.domain.active = True
+        plan = self.plan(memory_current=4, memory_current_unit='GiB',
+            vcpus_current=2, title='renamed', description='a domain')
+        self.assertEqual(plan.strategy, LiveUpdatePlanner.LIVE)
+        report = plan.apply(domain=self.domain)
+        self.assertEqual(sorted(report['operations']), ['setMemoryFlags',
+            'setMetadata', 'setMetadata', 'setVcpusFlags'])
+        self.assertFalse(report['restart_required'])
+        flags = VIR_DOMAIN_AFFECT_LIVE | VIR_DOMAIN_AFFECT_CONFIG
+        self.assertEqual(sorted(self.domain.update_calls), [
+            ('setMemoryFlags', 4194304, flags),
+            ('setMetadata', VIR_DOMAIN_METADATA_DESCRIPTION, 'a domain',
+                flags),
+            ('setMetadata', VIR_DOMAIN_METADATA_TITLE, 'renamed', flags),
+            ('setVcpusFlags', 2, flags)
+        ])
+        self.assertIs(self.connection.lookupByName('vm-algol'), self.domain)
+        self.assert_in_sync()
+
+    def test_live_update_inactive(self):
+        plan = self.plan(title=None)
+        self.assertEqual(plan.strategy, LiveUpdatePlanner.LIVE)
+        plan.apply(domain=self.domain)
+        self.assertEqual(self.domain.update_calls, [('setMetadata',
+            VIR_DOMAIN_METADATA_TITLE, None, VIR_DOMAIN_AFFECT_CONFIG)])
+        self.assert_in_sync()
+
+    def test_nodes(self):
+        self.plan(vcpus_current=2, title='renamed')
+        old = IntermediateNode.from_dict(element=domain_xml_to_intermediate(
+            source=self.domain.xml, filter_spec=self.checker.FILTER_SPEC))
+        new = IntermediateNode.from_dict(element=self.checker
+            .module_intermediate(domain_name='vm-algol'))
+        plan = self.planner.plan(old=old, new=new)
+        self.assertEqual(sorted((operation.method, operation.arguments)
+            for operation in plan.operations), [
+            ('setMetadata', (VIR_DOMAIN_METADATA_TITLE, 'renamed', None,
+                None)), ('setVcpusFlags', (2,))])
+
+    def test_redefine(self):
+        self.domain.active = True
+        # Normalized to KiB before the new size is patched in.
+        self.domain.xml = self.domain.xml.replace(
+            '<memory unit="KiB">8388608</memory>',
+            '<memory unit="GiB">8</memory>')
+        old_root = etree.fromstring(self.domain.xml)
+        plan = self.plan(memory_max=16, memory_current=4096, title=None,
+            description='a domain')
+        self.assertEqual(plan.strategy, LiveUpdatePlanner.REDEFINE)
+        self.assertEqual(len(plan.operations), 1)
+        self.assertEqual(len(plan.operations[0].changes), 4)
+        report = plan.apply(domain=self.domain)
+        self.assertEqual(report, {'strategy': LiveUpdatePlanner.REDEFINE,
+            'operations': [LiveUpdatePlanner.REDEFINE],
+            'restart_required': True})
+        self.assertEqual(self.domain.update_calls, [])
+        self.assertEqual(self.domain.xml_desc_calls, [VIR_DOMAIN_XML_INACTIVE])
+        self.domain = self.connection.lookupByName('vm-algol')
+        self.assert_in_sync()
+        root = etree.fromstring(self.domain.xml)
+        self.assertEqual(root.find('memory').attrib, {'unit': 'KiB'})
+        self.assertEqual(root.find('memory').text, '16777216')
+        self.assertIsNone(root.find('title'))
+        self.assertEqual(root.find('description').text, 'a domain')
+        # The elements left out of the filter spec are kept.
+        for path in ('devices', 'features', 'clock', 'pm', 'cpu'):
+            self.assertEqual(etree.tostring(root.find(path)),
+                etree.tostring(old_root.find(path)))
+        self.assertEqual(root.find('vcpu').attrib,
+            {'placement': 'static', 'current': '1'})
+        self.assertEqual(root.get('id'), '1')
+
+    def test_redefine_missing_path(self):
+        plan = self.plan(memory_max=16)
+        self.domain.xml = self.domain.xml.replace(
+            '<memory unit="KiB">8388608</memory>', '')
+        with self.assertRaises(ValueError):
+            plan.apply(domain=self.domain)
+
+    @unittest.skipUnless(HAS_LIBVIRT, 'libvirt is not installed')
+    def test_test_driver(self):
+        connection = libvirt.open('test:///default')
+        domain = connection.lookupByName('test')
+        filter_spec = {'domain': {'name': {}, 'currentMemory': {
+            '__attributes__': ['unit']}, 'title': {'required': False}}}
+        old = domain_xml_to_intermediate(source=domain.XMLDesc(0),
+            filter_spec=filter_spec)
+        new = copy.deepcopy(old)
+        for child in new['children']:
+            if child['element_name'] == 'currentMemory':
+                child['text'] = str(int(child['text']) // 2)
+        new['children'].append({'element_name': 'title', 'text': 'live'})
+        plan = self.planner.plan(old=old, new=new)
+        self.assertEqual(plan.strategy, LiveUpdatePlanner.LIVE)
+        plan.apply(domain=domain)
+        updated = domain_xml_to_intermediate(source=domain.XMLDesc(0),
+            filter_spec=filter_spec)
+        self.assertEqual(self.planner.plan(old=updated, new=new).strategy,
+            LiveUpdatePlanner.NONE)
+        connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
 import unittest
+import copy
 
-from memory_normalizer import MemoryNormalizer
+from intermediate_node import IntermediateNode
+from memory_normalizer import HAS_NUMPY, MemoryNormalizer
 
 class TestMemoryNormalizer(unittest.TestCase):
 
@@ -45,7 +47,8 @@ class TestMemoryNormalizer(unittest.TestCase):
     }
 
     def setUp(self):
-        self.memory_normalizer = MemoryNormalizer(intermediate=self.INTERMEDIATE)
+        self.memory_normalizer = MemoryNormalizer(intermediate=self.INTERMEDIATE,
+            copy_on_write=True)
 
     def test_foo(self):
         self.assertIsInstance(self.memory_normalizer.normalized, dict)
@@ -157,6 +160,41 @@ class TestMemoryNormalizer(unittest.TestCase):
         result = self.memory_normalizer._convert_to_kibibyte(value=value, unit=unit)
         self.assertEqual(result, expected)
 
+    def test_convert_to_kibibyte_exact(self):
+        self._test_kibibyte_conversion(value=1023, unit='B', expected=1)
+        self._test_kibibyte_conversion(value=1025, unit='B', expected=2)
+        self._test_kibibyte_conversion(value=3, unit='GB', expected=2929688)
+        self._test_kibibyte_conversion(value=123456789, unit='TiB',
+            expected=123456789*1024**3)
+        self._test_kibibyte_conversion(value=10**10 + 1, unit='TB',
+            expected=-(-(10**10 + 1)*10**12 // 1024))
+        with self.assertRaises(Exception):
+            self.memory_normalizer._convert_to_kibibyte(value=1, unit='PiB')
+
+    def test_convert_many(self):
+        values = [1, 512, 1000, 10**10 + 1]
+        units = ['GiB', 'MiB', 'kb', 'TB']
+        expected = [self.memory_normalizer._convert_to_kibibyte(value=value,
+            unit=unit) for value, unit in zip(values, units)]
+        self.assertEqual(self.memory_normalizer.convert_many(values=values,
+            units=units, use_numpy=False), expected)
+        self.assertEqual(self.memory_normalizer.convert_many(values=[1, 2],
+            units='GiB', use_numpy=False), [1048576, 2097152])
+        self.assertEqual(self.memory_normalizer.convert_many(values=[],
+            units=[]), [])
+
+    @unittest.skipUnless(HAS_NUMPY, 'NumPy is not installed')
+    def test_convert_many_numpy(self):
+        values = list(range(0, 100000, 7))
+        units = ['B', 'KB', 'MiB', 'GB', 'TB'] * (len(values) // 5) + ['B'] * (
+            len(values) % 5)
+        expected = self.memory_normalizer.convert_many(values=values,
+            units=units, use_numpy=False)
+        result = self.memory_normalizer.convert_many(values=values,
+            units=units, use_numpy=True)
+        self.assertEqual(result, expected)
+        self.assertIsInstance(result[0], int)
+
     def test_normalize_element(self):
         method = getattr(self.memory_normalizer, '_normalize_element',
             None)
@@ -195,5 +233,43 @@ class TestMemoryNormalizer(unittest.TestCase):
             current_memory_element['attributes']))
         self.assertEqual(unit_attribute['attribute_value'], 'KiB')
 
+    def test_copy_on_write(self):
+        intermediate = copy.deepcopy(self.INTERMEDIATE)
+        original = copy.deepcopy(intermediate)
+        normalized = MemoryNormalizer(intermediate=intermediate,
+            copy_on_write=True).normalized
+        self.assertEqual(intermediate, original)
+        self.assertIsNot(normalized, intermediate)
+        self.assertEqual(normalized, MemoryNormalizer(
+            intermediate=copy.deepcopy(original)).normalized)
+        for normalized_child, child in zip(normalized['children'],
+                intermediate['children']):
+            if child['element_name'] in ('memory', 'currentMemory'):
+                self.assertIsNot(normalized_child, child)
+            else:
+                self.assertIs(normalized_child, child)
+
+    def test_node_copy_on_write(self):
+        node = IntermediateNode.from_dict(
+            element=copy.deepcopy(self.INTERMEDIATE))
+        normalized = MemoryNormalizer(intermediate=node,
+            copy_on_write=True).normalized
+        self.assertEqual(node.child(element_name='memory').text, '1')
+        self.assertEqual(normalized.child(element_name='memory').text,
+            str(1*1024*1024))
+        self.assertIs(normalized.child(element_name='os'),
+            node.child(element_name='os'))
+
+    def test_node_normalized(self):
+        node = IntermediateNode.from_dict(
+            element=copy.deepcopy(self.INTERMEDIATE))
+        normalized = MemoryNormalizer(intermediate=node).normalized
+        self.assertIsInstance(normalized, IntermediateNode)
+        memory_node = normalized.child(element_name='memory')
+        self.assertEqual(memory_node.text, str(1*1024*1024))
+        self.assertEqual(memory_node.attributes, (('unit', 'KiB'),))
+        current_memory_node = normalized.child(element_name='currentMemory')
+        self.assertEqual(current_memory_node.text, str(512*1024))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
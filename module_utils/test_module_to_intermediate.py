@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
+import copy
 import unittest
+import uuid
 
 from mock_ansible_module import MockAnsibleModule
+from intermediate_node import IntermediateNode
 from module_to_intermediate import ModuleToIntermediate
 
 class TestModuleToIntermediate(unittest.TestCase):
@@ -76,6 +79,38 @@ class TestModuleToIntermediate(unittest.TestCase):
         self.assertEqual(uuid_dict['text'],
             MockAnsibleModule.DEFAULT_AUTO_GENERATED_UUID)
 
+    def test_uuid_namespace_override(self):
+        namespace = uuid.UUID('6ba7b810-9dad-11d1-80b4-00c04fd430c8')
+
+        class DnsModuleToIntermediate(ModuleToIntermediate):
+            UUID_NAMESPACE_ANSIBLE = namespace
+
+        class DnsStringModuleToIntermediate(ModuleToIntermediate):
+            UUID_NAMESPACE_ANSIBLE = str(namespace).upper()
+
+        class DefaultModuleToIntermediate(ModuleToIntermediate):
+            pass
+
+        params = copy.deepcopy(self.ansible_module_defaults)
+        params['resources']['uuid'] = None
+        representation = DnsModuleToIntermediate(libvirt_domain_module=
+            MockAnsibleModule(parameters=params)).representation
+        uuid_dict = [child for child in representation['children']
+            if child['element_name'] == 'uuid'][0]
+        self.assertEqual(uuid_dict['text'],
+            str(uuid.uuid5(namespace, params['name'])))
+        self.assertEqual(DnsStringModuleToIntermediate.to_uuid(
+            string='vm-bar'), str(uuid.uuid5(namespace, 'vm-bar')))
+        # One cache per namespace.
+        self.assertIs(DnsStringModuleToIntermediate.UUID_CACHE,
+            DnsModuleToIntermediate.UUID_CACHE)
+        self.assertIsNot(DnsModuleToIntermediate.UUID_CACHE,
+            ModuleToIntermediate.UUID_CACHE)
+        self.assertIs(DefaultModuleToIntermediate.UUID_CACHE,
+            ModuleToIntermediate.UUID_CACHE)
+        self.assertEqual(ModuleToIntermediate.to_uuid(string=params['name']),
+            MockAnsibleModule.DEFAULT_AUTO_GENERATED_UUID)
+
     def test_without_uuid(self):
         uuid_filter_list = list(filter(lambda x: x['element_name'] == 'uuid',
             self.module_to_intermediate.representation['children']))
@@ -239,5 +274,97 @@ class TestModuleToIntermediate(unittest.TestCase):
         self.assertIn('text', type_dict)
         self.assertEqual(type_dict['text'], MockAnsibleModule.DEFAULT_OS_TYPE)
 
+    def test_node_representation(self):
+        ansible_module = MockAnsibleModule(
+            parameters=self.ansible_module_defaults)
+        node = ModuleToIntermediate(libvirt_domain_module=ansible_module,
+            as_node=True).representation
+        self.assertIsInstance(node, IntermediateNode)
+        self.assertEqual(node.to_dict(), ModuleToIntermediate(
+            libvirt_domain_module=ansible_module).representation)
+
+    def test_convert_many(self):
+        param_sets = []
+        for name in ('vm-a', 'vm-b'):
+            params = copy.deepcopy(self.ansible_module_defaults)
+            params['name'] = name
+            param_sets.append(params)
+        intermediates = ModuleToIntermediate.convert_many(
+            param_sets=param_sets)
+        self.assertEqual(intermediates, [ModuleToIntermediate(
+            libvirt_domain_module=MockAnsibleModule(parameters=params))
+            .representation for params in param_sets])
+        nodes = ModuleToIntermediate.convert_many(param_sets=param_sets,
+            as_node=True)
+        self.assertEqual([node.to_dict() for node in nodes], intermediates)
+
+    def test_parse_methods(self):
+        params = copy.deepcopy(self.ansible_module_defaults)
+        params['resources']['title'] = 'a title'
+        module_to_intermediate = ModuleToIntermediate(
+            libvirt_domain_module=MockAnsibleModule(parameters=params))
+        children = {child['element_name']: child for child
+            in module_to_intermediate.representation['children']}
+        for method_name, element_name in (('parse_name', 'name'),
+                ('parse_uuid', 'uuid'), ('parse_title', 'title'),
+                ('parse_vcpu', 'vcpu'), ('parse_memory', 'memory'),
+                ('parse_current_memory', 'currentMemory'),
+                ('parse_os_type', 'os')):
+            with self.subTest(method_name=method_name):
+                self.assertEqual(getattr(module_to_intermediate,
+                    method_name)(), children[element_name])
+        self.assertNotIn('description', children)
+        self.assertIsNone(module_to_intermediate.parse_description())
+
+    def test_raw_values(self):
+        # Only the memory sizes and vCPU counts are converted to strings,
+        # the other parameters are kept as they are given.
+        params = copy.deepcopy(self.ansible_module_defaults)
+        params['resources']['memory_current_unit'] = None
+        params['resources']['os_type'] = None
+        intermediate = ModuleToIntermediate.convert_many(
+            param_sets=[params])[0]
+        children = {child['element_name']: child
+            for child in intermediate['children']}
+        self.assertIsNone(children['currentMemory']['attributes'][0]
+            ['attribute_value'])
+        self.assertEqual(children['currentMemory']['text'], '512')
+        self.assertIsNone(children['os']['children'][0]['text'])
+        self.assertEqual(children['vcpu']['attributes'][0]
+            ['attribute_value'], '1')
+        node = ModuleToIntermediate.convert_many(param_sets=[params],
+            as_node=True)[0]
+        self.assertEqual(node.to_dict(), intermediate)
+
+    def test_custom_field_table(self):
+        class CpuModuleToIntermediate(ModuleToIntermediate):
+            FIELDS = ModuleToIntermediate.FIELDS + (
+                {'path': 'cpu/model', 'text': 'resources/cpu/model',
+                    'attributes': {'fallback': 'resources/cpu/fallback'}},
+                {'path': 'cpu/vendor', 'text': 'resources/cpu/vendor',
+                    'required': False},
+                {'path': 'cpu/topology', 'text': 'resources/cpu/sockets',
+                    'required': False, 'default': ('resources/vcpus_max',
+                    lambda cls, vcpus_max: 'sockets={0}'.format(vcpus_max))}
+            )
+
+        params = copy.deepcopy(self.ansible_module_defaults)
+        params['resources']['cpu'] = {'model': 'Nehalem',
+            'fallback': 'allow', 'vendor': None}
+        intermediate = CpuModuleToIntermediate.convert_many(
+            param_sets=[params])[0]
+        cpu_dict = intermediate['children'][-1]
+        self.assertEqual(cpu_dict, {'element_name': 'cpu', 'children': [{
+            'element_name': 'model',
+            'text': 'Nehalem',
+            'attributes': [{'attribute_name': 'fallback',
+                'attribute_value': 'allow'}]
+        }, {
+            'element_name': 'topology',
+            'text': 'sockets=2'
+        }]})
+        self.assertIsNot(CpuModuleToIntermediate.__dict__['_converter'],
+            ModuleToIntermediate.__dict__.get('_converter'))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import unittest
+import copy
+
+from intermediate_node import IntermediateNode
+from memory_normalizer import MemoryNormalizer
+from normalizer_pipeline import NormalizerPipeline
+
+class TestNormalizerPipeline(unittest.TestCase):
+
+    INTERMEDIATE = {
+        'element_name': 'domain',
+        'attributes': [{'attribute_name': 'type', 'attribute_value': 'kvm'}],
+        'children': [{
+            'element_name': 'name',
+            'text': 'vm-foo'
+        },{
+            'element_name': 'memory',
+            'text': '1',
+            'attributes': [{'attribute_name': 'unit', 'attribute_value': 'GiB'}]
+        },{
+            'element_name': 'currentMemory',
+            'text': '512',
+            'attributes': [{'attribute_name': 'unit', 'attribute_value': 'MiB'}]
+        },{
+            'element_name': 'os',
+            'children': [{
+                'element_name': 'type',
+                'text': 'HVM'
+            }]
+        }]
+    }
+
+    def get_intermediate(self):
+        return copy.deepcopy(self.INTERMEDIATE)
+
+    def test_default_same_as_memory_normalizer(self):
+        expected = MemoryNormalizer(
+            intermediate=self.get_intermediate()).normalized
+        pipeline = NormalizerPipeline.default()
+        self.assertEqual(pipeline.normalize(
+            intermediate=self.get_intermediate()), expected)
+
+    def test_node_intermediate(self):
+        expected = MemoryNormalizer(
+            intermediate=self.get_intermediate()).normalized
+        node = IntermediateNode.from_dict(element=self.get_intermediate())
+        normalized = NormalizerPipeline.default().normalize(intermediate=node)
+        self.assertEqual(normalized.to_dict(), expected)
+
+    def test_nested_path_and_order(self):
+        applied = []
+        def lower_text(element):
+            applied.append('lower')
+            element['text'] = element['text'].lower()
+        def check_text(element):
+            applied.append('check')
+            self.assertEqual(element['text'], 'hvm')
+        pipeline = NormalizerPipeline(normalizers=[
+            ('os/type', lower_text),
+            ('os/type', check_text)
+        ])
+        intermediate = pipeline.normalize(intermediate=self.get_intermediate())
+        self.assertEqual(intermediate['children'][3]['children'][0]['text'],
+            'hvm')
+        self.assertEqual(applied, ['lower', 'check'])
+
+    def test_copy_on_write(self):
+        intermediate = self.get_intermediate()
+        expected = NormalizerPipeline.default().normalize(
+            intermediate=self.get_intermediate())
+        normalized = NormalizerPipeline.default().normalize(
+            intermediate=intermediate, copy_on_write=True)
+        self.assertEqual(intermediate, self.INTERMEDIATE)
+        self.assertEqual(normalized, expected)
+        self.assertIs(normalized['children'][0], intermediate['children'][0])
+        self.assertIs(normalized['children'][3], intermediate['children'][3])
+
+    def test_copy_on_write_nested(self):
+        def lower_text(element):
+            element['text'] = element['text'].lower()
+        pipeline = NormalizerPipeline(normalizers=[('os/type', lower_text)])
+        intermediate = self.get_intermediate()
+        normalized = pipeline.normalize(intermediate=intermediate,
+            copy_on_write=True)
+        self.assertEqual(intermediate, self.INTERMEDIATE)
+        self.assertEqual(normalized['children'][3]['children'][0]['text'],
+            'hvm')
+        self.assertIsNot(normalized['children'][3],
+            intermediate['children'][3])
+        self.assertIs(normalized['children'][1], intermediate['children'][1])
+
+    def test_copy_on_write_unchanged(self):
+        pipeline = NormalizerPipeline(normalizers=[('vcpu', print)])
+        intermediate = self.get_intermediate()
+        self.assertIs(pipeline.normalize(intermediate=intermediate,
+            copy_on_write=True), intermediate)
+
+    def test_copy_on_write_node(self):
+        node = IntermediateNode.from_dict(element=self.get_intermediate())
+        normalized = NormalizerPipeline.default().normalize(intermediate=node,
+            copy_on_write=True)
+        self.assertEqual(node.to_dict(), self.INTERMEDIATE)
+        self.assertEqual(normalized.child(element_name='memory').text,
+            str(1024*1024))
+        self.assertIs(normalized.child(element_name='os'),
+            node.child(element_name='os'))
+
+    def test_timings(self):
+        pipeline = NormalizerPipeline.default()
+        pipeline.normalize(intermediate=self.get_intermediate())
+        pipeline.normalize(intermediate=self.get_intermediate())
+        name = 'MemoryNormalizer.normalize_element'
+        # One callable registered for two paths is timed per path.
+        keys = [('memory', name), ('currentMemory', name)]
+        self.assertEqual(pipeline.calls, {key: 2 for key in keys})
+        self.assertEqual(sorted(pipeline.timings), sorted(keys))
+        for key in keys:
+            self.assertGreaterEqual(pipeline.timings[key], 0.0)
+
+    def test_unregistered_paths_not_visited(self):
+        visited = []
+        pipeline = NormalizerPipeline(normalizers=[
+            ('devices/disk/target', visited.append)
+        ])
+        intermediate = {
+            'element_name': 'domain',
+            'children': [{
+                'element_name': 'os',
+                'children': [{'element_name': 'disk'}]
+            },{
+                'element_name': 'devices',
+                'children': [{
+                    'element_name': 'disk',
+                    'children': [{'element_name': 'target'}]
+                },{
+                    'element_name': 'interface',
+                    'children': [{'element_name': 'target'}]
+                }]
+            }]
+        }
+        pipeline.normalize(intermediate=intermediate)
+        self.assertEqual(visited,
+            [intermediate['children'][1]['children'][0]['children'][0]])
+
+if __name__ == '__main__':
+    unittest.main()
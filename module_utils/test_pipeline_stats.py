@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+from io import BytesIO
+
+from intermediate_node import IntermediateNode
+from intermediate_to_xml import IntermediateToXml
+from memory_normalizer import MemoryNormalizer
+from mock_ansible_module import MockAnsibleModule
+from module_to_intermediate import ModuleToIntermediate
+from pipeline_stats import PipelineStats, count_nodes
+from xml_filter import XmlFilter
+from xml_to_intermediate import XmlToIntermediate
+
+class TestPipelineStats(unittest.TestCase):
+
+    FILTER_SPEC = {
+        'domain': {
+            '__attributes__': ['type'],
+            'name': {},
+            'memory': {'__attributes__': ['unit']},
+            'os': {'type': {}}
+        }
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open('domain.xml', 'r') as file:
+            cls.xml_string = file.read()
+
+    def test_record(self):
+        stats = PipelineStats()
+        stats.record(stage='XmlFilter', seconds=0.5, nodes=3)
+        stats.record(stage='XmlFilter', seconds=0.25, bytes_serialized=10,
+            calls=0)
+        counters = stats.stage(stage='XmlFilter')
+        self.assertEqual(counters['calls'], 1)
+        self.assertEqual(counters['seconds'], 0.75)
+        self.assertEqual(counters['nodes'], 3)
+        self.assertEqual(counters['bytes_serialized'], 10)
+        self.assertEqual(stats.stage(stage='MemoryNormalizer')['calls'], 0)
+        self.assertEqual(stats.as_dict()['total_seconds'], 0.75)
+        stats.clear()
+        self.assertEqual(stats.as_dict(), {'stages': {}, 'total_seconds': 0})
+
+    def test_xml_stages(self):
+        stats = PipelineStats()
+        xml_filter = XmlFilter(filter_spec=self.FILTER_SPEC,
+            input_xml=self.xml_string, stats=stats)
+        self.assertEqual(stats.stage(stage='XmlFilter')['bytes_serialized'], 0)
+        output_xml = xml_filter.output_xml
+        intermediate = XmlToIntermediate(xml_string=output_xml,
+            stats=stats).representation
+        generated_xml = IntermediateToXml(
+            intermediate_representation=intermediate, stats=stats).xml
+        filter_counters = stats.stage(stage='XmlFilter')
+        self.assertEqual(filter_counters['calls'], 1)
+        self.assertEqual(filter_counters['nodes'], 5)
+        # One query per spec node: domain, name, memory, os and os/type.
+        self.assertEqual(filter_counters['xpath_queries'], 5)
+        self.assertEqual(filter_counters['bytes_parsed'],
+            len(self.xml_string))
+        self.assertEqual(filter_counters['bytes_serialized'], len(output_xml))
+        self.assertEqual(stats.stage(stage='XmlToIntermediate')['nodes'], 5)
+        self.assertEqual(stats.stage(stage='XmlToIntermediate')
+            ['bytes_parsed'], len(output_xml))
+        self.assertEqual(stats.stage(stage='IntermediateToXml')
+            ['bytes_serialized'], len(generated_xml))
+
+    def test_non_ascii_bytes_parsed(self):
+        stats = PipelineStats()
+        xml_string = self.xml_string.replace('vm-algol', 'vm-\u00e1lgol')
+        XmlFilter(filter_spec=self.FILTER_SPEC, input_xml=xml_string,
+            stats=stats)
+        XmlToIntermediate(xml_string=xml_string, stats=stats)
+        size = len(xml_string.encode('utf-8'))
+        self.assertGreater(size, len(xml_string))
+        self.assertEqual(stats.stage(stage='XmlFilter')['bytes_parsed'], size)
+        self.assertEqual(stats.stage(stage='XmlToIntermediate')
+            ['bytes_parsed'], size)
+
+    def test_streamed_bytes_serialized(self):
+        intermediate = XmlToIntermediate(
+            xml_string=self.xml_string).representation
+        xml = IntermediateToXml.write(intermediate_representation=intermediate)
+        stats = PipelineStats()
+        IntermediateToXml.write(intermediate_representation=intermediate,
+            output=BytesIO(), stats=stats)
+        self.assertEqual(stats.stage(stage='IntermediateToXml')
+            ['bytes_serialized'], len(xml))
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        path = os.path.join(directory, 'domain.xml')
+        self.addCleanup(os.remove, path)
+        IntermediateToXml.write(intermediate_representation=intermediate,
+            output=path, stats=stats)
+        self.assertEqual(os.path.getsize(path), len(xml))
+        self.assertEqual(stats.stage(stage='IntermediateToXml')
+            ['bytes_serialized'], 2 * len(xml))
+
+    def test_module_stages(self):
+        stats = PipelineStats()
+        # A copy with the name, which DEFAULT_PARAMETERS leaves out.
+        ansible_module = MockAnsibleModule(parameters=dict(
+            MockAnsibleModule.DEFAULT_PARAMETERS,
+            name=MockAnsibleModule.DEFAULT_DOMAIN_NAME))
+        intermediate = ModuleToIntermediate(
+            libvirt_domain_module=ansible_module, stats=stats).representation
+        MemoryNormalizer(intermediate=intermediate, copy_on_write=True,
+            stats=stats)
+        self.assertEqual(stats.stage(stage='ModuleToIntermediate')['nodes'],
+            count_nodes(intermediate=intermediate))
+        self.assertEqual(stats.stage(stage='MemoryNormalizer')['nodes'], 2)
+        self.assertEqual(set(stats.as_dict()['stages']),
+            {'ModuleToIntermediate', 'MemoryNormalizer'})
+
+    def test_count_nodes(self):
+        intermediate = {'element_name': 'os', 'children': [
+            {'element_name': 'type', 'text': 'hvm'}]}
+        self.assertEqual(count_nodes(intermediate=intermediate), 2)
+        self.assertEqual(count_nodes(intermediate=IntermediateNode.from_dict(
+            element=intermediate)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import unittest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from mock_ansible_module import MockAnsibleModule
+from module_to_intermediate import ModuleToIntermediate
+from uuid_cache import UuidCache
+
+class TestUuidCache(unittest.TestCase):
+
+    NAMESPACE = '361E6D51-FAEC-444A-9079-341386DA8E2E'
+
+    def test_same_as_uuid5(self):
+        uuid_cache = UuidCache(namespace=self.NAMESPACE)
+        namespace = uuid.UUID(self.NAMESPACE)
+        for name in ('vm-foo', '', 'vm-été', 42, 'x' * 300):
+            self.assertEqual(uuid_cache.uuid_for(name=name),
+                str(uuid.uuid5(namespace, str(name))))
+        self.assertEqual(uuid_cache.uuid_for(
+            name=MockAnsibleModule.DEFAULT_DOMAIN_NAME),
+            MockAnsibleModule.DEFAULT_AUTO_GENERATED_UUID)
+
+    def test_lru(self):
+        uuid_cache = UuidCache(namespace=self.NAMESPACE, max_entries=2)
+        uuid_a = uuid_cache.uuid_for(name='vm-a')
+        uuid_cache.uuid_for(name='vm-b')
+        self.assertEqual(uuid_cache.uuid_for(name='vm-a'), uuid_a)
+        uuid_cache.uuid_for(name='vm-c')
+        self.assertEqual(len(uuid_cache), 2)
+        self.assertEqual((uuid_cache.hits, uuid_cache.misses), (1, 3))
+        uuid_cache.uuid_for(name='vm-b')
+        self.assertEqual(uuid_cache.misses, 4)
+        uuid_cache.clear()
+        self.assertEqual(len(uuid_cache), 0)
+
+    def test_uuids_for(self):
+        uuid_cache = UuidCache(namespace=self.NAMESPACE)
+        names = ['vm-a', 'vm-b', 'vm-a']
+        self.assertEqual(uuid_cache.uuids_for(names=names),
+            [uuid_cache.uuid_for(name=name) for name in names])
+        self.assertEqual(ModuleToIntermediate.uuids_for(names=names),
+            uuid_cache.uuids_for(names=names))
+
+    def test_inventory_fits(self):
+        uuid_cache = UuidCache(namespace=self.NAMESPACE)
+        names = ['vm-{0}'.format(index) for index in range(10000)]
+        uuid_cache.uuids_for(names=names)
+        uuid_cache.uuids_for(names=names)
+        self.assertEqual((uuid_cache.hits, uuid_cache.misses), (10000, 10000))
+
+    def test_shared_between_threads(self):
+        uuid_cache = UuidCache(namespace=self.NAMESPACE, max_entries=8)
+        names = ['vm-{0}'.format(index % 64) for index in range(4000)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            uuids = list(executor.map(lambda name: uuid_cache.uuid_for(
+                name=name), names))
+        namespace = uuid.UUID(self.NAMESPACE)
+        self.assertEqual(uuids, [str(uuid.uuid5(namespace, name))
+            for name in names])
+        self.assertLessEqual(len(uuid_cache), 8)
+        self.assertEqual(uuid_cache.hits + uuid_cache.misses, 4000)
+
+    def test_uuid_namespace(self):
+        namespace = ModuleToIntermediate.UUID_NAMESPACE_ANSIBLE
+        self.assertIsInstance(namespace, uuid.UUID)
+        self.assertEqual(namespace, uuid.UUID(self.NAMESPACE))
+        self.assertEqual(UuidCache(namespace=namespace).uuid_for(
+            name='vm-foo'), str(uuid.uuid5(namespace, 'vm-foo')))
+
+    def test_bad_namespace(self):
+        with self.assertRaises(ValueError):
+            UuidCache(namespace='361E6D51')
+
+if __name__ == '__main__':
+    unittest.main()
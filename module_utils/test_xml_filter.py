@@ -2,7 +2,7 @@
 
 import unittest
 from lxml import etree
-from xml_filter import XmlFilter
+from xml_filter import CompiledFilter, XmlFilter
 
 class TestXmlFilter(unittest.TestCase):
     FILTER_SPEC = {
@@ -67,5 +67,42 @@ class TestXmlFilter(unittest.TestCase):
         vcpu_placement_attribute = vcpu_node.get('placement')
         self.assertFalse(vcpu_placement_attribute)
 
+    def test_repeated_elements_not_duplicated(self):
+        filter_spec = {
+            'domain': {
+                'devices': {
+                    'disk': {
+                        '__attributes__': ['device'],
+                        'target': {'__attributes__': ['dev']}
+                    }
+                }
+            }
+        }
+        with open('domain.xml', 'r') as file:
+            xml_string = file.read()
+        xml_filter = XmlFilter(filter_spec=filter_spec, input_xml=xml_string)
+        xml_tree = etree.fromstring(xml_filter.output_xml)
+        disks = xml_tree.xpath('/domain/devices/disk')
+        self.assertEqual(len(disks), 2)
+        self.assertEqual([len(disk) for disk in disks], [1, 1])
+        self.assertEqual(disks[0].get('device'), 'disk')
+        self.assertEqual(disks[0][0].get('dev'), 'vda')
+        self.assertEqual(disks[1].get('device'), 'cdrom')
+        self.assertEqual(disks[1][0].get('dev'), 'hda')
+
+    def test_compiled_filter_reuse(self):
+        compiled_filter = CompiledFilter(filter_spec=self.FILTER_SPEC)
+        with open('domain.xml', 'r') as file:
+            xml_string = file.read()
+        first = XmlFilter(filter_spec=compiled_filter, input_xml=xml_string)
+        second = XmlFilter(filter_spec=compiled_filter, input_xml=xml_string)
+        self.assertEqual(first.output_xml, second.output_xml)
+        self.assertEqual(first.output_xml, etree.tostring(self.xml_tree))
+
+    def test_compiled_filter_root_mismatch(self):
+        compiled_filter = CompiledFilter(filter_spec={'network': {}})
+        self.assertIsNone(compiled_filter.apply(
+            input_xml_tree=etree.Element('domain')))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
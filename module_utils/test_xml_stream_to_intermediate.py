@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from xml_filter import XmlFilter
+from xml_to_intermediate import XmlToIntermediate
+from xml_stream_to_intermediate import XmlStreamToIntermediate
+
+class TestXmlStreamToIntermediate(unittest.TestCase):
+
+    FILTER_SPEC = {
+        'domain': {
+            '__attributes__': ['type'],
+            'name': {},
+            'uuid': {},
+            'title': {'required': False},
+            'description': {'required': False},
+            'memory': {'__attributes__': ['unit']},
+            'currentMemory': {'__attributes__': ['unit']},
+            'vcpu': {
+                '__attributes__': ['current']
+            },
+            'os': {
+                'type': {}
+            }
+        }
+    }
+
+    DEVICES_XML_STRING = ('<domain type="kvm">'
+        '<devices>'
+        '<disk type="file"><target dev="vda" bus="virtio"/></disk>'
+        '<interface type="bridge"><mac address="52:54:00:a7:51:6f"/>'
+        '</interface>'
+        '<disk type="block"><target dev="vdb" bus="virtio"/></disk>'
+        '</devices>'
+        '</domain>')
+
+    DEVICES_FILTER_SPEC = {
+        'domain': {
+            'devices': {
+                'disk': {
+                    '__attributes__': ['type'],
+                    'target': {'__attributes__': ['dev']}
+                }
+            }
+        }
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        with open('domain.xml', 'rb') as file:
+            cls.xml_bytes = file.read()
+
+    def test_same_as_filter_and_intermediate(self):
+        xml_filter = XmlFilter(filter_spec=self.FILTER_SPEC,
+            input_xml=self.xml_bytes)
+        expected = XmlToIntermediate(
+            xml_string=xml_filter.output_xml).representation
+        stream = XmlStreamToIntermediate(filter_spec=self.FILTER_SPEC,
+            xml_source=self.xml_bytes)
+        self.assertEqual(stream.representation, expected)
+
+    def test_file_name_source(self):
+        from_bytes = XmlStreamToIntermediate(filter_spec=self.FILTER_SPEC,
+            xml_source=self.xml_bytes)
+        from_file = XmlStreamToIntermediate(filter_spec=self.FILTER_SPEC,
+            xml_source='domain.xml')
+        self.assertEqual(from_file.representation, from_bytes.representation)
+
+    def test_string_source(self):
+        stream = XmlStreamToIntermediate(filter_spec=self.FILTER_SPEC,
+            xml_source=self.xml_bytes.decode())
+        self.assertEqual(stream.representation['element_name'], 'domain')
+
+    def test_attributes_filtered(self):
+        stream = XmlStreamToIntermediate(filter_spec=self.FILTER_SPEC,
+            xml_source=self.xml_bytes)
+        self.assertEqual(stream.representation['attributes'],
+            [{'attribute_name': 'type', 'attribute_value': 'kvm'}])
+        vcpu = next(filter(lambda x: x['element_name'] == 'vcpu',
+            stream.representation['children']))
+        self.assertEqual(vcpu['attributes'],
+            [{'attribute_name': 'current', 'attribute_value': '1'}])
+
+    def test_unmatched_elements_out(self):
+        stream = XmlStreamToIntermediate(filter_spec=self.FILTER_SPEC,
+            xml_source=self.xml_bytes)
+        element_names = [child['element_name'] for child in
+            stream.representation['children']]
+        self.assertNotIn('devices', element_names)
+        self.assertNotIn('features', element_names)
+        os_element = next(filter(lambda x: x['element_name'] == 'os',
+            stream.representation['children']))
+        self.assertEqual(os_element['children'],
+            [{'element_name': 'type', 'text': 'hvm'}])
+
+    def test_repeated_elements(self):
+        stream = XmlStreamToIntermediate(
+            filter_spec=self.DEVICES_FILTER_SPEC,
+            xml_source=self.DEVICES_XML_STRING)
+        devices = stream.representation['children'][0]
+        self.assertEqual(devices['element_name'], 'devices')
+        self.assertEqual(len(devices['children']), 2)
+        first_disk, second_disk = devices['children']
+        self.assertEqual(first_disk['attributes'][0]['attribute_value'],
+            'file')
+        self.assertEqual(first_disk['children'], [{
+            'element_name': 'target',
+            'attributes': [{'attribute_name': 'dev', 'attribute_value': 'vda'}]
+        }])
+        self.assertEqual(second_disk['children'][0]['attributes'][0]
+            ['attribute_value'], 'vdb')
+
+    def test_root_not_in_filter(self):
+        stream = XmlStreamToIntermediate(filter_spec={'network': {}},
+            xml_source=self.xml_bytes)
+        self.assertIsNone(stream.representation)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,154 +1,19 @@
 #!/usr/bin/env python3
 
 import unittest
-import copy
 
 from lxml import etree
 
+from identity_keys import IdentityKeys
+from intermediate_node import IntermediateNode
 from xml_to_intermediate import XmlToIntermediate
 
-class TestXmlToIntermediate(unittest.TestCase):
-
-    NODE_NAME = 'node_name'
-    NODE_ATTRIBUTES = {'key1': 'value1', 'key2': 'value2', 'a_key': 'a_value'}
-    NODE_TEXT = 'Some random text.'
-    ELEMENT = {'element_name': NODE_NAME}
-    ELEMENT_ATTRIBUTES = [{
-        'attribute_name': 'a_key',
-        'attribute_value': 'a_value'
-    },{
-        'attribute_name': 'key1',
-        'attribute_value': 'value1'
-    },{
-        'attribute_name': 'key2',
-        'attribute_value': 'value2'
-    }]
-    XML_STRING = ('<root>'
-        '   <child1 />'
-        '   <child2>'
-        '       Child2 text.'
-        '   </child2>'
-        '   <child3 interisting="yes" />'
-        '</root>')
-
-    @classmethod
-    def setUpClass(cls):
-        xml_string = '<domain />'
-        cls.xml_to_intermediate = XmlToIntermediate(xml_string=xml_string)
-
-    def test_get_node_name(self):
-        node = etree.Element(self.NODE_NAME)
-        node_name_gotten = (self.xml_to_intermediate
-            ._XmlToIntermediate__get_node_name(node=node))
-        self.assertEqual(self.NODE_NAME, node_name_gotten)
-
-    def test_parse_name(self):
-        element = (self.xml_to_intermediate._XmlToIntermediate__parse_name(
-            name=self.NODE_NAME))
-        self.assertIsInstance(element, dict)
-        self.assertIn('element_name', element)
-        self.assertEqual(element['element_name'], self.NODE_NAME)
-
-    def test_create_base_element(self):
-        node = etree.Element(self.NODE_NAME)
-        element = (self.xml_to_intermediate
-            ._XmlToIntermediate__create_base_element(node=node))
-        self.assertIsInstance(element, dict)
-        self.assertIn('element_name', element)
-        self.assertEqual(element['element_name'], self.NODE_NAME)
-
-    def test_get_node_attributes(self):
-        node = etree.Element(self.NODE_NAME, **self.NODE_ATTRIBUTES)
-        node_attributes_gotten = (self.xml_to_intermediate
-            ._XmlToIntermediate__get_node_attributes(node=node))
-        self.assertIsInstance(node_attributes_gotten, dict)
-        self.assertEqual(self.NODE_ATTRIBUTES, node_attributes_gotten)
-
-    def test_parse_attributes_dictionary(self):
-        attributes_sorted_list = (self.xml_to_intermediate
-            ._XmlToIntermediate__parse_attributes_dictionary(
-            attributes_dictionary=self.NODE_ATTRIBUTES))
-        self.assertIsInstance(attributes_sorted_list, list)
-        self.assertEqual(len(attributes_sorted_list), len(self.NODE_ATTRIBUTES))
-        self.assertIsInstance(attributes_sorted_list[0], dict)
-        self.assertEqual(attributes_sorted_list, self.ELEMENT_ATTRIBUTES)
-
-    def test_add_attributes_to_element(self):
-        element = copy.deepcopy(self.ELEMENT)
-        element = (self.xml_to_intermediate
-            ._XmlToIntermediate__add_attributes_to_element(element=element,
-            attributes_list=self.ELEMENT_ATTRIBUTES))
-        self.assertIsInstance(element, dict)
-        self.assertIn('attributes', element)
-        self.assertIsInstance(element['attributes'], list)
-        self.assertEqual(len(element['attributes']),
-            len(self.ELEMENT_ATTRIBUTES))
-
-    def test_get_node_text(self):
-        node = etree.Element(self.NODE_NAME)
-        node.text = self.NODE_TEXT
-        node_text = (self.xml_to_intermediate
-            ._XmlToIntermediate__get_node_text(node=node))
-        self.assertIsInstance(node_text, str)
-        self.assertEqual(node_text, self.NODE_TEXT)
-
-    def test_add_text_to_element(self):
-        element = copy.deepcopy(self.ELEMENT)
-        (self.xml_to_intermediate._XmlToIntermediate__add_text_to_element(
-            element=element, text=self.NODE_TEXT))
-        self.assertIn('text', element)
-        self.assertIsInstance(element['text'], str)
-        self.assertEqual(element['text'], self.NODE_TEXT)
-
-    def test_get_node_children(self):
-        xml_tree = etree.fromstring(self.XML_STRING)
-        node_children = (self.xml_to_intermediate
-            ._XmlToIntermediate__get_node_children(node=xml_tree))
-        self.assertIsInstance(node_children, list)
-        self.assertEqual(len(node_children), 3)
-        self.assertEqual(node_children[0].tag, 'child1')
-
-    def test_get_empty_node_children(self):
-        node = etree.Element('root')
-        node_children = (self.xml_to_intermediate
-            ._XmlToIntermediate__get_node_children(node=node))
-        self.assertIsInstance(node_children, list)
-        self.assertFalse(node_children)
+from benchmarks.domain_generator import DomainGenerator
+from benchmarks.xml_to_intermediate import RecursiveConverter
 
-    def test_add_element_to_children_list(self):
-        element = copy.deepcopy(self.ELEMENT)
-        children_list = []
-        (self.xml_to_intermediate
-            ._XmlToIntermediate__add_element_to_children_list(
-            element=element, children_list=children_list))
-        self.assertEqual(len(children_list), 1)
-        self.assertEqual(children_list[0], element)
-
-    def test_sort_children_list(self):
-        children_list = []
-        first_element = {'element_name': 'banana', 'element_value': '6'}
-        second_element = {'element_name': 'orange', 'element_value': '7'}
-        third_element = {'element_name': 'apple', 'element_value': '8'}
-        children_list.append(first_element)
-        children_list.append(second_element)
-        children_list.append(third_element)
-        new_children_list = (self.xml_to_intermediate._XmlToIntermediate__sort_children_list(
-            children_list=children_list))
-        self.assertEqual(new_children_list[0]['element_name'], 'apple')
-        self.assertEqual(new_children_list[1]['element_name'], 'banana')
-        self.assertEqual(new_children_list[2]['element_name'], 'orange')
-
-    def test_add_children_list_to_parent_element(self):
-        element = copy.deepcopy(self.ELEMENT)
-        children_list = [{'element_name': 'child1', 'text': 'Child text'}]
-        (self.xml_to_intermediate
-            ._XmlToIntermediate__add_children_list_to_parent_element(
-            parent_element=element, children_list=children_list))
-        self.assertIn('children', element)
-        self.assertEqual(len(element['children']), 1)
-        self.assertEqual(element['children'][0]['element_name'], 'child1')
+class TestXmlToIntermediate(unittest.TestCase):
 
-    def test_create_node_representation(self):
+    def test_parsed_element(self):
         node_xml_string = ('<root>'
             '   <z_child z_attrib="foo" a_attrib="bar" />'
             '   <a_child>Some random text.</a_child>'
@@ -160,8 +25,8 @@ class TestXmlToIntermediate(unittest.TestCase):
             '</root>')
         parser = etree.XMLParser(remove_blank_text=True)
         xml_tree = etree.fromstring(node_xml_string, parser)
-        representation = (self.xml_to_intermediate
-            ._XmlToIntermediate__create_node_representation(node=xml_tree))
+        representation = XmlToIntermediate(
+            xml_string=xml_tree).representation
         self.assertIsInstance(representation, dict)
         self.assertIn('element_name', representation)
         self.assertEqual(representation['element_name'], 'root')
@@ -206,6 +71,83 @@ class TestXmlToIntermediate(unittest.TestCase):
         self.assertEqual(len(nested_children['children']),
             nested_children_total_children)
 
+    def test_children_order(self):
+        representation = XmlToIntermediate(xml_string='<root>'
+            '<banana>6</banana><orange>7</orange><apple>8</apple>'
+            '<banana>5</banana></root>').representation
+        # Sorted by element name, keeping the document order of siblings
+        # sharing one.
+        self.assertEqual([(child['element_name'], child['text'])
+            for child in representation['children']], [('apple', '8'),
+            ('banana', '6'), ('banana', '5'), ('orange', '7')])
+
+    def test_attributes_order(self):
+        representation = XmlToIntermediate(
+            xml_string='<node key2="value2" a_key="a_value" key1="value1"/>'
+            ).representation
+        self.assertEqual(representation, {
+            'element_name': 'node',
+            'attributes': [
+                {'attribute_name': 'a_key', 'attribute_value': 'a_value'},
+                {'attribute_name': 'key1', 'attribute_value': 'value1'},
+                {'attribute_name': 'key2', 'attribute_value': 'value2'}
+            ]
+        })
+
+    def test_text_and_tail(self):
+        representation = XmlToIntermediate(xml_string='<root>'
+            '<empty/><blank>  </blank><text> Child text. </text>'
+            '<mixed>head<child>inner</child>tail</mixed></root>'
+            ).representation
+        self.assertEqual(representation['children'], [
+            {'element_name': 'blank', 'text': '  '},
+            {'element_name': 'empty'},
+            # Elements with children keep neither their text nor the
+            # tails of their children.
+            {'element_name': 'mixed', 'children': [
+                {'element_name': 'child', 'text': 'inner'}]},
+            {'element_name': 'text', 'text': ' Child text. '}
+        ])
+
+    def test_same_as_recursive_conversion(self):
+        domain = DomainGenerator(total_disks=20, total_interfaces=5,
+            total_channels=3, nesting_depth=2).xml_tree
+        self.assertEqual(XmlToIntermediate(xml_string=domain).representation,
+            RecursiveConverter().representation(node=domain))
+
+    def test_node_representation(self):
+        node_xml_string = ('<root>'
+            '   <z_child z_attrib="foo" a_attrib="bar" />'
+            '   <a_child>Some random text.</a_child>'
+            '   <nested_children>'
+            '       <c />'
+            '       <a />'
+            '       <b />'
+            '   </nested_children>'
+            '</root>')
+        expected = XmlToIntermediate(xml_string=node_xml_string).representation
+        node = XmlToIntermediate(xml_string=node_xml_string,
+            as_node=True).representation
+        self.assertIsInstance(node, IntermediateNode)
+        self.assertEqual(node.to_dict(), expected)
+
+    def test_identity_keys_sorting(self):
+        node_xml_string = ('<devices>'
+            '<disk><target dev="vdb"/></disk>'
+            '<controller type="usb" index="0"/>'
+            '<disk><target dev="vda"/></disk>'
+            '</devices>')
+        representation = XmlToIntermediate(xml_string=node_xml_string,
+            identity_keys=IdentityKeys()).representation
+        children = representation['children']
+        self.assertEqual([child['element_name'] for child in children],
+            ['controller', 'disk', 'disk'])
+        self.assertEqual(children[1]['children'][0]['attributes'][0]
+            ['attribute_value'], 'vda')
+        node = XmlToIntermediate(xml_string=node_xml_string, as_node=True,
+            identity_keys=IdentityKeys()).representation
+        self.assertEqual(node.to_dict(), representation)
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -1,70 +1,162 @@
-from lxml import etree
+import time
 
-class XmlFilter:
-    """Class that converts a XML to another XML based on a filter
+from lazy_import import LazyModule
+from pipeline_stats import xml_size
 
-    Attributes:
-        output_xml (str): xml output string
+etree = LazyModule('lxml.etree', globals(), 'etree')
+
+class CompiledFilter:
+    """Filter spec compiled into reusable XPath selectors
+
+    Each node of the filter spec becomes a precompiled etree.XPath that
+    selects the matching children relative to the node matched by its
+    parent, so applying the filter does no string formatting, no XPath
+    compilation and never re-queries from the document root. Build it
+    once and apply it to as many XML trees as needed.
     """
-    def __init__(self, filter_spec, input_xml):
-        output_xml = ''
-        self.__input_xml_tree = etree.fromstring(input_xml)
-        self.__process_filter(filter_spec=filter_spec)
-        self.__output_xml = etree.tostring(self.__output_xml_tree)
-
-    def __process_filter(
-        self,
-        filter_spec,
-        parent_output_node=None,
-        parent_xpath=''
-    ):
-        for node_name in filter_spec:
-            xpath = '{0}/{1}'.format(parent_xpath, node_name)
-            xpath_query_result = self.__input_xml_tree.xpath(xpath)
-            self.__process_from_input_nodes(result_list=xpath_query_result,
-                parent_output_node=parent_output_node,
-                filter_spec=filter_spec[node_name],
-                xpath=xpath)
-
-    def __process_from_input_nodes(
-        self,
-        result_list,
-        parent_output_node,
-        filter_spec,
-        xpath=''
-    ):
-        for input_node in result_list:
-            output_node = self.__create_output_node(node_name=input_node.tag,
-                parent_output_node=parent_output_node)
-            self.__process_attributes(input_node=input_node,
-                output_node=output_node, filter_spec=filter_spec)
-            self.__process_text(input_node=input_node, output_node=output_node)
-            self.__process_filter(filter_spec=filter_spec,
-                parent_output_node=output_node,
-                parent_xpath=xpath)
-
-    def __create_output_node(self, node_name, parent_output_node):
+
+    ATTRIBUTES_KEY = '__attributes__'
+
+    def __init__(self, filter_spec):
+        """Class constructor
+
+        Args:
+            filter_spec (dict): the filter spec. Keys are element names
+                and values are the filter spec for that element's
+                children. The '__attributes__' key lists the attributes
+                to keep. Non dict values are options and are ignored.
+        """
+        self.__root_nodes = self.__compile(filter_spec=filter_spec,
+            axis='self::')
+
+    def __compile(self, filter_spec, axis=''):
+        """Compile a filter spec level
+
+        Returns:
+            list: a list of (selector, attribute names, children) tuples,
+                children being the compiled list for the next level.
+        """
+        compiled_nodes = []
+        for node_name, node_spec in filter_spec.items():
+            if node_name == self.ATTRIBUTES_KEY or not isinstance(node_spec,
+                    dict):
+                continue
+            compiled_nodes.append((
+                etree.XPath(axis + node_name),
+                tuple(node_spec.get(self.ATTRIBUTES_KEY, ())),
+                self.__compile(filter_spec=node_spec)
+            ))
+        return compiled_nodes
+
+    def apply(self, input_xml_tree):
+        """Apply the filter to a XML tree
+
+        Args:
+            input_xml_tree (Element): the root element of the XML.
+
+        Returns:
+            Element: the filtered XML tree or None if the root element
+                is not in the filter spec.
+        """
+        return self._apply(input_xml_tree=input_xml_tree)[0]
+
+    def _apply(self, input_xml_tree):
+        """Apply the filter to a XML tree, counting the XPath queries
+
+        Returns:
+            tuple: the filtered XML tree, or None, and the number of
+                XPath queries issued.
+        """
+        xpath_queries = 0
+        for selector, attributes, children in self.__root_nodes:
+            xpath_queries += 1
+            for matched_node in selector(input_xml_tree):
+                output_node = self.__create_output_node(
+                    input_node=matched_node, attributes=attributes)
+                xpath_queries += self.__process_nodes(compiled_nodes=children,
+                    input_node=matched_node, parent_output_node=output_node)
+                return output_node, xpath_queries
+        return None, xpath_queries
+
+    def __process_nodes(self, compiled_nodes, input_node, parent_output_node):
+        xpath_queries = len(compiled_nodes)
+        for selector, attributes, children in compiled_nodes:
+            for matched_node in selector(input_node):
+                output_node = self.__create_output_node(
+                    input_node=matched_node, attributes=attributes,
+                    parent_output_node=parent_output_node)
+                xpath_queries += self.__process_nodes(compiled_nodes=children,
+                    input_node=matched_node, parent_output_node=output_node)
+        return xpath_queries
+
+    def __create_output_node(self, input_node, attributes,
+            parent_output_node=None):
         if parent_output_node is None:
-            self.__output_xml_tree = etree.Element(node_name)
-            return self.__output_xml_tree
-        return etree.SubElement(parent_output_node, node_name)
-
-    def __process_attributes(self, input_node, output_node, filter_spec):
-        if '__attributes__' in filter_spec:
-            self.__get_and_set_attributes(
-                attributes_list=filter_spec['__attributes__'],
-                input_node=input_node, output_node=output_node)
-
-    def __get_and_set_attributes(self, attributes_list, input_node, output_node):
-        for attribute_name in attributes_list:
+            output_node = etree.Element(input_node.tag)
+        else:
+            output_node = etree.SubElement(parent_output_node, input_node.tag)
+        for attribute_name in attributes:
             attribute_value = input_node.get(attribute_name)
             if attribute_value:
                 output_node.set(attribute_name, attribute_value)
-
-    def __process_text(self, input_node, output_node):
         if input_node.text:
             output_node.text = input_node.text
+        return output_node
+
+class XmlFilter:
+    """Class that converts a XML to another XML based on a filter
+
+    Attributes:
+        output_xml (str): xml output string
+        output_xml_tree (Element): the filtered xml tree, to be chained
+            without serializing it.
+    """
+    def __init__(self, filter_spec, input_xml, stats=None):
+        """Class constructor
+
+        Args:
+            filter_spec (dict|CompiledFilter): the filter spec or an
+                already compiled filter to be reused.
+            input_xml (str|Element): the xml to be filtered, either as a
+                string or as an already parsed lxml element.
+            stats (PipelineStats): records the filtering, and later the
+                serialization, under the 'XmlFilter' stage.
+        """
+        if stats is not None:
+            start = time.perf_counter()
+        self.__stats = stats
+        if not isinstance(filter_spec, CompiledFilter):
+            filter_spec = CompiledFilter(filter_spec=filter_spec)
+        input_xml_tree = input_xml
+        if not etree.iselement(input_xml_tree):
+            input_xml_tree = etree.fromstring(input_xml)
+        self.__output_xml_tree, xpath_queries = filter_spec._apply(
+            input_xml_tree=input_xml_tree)
+        self.__output_xml = None
+        if stats is not None:
+            seconds = time.perf_counter() - start
+            stats.record(stage='XmlFilter', seconds=seconds,
+                nodes=self.__count_nodes(), xpath_queries=xpath_queries,
+                bytes_parsed=0 if input_xml_tree is input_xml
+                else xml_size(input_xml))
+
+    def __count_nodes(self):
+        if self.__output_xml_tree is None:
+            return 0
+        return sum(1 for _ in self.__output_xml_tree.iter())
 
     @property
     def output_xml(self):
+        if self.__output_xml is None:
+            if self.__stats is not None:
+                start = time.perf_counter()
+            self.__output_xml = etree.tostring(self.__output_xml_tree)
+            if self.__stats is not None:
+                self.__stats.record(stage='XmlFilter',
+                    seconds=time.perf_counter() - start,
+                    bytes_serialized=len(self.__output_xml), calls=0)
         return self.__output_xml
+
+    @property
+    def output_xml_tree(self):
+        return self.__output_xml_tree
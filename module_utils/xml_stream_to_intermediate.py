@@ -0,0 +1,124 @@
+from io import BytesIO
+
+from lazy_import import LazyModule
+
+etree = LazyModule('lxml.etree', globals(), 'etree')
+
+class XmlStreamToIntermediate:
+    """Convert a XML to a filtered intermediate representation
+
+    Streaming equivalent of running XmlFilter and then XmlToIntermediate.
+    The XML is read with etree.iterparse and only the elements selected
+    by the filter spec are turned into intermediate elements. Every
+    other element is cleared as soon as it has been parsed, so memory is
+    bounded by the filtered output and not by the whole document.
+
+    Attributes:
+        representation (dict): the filtered xml equivalent intermediate
+            representation, or None if the root element is not in the
+            filter spec.
+    """
+
+    ATTRIBUTES_KEY = '__attributes__'
+
+    def __init__(self, filter_spec, xml_source):
+        """Class constructor
+
+        Args:
+            filter_spec (dict): a filter spec, as used by XmlFilter.
+            xml_source (str|bytes|file): the xml string or bytes, a file
+                name or a file object.
+        """
+        self.__representation = None
+        events = etree.iterparse(self.__open_source(xml_source=xml_source),
+            events=('start', 'end'))
+        self.__process_events(events=events, filter_spec=filter_spec)
+
+    def __open_source(self, xml_source):
+        if isinstance(xml_source, bytes):
+            return BytesIO(xml_source)
+        if isinstance(xml_source, str) and xml_source.lstrip().startswith('<'):
+            return BytesIO(xml_source.encode())
+        return xml_source
+
+    def __match_node(self, node, parent_spec):
+        """Get the filter spec for a node
+
+        Args:
+            node (Element): the node that has just been opened.
+            parent_spec (dict): the filter spec of the parent node, or
+                the whole filter spec for the root node.
+
+        Returns:
+            dict: the node filter spec or None if the node is filtered
+                out.
+        """
+        if parent_spec is None or node.tag == self.ATTRIBUTES_KEY:
+            return None
+        node_spec = parent_spec.get(node.tag)
+        if isinstance(node_spec, dict):
+            return node_spec
+        return None
+
+    def __create_element(self, node, node_spec):
+        element = {'element_name': node.tag}
+        attributes_list = []
+        for attribute_name in node_spec.get(self.ATTRIBUTES_KEY, []):
+            attribute_value = node.get(attribute_name)
+            if attribute_value:
+                attributes_list.append({'attribute_name': attribute_name,
+                    'attribute_value': attribute_value})
+        if attributes_list:
+            element['attributes'] = sorted(attributes_list,
+                key=lambda x: x['attribute_name'])
+        return element
+
+    def __close_element(self, node, element, children_list):
+        if children_list:
+            element['children'] = sorted(children_list,
+                key=lambda x: x['element_name'])
+        elif node.text:
+            element['text'] = node.text
+        return element
+
+    def __discard_node(self, node):
+        """Free a node that has been completely parsed
+
+        Clears the node and removes the already processed previous
+        siblings from its parent, so the partial tree built by iterparse
+        does not grow with the document.
+        """
+        node.clear()
+        parent = node.getparent()
+        if parent is None:
+            return
+        while node.getprevious() is not None:
+            del parent[0]
+
+    def __process_events(self, events, filter_spec):
+        # Each stack entry holds the filter spec of an open node (None
+        # when the node is filtered out), its intermediate element and
+        # the list of its filtered children.
+        stack = [(filter_spec, None, [])]
+        for event, node in events:
+            if event == 'start':
+                node_spec = self.__match_node(node=node,
+                    parent_spec=stack[-1][0])
+                element = None
+                if node_spec is not None:
+                    element = self.__create_element(node=node,
+                        node_spec=node_spec)
+                stack.append((node_spec, element, []))
+                continue
+            node_spec, element, children_list = stack.pop()
+            if element is not None:
+                stack[-1][2].append(self.__close_element(node=node,
+                    element=element, children_list=children_list))
+            self.__discard_node(node=node)
+        root_list = stack[0][2]
+        if root_list:
+            self.__representation = root_list[0]
+
+    @property
+    def representation(self):
+        return self.__representation
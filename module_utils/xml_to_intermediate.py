@@ -1,118 +1,106 @@
-from lxml import etree
+import time
+from operator import attrgetter, itemgetter
+
+from intermediate_node import IntermediateNode
+from lazy_import import LazyModule
+from pipeline_stats import xml_size
+
+etree = LazyModule('lxml.etree', globals(), 'etree')
 
 class XmlToIntermediate:
     """Convert a XML to an intermediate representation
 
     Attributes:
-        representation (dict): the xml equivalent intermediate
-            representation.
+        representation (dict|IntermediateNode): the xml equivalent
+            intermediate representation.
     """
 
-    def __init__(self, xml_string):
-        parser = etree.XMLParser(remove_blank_text=True)
-        xml_tree = etree.fromstring(xml_string, parser)
-        self.__representation = self.__create_node_representation(node=xml_tree)
-
-    def __get_node_name(self, node):
-        return node.tag
-
-    def __parse_name(self, name):
-        return {'element_name': name}
-
-    def __create_base_element(self, node):
-        node_name = self.__get_node_name(node=node)
-        return self.__parse_name(name=node_name)
-
-    def __get_node_attributes(self, node):
-        return dict(node.attrib)
-
-    def __parse_attributes_dictionary(self, attributes_dictionary):
-        """Parse an attributes dictionary
-
-        Should pass an attributes dictionary and receive a sorted list
+    def __init__(self, xml_string, as_node=False, identity_keys=None,
+            stats=None):
+        """Class constructor
 
         Args:
-            attributes_dictionary (dict): an attributes dictionary with
-                the key being the attribute name and the value being
-                the attribute value.
-        Returns:
-            list: a list of dictionaries with 'attribute_name' and
-                'attribute_value' keys, sorted by the attribute name.
+            xml_string (str|Element): the xml string or an already
+                parsed lxml element, which is used without reparsing.
+            as_node (bool): build IntermediateNode objects instead of
+                dicts.
+            identity_keys (IdentityKeys): when given, siblings sharing
+                an element name are sorted by identity key instead of
+                being kept in document order.
+            stats (PipelineStats): records the conversion under the
+                'XmlToIntermediate' stage.
         """
-        attributes_list = []
-        for key, value in attributes_dictionary.items():
-            item = {'attribute_name': key, 'attribute_value': value}
-            attributes_list.append(item)
-        return sorted(attributes_list, key=lambda x: x['attribute_name'])
-
-    def __add_attributes_to_element(self, element, attributes_list):
-        if attributes_list:
-            element['attributes'] = attributes_list
-        return element
-
-    def __get_node_text(self, node):
-        return node.text
+        if stats is not None:
+            start = time.perf_counter()
+        xml_tree = xml_string
+        if not etree.iselement(xml_tree):
+            parser = etree.XMLParser(remove_blank_text=True)
+            xml_tree = etree.fromstring(xml_string, parser)
+        self.__element_sort_key = itemgetter('element_name')
+        self.__node_sort_key = attrgetter('element_name')
+        if identity_keys is not None:
+            self.__element_sort_key = identity_keys.sort_key
+            self.__node_sort_key = identity_keys.sort_key
+        build = self.__build_element
+        if as_node:
+            build = self.__build_node
+        self.__representation = self.__walk(root=xml_tree, build=build)
+        if stats is not None:
+            seconds = time.perf_counter() - start
+            stats.record(stage='XmlToIntermediate', seconds=seconds,
+                nodes=sum(1 for _ in xml_tree.iter()),
+                bytes_parsed=0 if xml_tree is xml_string
+                else xml_size(xml_string))
+
+    def __walk(self, root, build):
+        """Convert a tree bottom-up without recursion
+
+        Uses an explicit stack instead of a Python frame per level and
+        iterates each node's children only once.
 
-    def __add_text_to_element(self, element, text):
-        if text:
-            element['text'] = text
-        return element
-
-    def __parse_text(self, node, element):
-        node_text = self.__get_node_text(node=node)
-        return self.__add_text_to_element(element=element, text=node_text)
-
-    def __has_children(self, node):
-        if list(node):
-            return True
-        return False
-
-    def __get_node_children(self, node):
-        return list(node)
-
-    def __add_element_to_children_list(self, element, children_list):
-        if element is not None:
-            children_list.append(element)
-        return children_list
-
-    def __sort_children_list(self, children_list):
-        return sorted(children_list, key=lambda x: x['element_name'])
+        Args:
+            root (Element): the root node of the tree to convert.
+            build (callable): receives a node and the list of its
+                converted children and returns the converted node.
 
-    def __add_children_list_to_parent_element(
-        self,
-        parent_element,
-        children_list
-    ):
+        Returns:
+            the converted root node.
+        """
+        # Each stack entry holds a node, the iterator over its children
+        # and the list of its already converted children.
+        stack = [(root, iter(root), [])]
+        while True:
+            node, children_iterator, children_list = stack[-1]
+            child_node = next(children_iterator, None)
+            if child_node is not None:
+                stack.append((child_node, iter(child_node), []))
+                continue
+            stack.pop()
+            element = build(node, children_list)
+            if not stack:
+                return element
+            stack[-1][2].append(element)
+
+    def __build_element(self, node, children_list):
+        element = {'element_name': node.tag}
+        if node.attrib:
+            element['attributes'] = [{'attribute_name': attribute_name,
+                'attribute_value': attribute_value} for attribute_name,
+                attribute_value in sorted(node.attrib.items())]
         if children_list:
-            parent_element['children'] = children_list
-
-    def __parse_attributes(self, node, element):
-        node_attributes = self.__get_node_attributes(node=node)
-        attributes_list = self.__parse_attributes_dictionary(
-            attributes_dictionary=node_attributes)
-        element = self.__add_attributes_to_element(element=element,
-            attributes_list=attributes_list)
+            children_list.sort(key=self.__element_sort_key)
+            element['children'] = children_list
+        elif node.text:
+            element['text'] = node.text
         return element
 
-    def __parse_children(self, node, element):
-        node_children_list = self.__get_node_children(node=node)
-        element_children_list = []
-        for child_node in node_children_list:
-            child_element = self.__create_node_representation(node=child_node)
-            self.__add_element_to_children_list(element=child_element,
-                children_list=element_children_list)
-        sorted_children_list = self.__sort_children_list(
-            children_list=element_children_list)
-        self.__add_children_list_to_parent_element(parent_element=element,
-            children_list=sorted_children_list)
-        return element
-
-    def __create_node_representation(self, node):
-        element = self.__create_base_element(node=node)
-        element = self.__parse_attributes(node=node, element=element)
-        if self.__has_children(node=node):
-            return self.__parse_children(node=node, element=element)
-        return self.__parse_text(node=node, element=element)
+    def __build_node(self, node, children_list):
+        if children_list:
+            children_list.sort(key=self.__node_sort_key)
+            return IntermediateNode(element_name=node.tag,
+                attributes=node.attrib.items(), children=children_list)
+        return IntermediateNode(element_name=node.tag,
+            attributes=node.attrib.items(), text=node.text or None)
 
     @property
     def representation(self):